@@ -1,26 +1,58 @@
 from __future__ import annotations
 
-import json
 import logging
+import time
 import traceback
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Optional
 
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.models.db import Challenge, Run, Source, get_session, init_db
-from app.models.schemas import OutputSchema, RunConfig, RunCreateResponse, RunStatus
+from app.models.db import (
+    Challenge,
+    ReadSessionLocal,
+    Run,
+    Schedule,
+    SessionLocal,
+    Source,
+    dispose_async_engines,
+    get_async_read_session,
+    get_async_session,
+    get_read_session,
+    get_session,
+    init_db,
+)
+from app.models.schemas import OutputSchema, RunConfig, RunCreateResponse, RunStatus, ScheduleCreate, ScheduleOut
+from app.services.archive import archive_run
 from app.services.cache import run_dir
-from app.services.pipeline import run_pipeline
+from app.services.export import EXPORT_FORMATS, ExportFilters, stream_export
+from app.services.metrics import RUNS, RUNS_IN_PROGRESS, StageTimer, record_cache, render_latest
 from app.services.report import to_markdown
+from app.services.response_cache import CachedResponse, ResponseCache, accepts_gzip, etag_matches
+from app.services.scheduler import RunCoordinator, Scheduler
+from app.services.search_index import (
+    SEARCH_KINDS,
+    SearchIndexer,
+    challenge_documents,
+    hit_to_dict,
+    search_documents,
+)
+from app.services.trends import TREND_DIMENSIONS, query_trends, record_run
+from app.utils.serialization import dumps
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("trade-challenges")
 
+challenges_cache = ResponseCache(settings.response_cache_max_entries, gzip_enabled=settings.response_cache_gzip)
+
 app = FastAPI(title="Trade Challenges Research Agent")
 app.add_middleware(
     CORSMiddleware,
@@ -35,15 +67,27 @@ app.add_middleware(
 def on_startup() -> None:
     settings.data_dir.mkdir(parents=True, exist_ok=True)
     init_db()
+    if settings.scheduler_enabled:
+        scheduler.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    scheduler.stop()
+    coordinator.shutdown()
+    await dispose_async_engines()
 
 
 def _save_output(run_id: str, output: Dict) -> None:
     root = run_dir(run_id)
-    (root / "output.json").write_text(json.dumps(output, indent=2, default=str), encoding="utf-8")
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "output.json").write_bytes(dumps(output))
     (root / "report.md").write_text(to_markdown(output), encoding="utf-8")
+    if settings.archive_runs:
+        archive_run(root)
 
 
-def _store_output(db: Session, run_id: str, output: OutputSchema, sources: list[dict]) -> None:
+def _store_output(db: Session, run_id: str, output: OutputSchema, sources: list[dict]) -> list[int]:
     for src in sources:
         db.add(
             Source(
@@ -57,9 +101,10 @@ def _store_output(db: Session, run_id: str, output: OutputSchema, sources: list[
             )
         )
 
+    challenges = []
     for item in output.items:
         evidence_json = [ev.model_dump(mode="json") for ev in item.evidence]
-        db.add(
+        challenges.append(
             Challenge(
                 run_id=run_id,
                 title=item.title,
@@ -76,11 +121,27 @@ def _store_output(db: Session, run_id: str, output: OutputSchema, sources: list[
                 dedupe_key=item.dedupe_key,
             )
         )
+    db.add_all(challenges)
+    record_run(db, run_id, output.items)
+    if settings.search_index_enabled:
+        db.add_all(challenge_documents(run_id, output.items))
     db.commit()
+    return [challenge.id for challenge in challenges]
+
+
+def _index_vectors(challenge_ids: list[int], embeddings: list[list[float]]) -> None:
+    # Runs after the rows are committed so every vector maps to a real challenge id; failures only cost similarity coverage.
+    from app.services.vector_index import vector_index
+
+    try:
+        vector_index().add(challenge_ids, embeddings, settings.openai_embedding_model)
+    except Exception as exc:
+        logger.warning("Vector indexing failed: %s", exc)
 
 
 def _run_job(run_id: str, params: Dict) -> None:
-    from app.models.db import SessionLocal
+    # The pipeline pulls in the fetch, extraction and embedding stacks; API processes that never run a job skip them.
+    from app.services.pipeline import run_pipeline
 
     db = SessionLocal()
     try:
@@ -90,14 +151,30 @@ def _run_job(run_id: str, params: Dict) -> None:
         run.status = "running"
         db.commit()
 
-        output, sources = run_pipeline(run_id, params)
+        indexer = SearchIndexer(SessionLocal, run_id) if settings.search_index_enabled else None
+        with RUNS_IN_PROGRESS.track_inprogress():
+            output, sources, embeddings = run_pipeline(run_id, params, indexer=indexer)
         run.stats = output.stats
         run.status = "completed"
         db.commit()
 
-        _store_output(db, run_id, output, sources)
+        timer = StageTimer()
+        with timer.stage("db_write"):
+            challenge_ids = _store_output(db, run_id, output, sources)
+        if settings.vector_index_enabled and len(embeddings) == len(challenge_ids):
+            with timer.stage("vector_index"):
+                _index_vectors(challenge_ids, embeddings)
+        # Reassign rather than mutate so SQLAlchemy notices the JSON column changed.
+        run.stats = {
+            **run.stats,
+            "timings_s": {**run.stats.get("timings_s", {}), **timer.as_stats()},
+            "timings_cumulative_s": {**run.stats.get("timings_cumulative_s", {}), **timer.as_cumulative_stats()},
+        }
+        db.commit()
         _save_output(run_id, output.model_dump(mode="json"))
+        RUNS.labels("completed").inc()
     except Exception as exc:
+        RUNS.labels("failed").inc()
         run = db.get(Run, run_id)
         if run:
             run.status = "failed"
@@ -109,49 +186,126 @@ def _run_job(run_id: str, params: Dict) -> None:
         db.close()
 
 
+coordinator = RunCoordinator(_run_job, settings.max_concurrent_runs)
+scheduler = Scheduler(coordinator, SessionLocal, settings.scheduler_poll_s)
+
+
 @app.get("/health")
 def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post("/runs", response_model=RunCreateResponse)
-def create_run(config: RunConfig, background_tasks: BackgroundTasks, db: Session = Depends(get_session)):
-    run_id = datetime.utcnow().isoformat()
-    run = Run(
-        id=run_id,
-        created_at=datetime.utcnow(),
-        status="queued",
-        params=config.model_dump(),
-        stats={},
+def create_run(config: RunConfig, db: Session = Depends(get_session)):
+    run_id, coalesced = coordinator.submit(db, config.model_dump())
+    status = db.get(Run, run_id).status if coalesced else "queued"
+    return RunCreateResponse(run_id=run_id, status=status, coalesced=coalesced)
+
+
+def _schedule_out(schedule: Schedule) -> ScheduleOut:
+    return ScheduleOut(
+        id=schedule.id,
+        name=schedule.name,
+        config=RunConfig.model_validate(schedule.params or {}),
+        interval_minutes=schedule.interval_minutes,
+        enabled=schedule.enabled,
+        next_run_at=schedule.next_run_at,
+        last_run_id=schedule.last_run_id,
     )
-    db.add(run)
+
+
+@app.post("/schedules", response_model=ScheduleOut)
+def create_schedule(body: ScheduleCreate, db: Session = Depends(get_session)):
+    if db.query(Schedule).filter(Schedule.name == body.name).first():
+        raise HTTPException(status_code=409, detail="Schedule name already exists")
+    schedule = Schedule(
+        name=body.name,
+        params=body.config.model_dump(),
+        interval_minutes=body.interval_minutes,
+        enabled=body.enabled,
+        next_run_at=datetime.utcnow(),
+    )
+    db.add(schedule)
     db.commit()
+    return _schedule_out(schedule)
+
 
-    background_tasks.add_task(_run_job, run_id, config.model_dump())
-    return RunCreateResponse(run_id=run_id, status="queued")
+@app.get("/schedules", response_model=list[ScheduleOut])
+def list_schedules(db: Session = Depends(get_session)):
+    return [_schedule_out(s) for s in db.query(Schedule).order_by(Schedule.id).all()]
 
 
-@app.get("/runs/{run_id}", response_model=RunStatus)
-def get_run(run_id: str, db: Session = Depends(get_session)):
-    run = db.get(Run, run_id)
+@app.delete("/schedules/{schedule_id}", status_code=204)
+def delete_schedule(schedule_id: int, db: Session = Depends(get_session)) -> Response:
+    schedule = db.get(Schedule, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    db.delete(schedule)
+    db.commit()
+    return Response(status_code=204)
+
+
+def _run_status(run: Optional[Run]) -> RunStatus:
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     return RunStatus(run_id=run.id, status=run.status, created_at=run.created_at, stats=run.stats, error=run.error)
 
 
-@app.get("/runs/{run_id}/challenges", response_model=OutputSchema)
-def get_challenges(run_id: str, db: Session = Depends(get_session)):
+if settings.database_async:
+
+    @app.get("/runs/{run_id}", response_model=RunStatus)
+    async def get_run(run_id: str, db: AsyncSession = Depends(get_async_session)):
+        # Status polls follow POST /runs immediately, so they read the primary rather than a lagging replica.
+        return _run_status(await db.get(Run, run_id))
+
+else:
+
+    @app.get("/runs/{run_id}", response_model=RunStatus)
+    def get_run(run_id: str, db: Session = Depends(get_session)):
+        return _run_status(db.get(Run, run_id))
+
+
+def _cached_json_response(request: Request, entry: CachedResponse, immutable: bool) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    if entry.gzipped is not None and accepts_gzip(request.headers.get("accept-encoding")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzipped, media_type="application/json", headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _file_challenges_response(run_id: str, request: Request) -> Optional[Response]:
+    cached = challenges_cache.get(run_id)
+    hit = cached is not None and (settings.data_dir / run_id / "output.json").is_file()
+    record_cache("challenges_response", hit)
+    if hit:
+        return _cached_json_response(request, cached, immutable=True)
+
     root = run_dir(run_id)
     output_path = root / "output.json"
     if output_path.exists():
-        data = json.loads(output_path.read_text(encoding="utf-8"))
-        return OutputSchema.model_validate(data)
+        # output.json is only written once a run has completed, from an already validated OutputSchema,
+        # so its bytes are served as-is.
+        entry = challenges_cache.put(run_id, output_path.read_bytes())
+        return _cached_json_response(request, entry, immutable=True)
+    return None
 
-    run = db.get(Run, run_id)
+
+def _db_challenges_response(run_id: str, request: Request, run: Optional[Run], items: list[Challenge]) -> Response:
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
 
-    items = db.query(Challenge).filter(Challenge.run_id == run_id).all()
     output = {
         "run_id": run_id,
         "scope": {"regions": ["UK", "EU"], "topic": "global trade challenges", "languages": ["en"]},
@@ -174,15 +328,165 @@ def get_challenges(run_id: str, db: Session = Depends(get_session)):
         ],
         "stats": run.stats or {},
     }
-    return OutputSchema.model_validate(output)
+    return _cached_json_response(request, challenges_cache.build(dumps(output)), immutable=False)
 
 
-@app.get("/runs/success/challenges")
-def list_success_challenges(request: Request, db: Session = Depends(get_session)) -> Dict[str, list[dict]]:
-    runs = db.query(Run).filter(Run.status == "completed").all()
+def _success_listing(request: Request, run_ids: list[str]) -> Dict[str, list[dict]]:
     base = str(request.base_url).rstrip("/")
     return {
         "items": [
-            {"run_id": run.id, "url": f"{base}/runs/{run.id}/challenges"} for run in runs
+            {"run_id": run_id, "url": f"{base}/runs/{run_id}/challenges"} for run_id in run_ids
+        ]
+    }
+
+
+if settings.database_async:
+
+    @app.get("/runs/{run_id}/challenges", response_model=OutputSchema)
+    async def get_challenges(run_id: str, request: Request, db: AsyncSession = Depends(get_async_read_session)):
+        response = await run_in_threadpool(_file_challenges_response, run_id, request)
+        if response is not None:
+            return response
+        run = await db.get(Run, run_id)
+        items = (await db.scalars(select(Challenge).where(Challenge.run_id == run_id))).all() if run else []
+        return _db_challenges_response(run_id, request, run, list(items))
+
+    @app.get("/runs/success/challenges")
+    async def list_success_challenges(
+        request: Request, db: AsyncSession = Depends(get_async_read_session)
+    ) -> Dict[str, list[dict]]:
+        run_ids = (await db.scalars(select(Run.id).where(Run.status == "completed"))).all()
+        return _success_listing(request, list(run_ids))
+
+else:
+
+    @app.get("/runs/{run_id}/challenges", response_model=OutputSchema)
+    def get_challenges(run_id: str, request: Request, db: Session = Depends(get_read_session)):
+        response = _file_challenges_response(run_id, request)
+        if response is not None:
+            return response
+        run = db.get(Run, run_id)
+        items = db.query(Challenge).filter(Challenge.run_id == run_id).all() if run else []
+        return _db_challenges_response(run_id, request, run, items)
+
+    @app.get("/runs/success/challenges")
+    def list_success_challenges(request: Request, db: Session = Depends(get_read_session)) -> Dict[str, list[dict]]:
+        run_ids = [run_id for (run_id,) in db.query(Run.id).filter(Run.status == "completed").all()]
+        return _success_listing(request, run_ids)
+
+
+@app.get("/exports/challenges")
+def export_challenges(
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(csv|ndjson|parquet|md)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    run_id: list[str] = Query(default=[]),
+    challenge_type: Optional[str] = None,
+    severity: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    chunk_size: int = Query(default=1000, ge=1, le=50_000),
+) -> StreamingResponse:
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    filters = ExportFilters(
+        since=since,
+        until=until,
+        run_ids=run_id,
+        challenge_type=challenge_type,
+        severity=severity,
+        min_confidence=min_confidence,
+    )
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        stream_export(ReadSessionLocal, filters, fmt, chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="challenges.{extension}"'},
+    )
+
+
+@app.get("/search")
+def search(
+    q: str = Query(min_length=1, max_length=256),
+    kind: list[str] = Query(default=list(SEARCH_KINDS)),
+    since: Optional[datetime] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_read_session),
+) -> Dict[str, Any]:
+    unknown = set(kind) - set(SEARCH_KINDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown kind: {', '.join(sorted(unknown))}")
+    started = time.perf_counter()
+    hits = search_documents(db, q, kinds=kind, since=since, limit=limit)
+    return {
+        "query": q,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        "items": [hit_to_dict(hit) for hit in hits],
+    }
+
+
+@app.get("/stats/trends")
+def stats_trends(
+    dimension: list[str] = Query(default=list(TREND_DIMENSIONS)),
+    weeks: int = Query(default=12, ge=1, le=520),
+    top: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_read_session),
+) -> Dict[str, Any]:
+    unknown = set(dimension) - set(TREND_DIMENSIONS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown dimension: {', '.join(sorted(unknown))}")
+    started = time.perf_counter()
+    result = query_trends(db, dimension, weeks=weeks, top=top)
+    return {"took_ms": round((time.perf_counter() - started) * 1000, 2), **result}
+
+
+def _similar_response(db: Session, hits: list[tuple[int, float]]) -> Dict[str, list[dict]]:
+    rows = {c.id: c for c in db.query(Challenge).filter(Challenge.id.in_([cid for cid, _ in hits])).all()}
+    return {
+        "items": [
+            {
+                "id": cid,
+                "run_id": rows[cid].run_id,
+                "title": rows[cid].title,
+                "summary": rows[cid].summary,
+                "challenge_type": rows[cid].challenge_type,
+                "severity": rows[cid].severity,
+                "score": round(score, 4),
+            }
+            # Vectors are indexed after the primary commits, so a lagging read replica may not have the rows yet.
+            for cid, score in hits
+            if cid in rows
         ]
     }
+
+
+@app.get("/challenges/{challenge_id}/similar")
+def similar_challenges(
+    challenge_id: int,
+    k: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_read_session),
+) -> Dict[str, list[dict]]:
+    from app.services.vector_index import vector_index
+
+    vector = vector_index().vector_for(challenge_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="Challenge not in vector index")
+    return _similar_response(db, vector_index().search(vector, k=k, exclude_ids=[challenge_id]))
+
+
+@app.get("/challenges/semantic-search")
+def semantic_search(
+    q: str = Query(min_length=1, max_length=512),
+    k: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_read_session),
+) -> Dict[str, list[dict]]:
+    from app.services.openai_client import OpenAIClient
+    from app.services.vector_index import vector_index
+
+    try:
+        vector = OpenAIClient().embed_texts([q])[0]
+    except ValueError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    return _similar_response(db, vector_index().search(vector, k=k))
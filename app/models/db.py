@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime
+import threading
+from datetime import date, datetime
 from typing import Any, Dict, Optional
 
-from sqlalchemy import JSON, DateTime, Float, ForeignKey, Integer, String, Text, create_engine
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
+from sqlalchemy import DDL, JSON, Boolean, Date, DateTime, Engine, Float, ForeignKey, Index, Integer, String, Text, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship, sessionmaker
 
 from app.core.config import settings
 
@@ -63,12 +65,140 @@ class Challenge(Base):
     run: Mapped[Run] = relationship(back_populates="challenges")
 
 
-engine = create_engine(settings.database_url, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+class Schedule(Base):
+    __tablename__ = "schedules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(128), unique=True)
+    params: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    interval_minutes: Mapped[int] = mapped_column(Integer)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+    next_run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_run_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+    __table_args__ = (Index("ix_search_documents_run_kind", "run_id", "kind"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(String(64), ForeignKey("runs.id"))
+    kind: Mapped[str] = mapped_column(String(16))
+    url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    title: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    body: Mapped[str] = mapped_column(Text)
+    published_at: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+# The weighted tsvector is a generated column maintained by Postgres itself, so inserts stay plain and
+# other dialects (SQLite in tests) get the table without it.
+event.listen(
+    SearchDocument.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE search_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', body), 'B')) STORED; "
+        "CREATE INDEX ix_search_documents_vector ON search_documents USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+class WorkItem(Base):
+    # One URL of a run: fetched, triaged and extracted by whichever worker claims it.
+    __tablename__ = "work_items"
+    __table_args__ = (Index("ix_work_items_status_priority", "status", "priority"), Index("ix_work_items_run", "run_id"))
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(String(64), ForeignKey("runs.id"))
+    url: Mapped[str] = mapped_column(Text)
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class CacheEntry(Base):
+    # Page text, extraction and embedding cache shared by every worker node.
+    __tablename__ = "cache_entries"
+
+    key: Mapped[str] = mapped_column(String(160), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(16))
+    value: Mapped[Any] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ChallengeTrend(Base):
+    # Challenge counts per run week and dimension value, kept in step with the challenges table for the dashboard.
+    __tablename__ = "challenge_trends"
+    __table_args__ = (Index("ix_challenge_trends_dimension_week", "dimension", "week"),)
+
+    week: Mapped[date] = mapped_column(Date, primary_key=True)
+    dimension: Mapped[str] = mapped_column(String(32), primary_key=True)
+    value: Mapped[str] = mapped_column(String(256), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    # SQLite uses a single-connection pool that rejects the QueuePool sizing arguments.
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle_s,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_pre_ping": True,
+    }
+
+
+def async_database_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix) :]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    return url
+
+
+def _replica_url() -> str:
+    return settings.database_replica_url or settings.database_url
+
+
+_sessionmakers: Dict[str, sessionmaker[Session]] = {}
+_sessionmakers_lock = threading.Lock()
+
+
+def _sessionmaker(url: str) -> sessionmaker[Session]:
+    # Engines are built on first use so importing the app neither loads the database driver nor opens a pool.
+    with _sessionmakers_lock:
+        if url not in _sessionmakers:
+            engine = create_engine(url, future=True, **engine_options(url))
+            _sessionmakers[url] = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+        return _sessionmakers[url]
+
+
+def get_engine(read: bool = False) -> Engine:
+    return _sessionmaker(_replica_url() if read else settings.database_url).kw["bind"]
+
+
+def SessionLocal() -> Session:
+    return _sessionmaker(settings.database_url)()
+
+
+def ReadSessionLocal() -> Session:
+    return _sessionmaker(_replica_url())()
 
 
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 
 def get_session():
@@ -77,3 +207,41 @@ def get_session():
         yield db
     finally:
         db.close()
+
+
+def get_read_session():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+_async_sessionmakers: Dict[str, async_sessionmaker[AsyncSession]] = {}
+
+
+def _async_sessionmaker(url: str) -> async_sessionmaker[AsyncSession]:
+    # Built on first use so the asyncpg driver is only needed when DATABASE_ASYNC is enabled.
+    url = async_database_url(url)
+    if url not in _async_sessionmakers:
+        async_engine = create_async_engine(url, **engine_options(url))
+        _async_sessionmakers[url] = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_sessionmakers[url]
+
+
+async def get_async_session():
+    async with _async_sessionmaker(settings.database_url)() as db:
+        yield db
+
+
+async def get_async_read_session():
+    async with _async_sessionmaker(_replica_url())() as db:
+        yield db
+
+
+async def dispose_async_engines() -> None:
+    makers = list(_async_sessionmakers.values())
+    _async_sessionmakers.clear()
+    for maker in makers:
+        bind: AsyncEngine = maker.kw["bind"]
+        await bind.dispose()
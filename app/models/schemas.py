@@ -66,6 +66,41 @@ class ChallengeItem(BaseModel):
     dedupe_key: str
 
 
+class ExtractedChallenge(BaseModel):
+    title: str
+    summary: str
+    challenge_type: ChallengeType
+    impact_area: List[ImpactArea]
+    severity: Severity
+    time_horizon: TimeHorizon
+    uk_relevance: Relevance
+    eu_relevance: Relevance
+    affected_sectors: List[Sector]
+    evidence_quotes: List[str]
+    confidence: float
+
+
+class ExtractionOutput(BaseModel):
+    items: List[ExtractedChallenge]
+
+
+class PackedExtractedChallenge(ExtractedChallenge):
+    source_url: str
+
+
+class PackedExtractionOutput(BaseModel):
+    items: List[PackedExtractedChallenge]
+
+
+class TriageOutput(BaseModel):
+    relevant: bool
+    score: float
+
+
+class SynthesisOutput(BaseModel):
+    items: List[ChallengeItem]
+
+
 class OutputSchema(BaseModel):
     run_id: str
     scope: dict
@@ -77,6 +112,8 @@ class RunConfig(BaseModel):
     max_items: int = 20
     recency_days: int = 60
     top_n_per_query: int = 5
+    page_budget: Optional[int] = Field(default=None, ge=1)
+    deadline_s: Optional[float] = Field(default=None, gt=0)
     categories: Optional[List[str]] = None
     dry_run: bool = False
 
@@ -92,3 +129,21 @@ class RunStatus(BaseModel):
 class RunCreateResponse(BaseModel):
     run_id: str
     status: str
+    coalesced: bool = False
+
+
+class ScheduleCreate(BaseModel):
+    name: str
+    config: RunConfig = Field(default_factory=RunConfig)
+    interval_minutes: int = Field(ge=1)
+    enabled: bool = True
+
+
+class ScheduleOut(BaseModel):
+    id: int
+    name: str
+    config: RunConfig
+    interval_minutes: int
+    enabled: bool
+    next_run_at: datetime
+    last_run_id: Optional[str] = None
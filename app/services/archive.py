@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import zstandard
+
+from app.core.config import settings
+
+ARCHIVE_NAME = "pages.pack"
+ARTIFACT_KINDS = ("html", "text", "pdf")
+
+_MAGIC = b"TCPACK1\n"
+_FOOTER = struct.Struct("<QQ8s")
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class RunArchive:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            self._file.close()
+            raise ArchiveError(f"Empty archive: {path}") from exc
+        self.index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Tuple[int, int]]:
+        size = len(self._mm)
+        if size < len(_MAGIC) + _FOOTER.size or self._mm[: len(_MAGIC)] != _MAGIC:
+            raise ArchiveError(f"Not a run archive: {self.path}")
+        index_offset, index_length, magic = _FOOTER.unpack(self._mm[size - _FOOTER.size :])
+        if magic != _MAGIC:
+            raise ArchiveError(f"Truncated run archive: {self.path}")
+        raw = zstandard.ZstdDecompressor().decompress(self._mm[index_offset : index_offset + index_length])
+        return {name: (entry[0], entry[1]) for name, entry in json.loads(raw)["entries"].items()}
+
+    def names(self) -> List[str]:
+        return list(self.index)
+
+    def read(self, name: str) -> Optional[bytes]:
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        return zstandard.ZstdDecompressor().decompress(self._mm[offset : offset + length])
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+
+def write_archive(path: Path, members: Iterable[Tuple[str, bytes]], level: int = 10) -> int:
+    compressor = zstandard.ZstdCompressor(level=level, write_content_size=True)
+    # Sorting keeps each kind contiguous, so html and text pages compress and page in as separate columns.
+    ordered = sorted(members, key=lambda member: member[0])
+    entries: Dict[str, List[int]] = {}
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as fh:
+        fh.write(_MAGIC)
+        offset = len(_MAGIC)
+        for name, data in ordered:
+            frame = compressor.compress(data)
+            fh.write(frame)
+            entries[name] = [offset, len(frame), len(data)]
+            offset += len(frame)
+        index = compressor.compress(json.dumps({"version": 1, "entries": entries}).encode("utf-8"))
+        fh.write(index)
+        fh.write(_FOOTER.pack(offset, len(index), _MAGIC))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    _archives.invalidate(path)
+    return len(entries)
+
+
+class _ArchiveHandles:
+    # Handles are reference counted: an evicted or replaced archive is only closed once its last reader is done with it.
+    def __init__(self, max_open: int = 32) -> None:
+        self.max_open = max_open
+        self._open: "OrderedDict[Path, Tuple[int, RunArchive]]" = OrderedDict()
+        self._readers: Dict[RunArchive, int] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, archive: RunArchive) -> bool:
+        cached = self._open.get(archive.path)
+        return cached is not None and cached[1] is archive
+
+    def _retire(self, archive: RunArchive) -> None:
+        if not self._readers.get(archive):
+            archive.close()
+
+    @contextmanager
+    def open(self, path: Path) -> Iterator[Optional[RunArchive]]:
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            yield None
+            return
+        with self._lock:
+            cached = self._open.get(path)
+            if cached and cached[0] == mtime:
+                self._open.move_to_end(path)
+                archive = cached[1]
+            else:
+                archive = RunArchive(path)
+                self._open[path] = (mtime, archive)
+                if cached:
+                    self._retire(cached[1])
+                while len(self._open) > self.max_open:
+                    _, (_, evicted) = self._open.popitem(last=False)
+                    self._retire(evicted)
+            self._readers[archive] = self._readers.get(archive, 0) + 1
+        try:
+            yield archive
+        finally:
+            with self._lock:
+                self._readers[archive] -= 1
+                if not self._readers[archive]:
+                    del self._readers[archive]
+                    if not self._cached(archive):
+                        archive.close()
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            cached = self._open.pop(path, None)
+            if cached:
+                self._retire(cached[1])
+
+
+_archives = _ArchiveHandles()
+
+
+def archive_path(root: Path) -> Path:
+    return root / ARCHIVE_NAME
+
+
+def read_member(root: Path, name: str) -> Optional[bytes]:
+    with _archives.open(archive_path(root)) as archive:
+        if archive is None:
+            return None
+        return archive.read(name)
+
+
+def _loose_files(root: Path) -> List[Path]:
+    files: List[Path] = []
+    for kind in ARTIFACT_KINDS:
+        kind_dir = root / kind
+        if kind_dir.is_dir():
+            files.extend(sorted(p for p in kind_dir.iterdir() if p.is_file()))
+    return files
+
+
+def archive_run(root: Path, keep_files: bool = False) -> int:
+    loose = _loose_files(root)
+    if not loose:
+        return 0
+
+    members: Dict[str, bytes] = {}
+    pack = archive_path(root)
+    with _archives.open(pack) as existing:
+        if existing is not None:
+            for name in existing.names():
+                members[name] = existing.read(name) or b""
+    for path in loose:
+        members[f"{path.parent.name}/{path.name}"] = path.read_bytes()
+
+    count = write_archive(pack, members.items(), level=settings.archive_compression_level)
+    if not keep_files:
+        for path in loose:
+            path.unlink()
+        for kind in ARTIFACT_KINDS:
+            try:
+                (root / kind).rmdir()
+            except OSError:
+                pass
+    return count
+
+
+def migrate(data_dir: Path, run_ids: Optional[List[str]] = None, keep_files: bool = False) -> Dict[str, int]:
+    migrated: Dict[str, int] = {}
+    roots = [data_dir / run_id for run_id in run_ids] if run_ids else sorted(p for p in data_dir.iterdir() if p.is_dir())
+    for root in roots:
+        if not _loose_files(root):
+            continue
+        migrated[root.name] = archive_run(root, keep_files=keep_files)
+    return migrated
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pack run artifacts into per-run zstd archives.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = sub.add_parser("migrate", help="archive loose html/text files of existing run directories")
+    migrate_cmd.add_argument("--data-dir", type=Path, default=settings.data_dir)
+    migrate_cmd.add_argument("--run", action="append", dest="runs", help="run id to migrate (repeatable)")
+    migrate_cmd.add_argument("--keep-files", action="store_true", help="keep loose files after packing")
+    args = parser.parse_args(argv)
+
+    migrated = migrate(args.data_dir, args.runs, keep_files=args.keep_files)
+    for run_id, count in migrated.items():
+        print(f"{run_id}: packed {count} files")
+    print(f"migrated {len(migrated)} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,16 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
 from app.core.config import settings
+from app.services.archive import read_member
 from app.utils.hashing import stable_hash
 
 
 def run_dir(run_id: str) -> Path:
-    root = settings.data_dir / run_id
-    (root / "html").mkdir(parents=True, exist_ok=True)
-    (root / "text").mkdir(parents=True, exist_ok=True)
-    return root
+    # Pure path helpers: directories are created by whatever writes into them, so reads never recreate archived dirs.
+    return settings.data_dir / run_id
 
 
 def html_path(run_id: str, url: str) -> Path:
@@ -21,3 +21,23 @@ def html_path(run_id: str, url: str) -> Path:
 def text_path(run_id: str, url: str) -> Path:
     key = stable_hash(url)
     return run_dir(run_id) / "text" / f"{key}.txt"
+
+
+def pdf_path(run_id: str, url: str) -> Path:
+    key = stable_hash(url)
+    return run_dir(run_id) / "pdf" / f"{key}.pdf"
+
+
+def read_artifact(path: Path) -> Optional[str]:
+    # Loose files win; once a run is archived they only exist inside <run_dir>/pages.pack.
+    if path.exists():
+        return path.read_text(encoding="utf-8")
+    data = read_member(path.parent.parent, f"{path.parent.name}/{path.name}")
+    if data is None:
+        return None
+    return data.decode("utf-8")
+
+
+def write_artifact(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class HedgeDeclined(Exception):
+    # Raised by a backup call that cannot stand in for the primary; the primary's result is awaited instead.
+    pass
+
+
+class Deadline:
+    def __init__(self, budget_s: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.budget_s = budget_s
+        self._clock = clock
+        self._expires_at = clock() + budget_s
+
+    def remaining(self) -> float:
+        return max(self._expires_at - self._clock(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, default: float, floor: float = 1.0) -> float:
+        # Per-call timeouts never outlive the deadline, but a call is always given at least `floor` seconds.
+        return max(min(default, self.remaining()), floor)
+
+    def child(self, reserve_s: float = 0.0) -> "Deadline":
+        # A stage budget: whatever is left of this deadline minus time held back for later stages.
+        return Deadline(max(self.remaining() - reserve_s, 0.0), self._clock)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"budget_s": round(self.budget_s, 3), "remaining_s": round(self.remaining(), 3), "expired": self.expired()}
+
+
+def deadline_stop(retry_state: Any) -> bool:
+    # tenacity stop condition for retried methods whose instance carries a `deadline`.
+    owner = retry_state.args[0] if retry_state.args else None
+    deadline: Optional[Deadline] = getattr(owner, "deadline", None)
+    if deadline is None:
+        return False
+    upcoming = getattr(retry_state, "upcoming_sleep", 0.0) or 0.0
+    return deadline.remaining() <= upcoming
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 256) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def latency_tracker(name: str) -> LatencyTracker:
+    # Shared per process so the p95 learned by one run carries over to the next.
+    with _trackers_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker()
+        return _trackers[name]
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _trackers_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+        return _hedge_pool
+
+
+class Hedger:
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        deadline: Optional[Deadline] = None,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        enabled: bool = True,
+    ) -> None:
+        self.tracker = tracker
+        self.deadline = deadline
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.stats: Counter[str] = Counter()
+
+    def call(self, primary: Callable[[], T], backup: Optional[Callable[[], T]] = None) -> T:
+        started = time.perf_counter()
+        threshold = self.tracker.quantile(self.quantile, self.min_samples) if self.enabled else None
+        if threshold is None:
+            result = primary()
+            self.tracker.record(time.perf_counter() - started)
+            return result
+
+        first = _pool().submit(primary)
+        wait_s = threshold if self.deadline is None else min(threshold, self.deadline.remaining())
+        done, _ = wait([first], timeout=wait_s)
+        if done or (self.deadline is not None and self.deadline.expired()):
+            result = first.result()
+            self.tracker.record(time.perf_counter() - started)
+            return result
+
+        # The primary is past p95: race a duplicate and take whichever succeeds first. The loser runs to completion
+        # in the background; its result is discarded.
+        self.stats["hedged"] += 1
+        second = _pool().submit(backup or primary)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.tracker.record(time.perf_counter() - started)
+                    if future is second:
+                        self.stats["hedge_wins"] += 1
+                    return future.result()
+        return first.result()
@@ -1,21 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
-
-import numpy as np
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
 from app.utils.hashing import dedupe_key
 from app.utils.text import normalize_text
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 @dataclass
 class DedupeResult:
     items: List[Dict[str, Any]]
     duplicates_removed: int
+    embeddings: List[np.ndarray] = field(default_factory=list)
 
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    import numpy as np
+
     denom = (np.linalg.norm(a) * np.linalg.norm(b))
     if denom == 0:
         return 0.0
@@ -27,6 +31,8 @@ def dedupe_items(
     embeddings: List[List[float]],
     threshold: float = 0.86,
 ) -> DedupeResult:
+    import numpy as np
+
     kept: List[Dict[str, Any]] = []
     kept_embeddings: List[np.ndarray] = []
     seen_titles = set()
@@ -58,4 +64,4 @@ def dedupe_items(
         seen_titles.add(title_key)
         seen_keys.add(key)
 
-    return DedupeResult(items=kept, duplicates_removed=duplicates)
+    return DedupeResult(items=kept, duplicates_removed=duplicates, embeddings=kept_embeddings)
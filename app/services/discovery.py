@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlparse
+from xml.etree import ElementTree
+
+import httpx
+
+from app.core.config import settings
+from app.services.fetcher import shared_rate_limiter
+from app.services.search.base import SearchResult
+from app.utils.rate_limit import CircuitOpenError, DomainRateLimiter
+from app.utils.robots import can_fetch
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = "discovery_state.jsonl"
+
+_ENTRY_TAGS = {"item", "entry", "url", "sitemap"}
+_DATE_TAGS = ("lastmod", "updated", "published", "pubDate", "date", "modified")
+
+
+@dataclass
+class FeedEntry:
+    url: str
+    title: Optional[str]
+    lastmod: Optional[datetime]
+    is_sitemap: bool = False
+    # The feed and any parent sitemap index this entry was found through.
+    sources: Tuple[str, ...] = ()
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _entry_link(children: Dict[str, List[ElementTree.Element]]) -> Optional[str]:
+    if "loc" in children:
+        return (children["loc"][0].text or "").strip() or None
+    for link in children.get("link", []):
+        # Atom carries the page in href (rel="alternate" or no rel); RSS carries it as text.
+        if link.get("href") and link.get("rel", "alternate") == "alternate":
+            return link.get("href").strip()
+        if link.text and link.text.strip():
+            return link.text.strip()
+    guid = children.get("guid")
+    if guid and guid[0].get("isPermaLink", "true") == "true" and guid[0].text:
+        return guid[0].text.strip()
+    return None
+
+
+def parse_feed(content: bytes, base_url: str = "") -> List[FeedEntry]:
+    # One walk handles RSS 2.0/1.0, Atom, sitemap urlsets and sitemap indexes by local tag name.
+    root = ElementTree.fromstring(content)
+    entries = []
+    for element in root.iter():
+        name = _local(element.tag)
+        if name not in _ENTRY_TAGS:
+            continue
+        children: Dict[str, List[ElementTree.Element]] = {}
+        for child in element:
+            children.setdefault(_local(child.tag), []).append(child)
+        link = _entry_link(children)
+        if not link:
+            continue
+        title = children["title"][0].text if "title" in children else None
+        lastmod = next((_parse_date(children[tag][0].text) for tag in _DATE_TAGS if tag in children), None)
+        entries.append(
+            FeedEntry(
+                url=urljoin(base_url, link),
+                title=title.strip() if title else None,
+                lastmod=lastmod,
+                is_sitemap=name == "sitemap",
+            )
+        )
+    return entries
+
+
+def configured_feeds() -> List[str]:
+    return [url.strip() for url in settings.discovery_feeds.split(",") if url.strip()]
+
+
+class DiscoveryState:
+    # Append-only JSONL; later lines win on load and the file is compacted once it is mostly superseded lines.
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.feeds: Dict[str, Dict[str, Optional[str]]] = {}
+        self.entries: Dict[str, Optional[str]] = {}
+        self._lines = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                self._lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if "feed" in record:
+            self.feeds[record["feed"]] = {
+                "etag": record.get("etag"),
+                "last_modified": record.get("last_modified"),
+                "lastmod": record.get("lastmod"),
+            }
+        else:
+            self.entries[record["url"]] = record.get("lastmod")
+
+    def append(self, records: Sequence[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        for record in records:
+            self._apply(record)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        live = len(self.feeds) + len(self.entries)
+        if self._lines + len(records) > 4 * live:
+            self._compact()
+            return
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.writelines(json.dumps(record, ensure_ascii=True) + "\n" for record in records)
+        self._lines += len(records)
+
+    def _compact(self) -> None:
+        records = [{"feed": url, **validators} for url, validators in self.feeds.items()]
+        records += [{"url": url, "lastmod": lastmod} for url, lastmod in self.entries.items()]
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            fh.writelines(json.dumps(record, ensure_ascii=True) + "\n" for record in records)
+        os.replace(tmp, self.path)
+        self._lines = len(records)
+
+
+class FeedDiscovery:
+    def __init__(
+        self,
+        feeds: Sequence[str],
+        state: DiscoveryState,
+        max_urls: int = 50,
+        rate_limiter: Optional[DomainRateLimiter] = None,
+    ) -> None:
+        self.feeds = list(feeds)
+        self.state = state
+        self.max_urls = max_urls
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        self.stats: Counter[str] = Counter()
+        self._validators: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_settings(cls) -> "FeedDiscovery":
+        return cls(configured_feeds(), DiscoveryState(settings.data_dir / STATE_NAME), settings.discovery_max_urls)
+
+    def _get(self, client: httpx.Client, url: str) -> Optional[Tuple[httpx.Response, bytes]]:
+        domain = urlparse(url).netloc
+        if not can_fetch(url, settings.user_agent):
+            self.stats["robots_blocked"] += 1
+            return None
+        validators = self.state.feeds.get(url, {})
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        try:
+            self.rate_limiter.wait(domain)
+        except CircuitOpenError:
+            self.stats["circuit_open"] += 1
+            return None
+        recorded = False
+        try:
+            with client.stream("GET", url, headers=headers) as resp:
+                self.rate_limiter.record(domain, status=resp.status_code)
+                recorded = True
+                if resp.status_code == 304:
+                    self.stats["not_modified"] += 1
+                    return None
+                if resp.status_code >= 400:
+                    self.stats["errors"] += 1
+                    return None
+                # Streamed with the fetcher's byte cap; a feed that overruns it is skipped rather than truncated.
+                body = bytearray()
+                for chunk in resp.iter_bytes():
+                    body.extend(chunk)
+                    if len(body) > settings.max_download_bytes:
+                        self.stats["too_large"] += 1
+                        return None
+        except httpx.HTTPError as exc:
+            if not recorded:
+                self.rate_limiter.record(domain, error=True)
+                recorded = True
+            self.stats["errors"] += 1
+            logger.warning("Feed poll failed for %s: %s", url, exc)
+            return None
+        finally:
+            if not recorded:
+                self.rate_limiter.release(domain)
+        self.stats["feeds_polled"] += 1
+        return resp, bytes(body)
+
+    def _poll(
+        self, client: httpx.Client, url: str, lastmod: Optional[datetime], depth: int, parents: Tuple[str, ...] = ()
+    ) -> List[FeedEntry]:
+        fetched = self._get(client, url)
+        if fetched is None:
+            return []
+        resp, body = fetched
+        try:
+            entries = parse_feed(body, base_url=str(resp.url))
+        except ElementTree.ParseError:
+            self.stats["parse_errors"] += 1
+            return []
+        # Validators are only persisted on commit(), so a run that dies mid-way re-reads the feed next time.
+        self._validators[url] = {
+            "feed": url,
+            "etag": resp.headers.get("etag"),
+            "last_modified": resp.headers.get("last-modified"),
+            "lastmod": lastmod.isoformat() if lastmod else None,
+        }
+        sources = (*parents, url)
+        pages = []
+        for entry in entries:
+            if not entry.is_sitemap:
+                entry.sources = sources
+                pages.append(entry)
+                continue
+            known = _parse_date((self.state.feeds.get(entry.url) or {}).get("lastmod"))
+            if depth > 0 and (entry.lastmod is None or known is None or entry.lastmod > known):
+                pages.extend(self._poll(client, entry.url, entry.lastmod, depth - 1, sources))
+            else:
+                self.stats["sitemaps_unchanged"] += 1
+        return pages
+
+    def discover(self, recency_days: int) -> List[SearchResult]:
+        if not self.feeds:
+            return []
+        cutoff = datetime.now(timezone.utc) - timedelta(days=recency_days)
+        headers = {"User-Agent": settings.user_agent}
+        fresh: Dict[str, FeedEntry] = {}
+        with httpx.Client(timeout=settings.request_timeout_s, headers=headers, follow_redirects=True) as client:
+            for feed in self.feeds:
+                for entry in self._poll(client, feed, None, depth=1):
+                    self.stats["entries"] += 1
+                    if entry.lastmod is not None and entry.lastmod < cutoff:
+                        self.stats["too_old"] += 1
+                        continue
+                    if entry.url in self.state.entries:
+                        known = _parse_date(self.state.entries[entry.url])
+                        if entry.lastmod is None or (known is not None and entry.lastmod <= known):
+                            self.stats["unchanged"] += 1
+                            continue
+                        self.stats["updated"] += 1
+                    else:
+                        self.stats["new"] += 1
+                    fresh.setdefault(entry.url, entry)
+
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        ranked = sorted(fresh.values(), key=lambda e: e.lastmod or oldest, reverse=True)
+        selected, overflow = ranked[: self.max_urls], ranked[self.max_urls :]
+        self.stats["selected"] = len(selected)
+        # Entries cut by max_urls are not recorded as seen. The validators of every feed they came through are
+        # withheld too, so the next run gets a full response instead of a 304 and picks them up then.
+        withheld = {source for entry in overflow for source in entry.sources}
+        for url in withheld:
+            self._validators.pop(url, None)
+        self.stats["overflow"] = len(overflow)
+        self.stats["feeds_withheld"] = len(withheld)
+        self._pending.extend(
+            {"url": entry.url, "lastmod": entry.lastmod.isoformat() if entry.lastmod else None} for entry in selected
+        )
+        return [SearchResult(title=entry.title or "", url=entry.url, source="feed") for entry in selected]
+
+    def commit(self) -> None:
+        pending = [*self._validators.values(), *self._pending]
+        self._validators, self._pending = {}, []
+        self.state.append(pending)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.db import Challenge, Run
+from app.services.report import to_markdown_stream
+from app.utils.serialization import dumps
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "md": ("text/markdown", "md"),
+}
+
+EXPORT_COLUMNS = [
+    "run_id",
+    "run_created_at",
+    "title",
+    "summary",
+    "challenge_type",
+    "impact_area",
+    "severity",
+    "time_horizon",
+    "uk_relevance",
+    "eu_relevance",
+    "affected_sectors",
+    "evidence",
+    "confidence",
+    "dedupe_key",
+]
+
+_LIST_COLUMNS = {"impact_area", "affected_sectors"}
+
+
+@dataclass
+class ExportFilters:
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    run_ids: List[str] = field(default_factory=list)
+    challenge_type: Optional[str] = None
+    severity: Optional[str] = None
+    min_confidence: Optional[float] = None
+
+
+def export_statement(filters: ExportFilters):
+    # Plain columns rather than ORM entities, so streamed rows never enter the session identity map.
+    stmt = (
+        select(
+            Challenge.run_id,
+            Run.created_at.label("run_created_at"),
+            Challenge.title,
+            Challenge.summary,
+            Challenge.challenge_type,
+            Challenge.impact_area,
+            Challenge.severity,
+            Challenge.time_horizon,
+            Challenge.uk_relevance,
+            Challenge.eu_relevance,
+            Challenge.affected_sectors,
+            Challenge.evidence,
+            Challenge.confidence,
+            Challenge.dedupe_key,
+        )
+        .join(Run, Run.id == Challenge.run_id)
+        .where(Run.status == "completed")
+    )
+    if filters.since is not None:
+        stmt = stmt.where(Run.created_at >= filters.since)
+    if filters.until is not None:
+        stmt = stmt.where(Run.created_at < filters.until)
+    if filters.run_ids:
+        stmt = stmt.where(Challenge.run_id.in_(filters.run_ids))
+    if filters.challenge_type:
+        stmt = stmt.where(Challenge.challenge_type == filters.challenge_type)
+    if filters.severity:
+        stmt = stmt.where(Challenge.severity == filters.severity)
+    if filters.min_confidence is not None:
+        stmt = stmt.where(Challenge.confidence >= filters.min_confidence)
+    return stmt.order_by(Run.created_at, Challenge.run_id, Challenge.id)
+
+
+def iter_row_chunks(
+    session_factory: Callable[[], Session], filters: ExportFilters, chunk_size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    # The session is opened here, inside the response generator, because request-scoped
+    # dependencies are torn down before a StreamingResponse body is sent.
+    db = session_factory()
+    try:
+        result = db.execute(export_statement(filters).execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield [dict(row._mapping) for row in partition]
+    finally:
+        db.close()
+
+
+def iter_csv(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for rows in chunks:
+        for row in rows:
+            writer.writerow(
+                {
+                    **row,
+                    **{key: "|".join(row[key] or []) for key in _LIST_COLUMNS},
+                    "evidence": dumps(row["evidence"] or []).decode("utf-8"),
+                }
+            )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def iter_parquet(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    # pyarrow is only imported for Parquet exports; one row group is written per DB chunk.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("run_id", pa.string()),
+            ("run_created_at", pa.timestamp("us")),
+            ("title", pa.string()),
+            ("summary", pa.string()),
+            ("challenge_type", pa.string()),
+            ("impact_area", pa.list_(pa.string())),
+            ("severity", pa.string()),
+            ("time_horizon", pa.string()),
+            ("uk_relevance", pa.string()),
+            ("eu_relevance", pa.string()),
+            ("affected_sectors", pa.list_(pa.string())),
+            ("evidence", pa.string()),
+            ("confidence", pa.float64()),
+            ("dedupe_key", pa.string()),
+        ]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        for rows in chunks:
+            columns = {name: [row[name] for row in rows] for name in EXPORT_COLUMNS}
+            columns["evidence"] = [dumps(value or []).decode("utf-8") for value in columns["evidence"]]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_markdown(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    rows = (row for chunk in chunks for row in chunk)
+    runs = (
+        {"run_id": run_id, "items": items}
+        for run_id, items in groupby(rows, key=lambda row: row["run_id"])
+    )
+    for part in to_markdown_stream(runs):
+        yield part.encode("utf-8")
+
+
+WRITERS: Dict[str, Callable[[Iterable[List[Dict[str, Any]]]], Iterator[bytes]]] = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+    "parquet": iter_parquet,
+    "md": iter_markdown,
+}
+
+
+def stream_export(
+    session_factory: Callable[[], Session], filters: ExportFilters, fmt: str, chunk_size: int = 1000
+) -> Iterator[bytes]:
+    yield from WRITERS[fmt](iter_row_chunks(session_factory, filters, chunk_size))
@@ -1,19 +1,33 @@
 from __future__ import annotations
 
+import codecs
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
 from dataclasses import dataclass
-from typing import Optional
+from pathlib import Path
+from typing import Iterator, List, Optional
 from urllib.parse import urlparse
 
 import httpx
-import trafilatura
-from bs4 import BeautifulSoup
-from readability import Document
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import RetryError, retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
-from app.services.cache import html_path, text_path
-from app.utils.rate_limit import DomainRateLimiter
-from app.utils.robots import can_fetch
+from app.services.cache import html_path, pdf_path, read_artifact, text_path, write_artifact
+from app.services.deadline import Deadline, HedgeDeclined, Hedger, deadline_stop
+from app.services.metrics import FETCH_BYTES, FETCH_RESPONSES, StageTimer, count_retry, record_cache
+from app.services.pdf import pdf_extractor
+from app.utils.rate_limit import CircuitOpenError, DomainRateLimiter, parse_retry_after
+from app.utils.robots import can_fetch, crawl_delay
+
+
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+PDF_CONTENT_TYPES = {"application/pdf", "application/x-pdf"}
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
 
 
 @dataclass
@@ -21,13 +35,68 @@ class FetchResult:
     url: str
     html: Optional[str]
     text: Optional[str]
+    content_type: Optional[str] = None
+
+
+def _detect_encoding(declared: Optional[str], head: bytes) -> str:
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    candidates = [declared]
+    match = _META_CHARSET.search(head[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii", "ignore"))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def _part_path(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".part")
+
+
+_shared_rate_limiter: Optional[DomainRateLimiter] = None
+
+
+def shared_rate_limiter() -> DomainRateLimiter:
+    # One limiter per process so concurrent runs share per-domain pacing and circuit state.
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        _shared_rate_limiter = DomainRateLimiter(
+            settings.rate_limit_per_domain_s,
+            floor_interval_s=settings.rate_limit_min_interval_s,
+            max_interval_s=settings.rate_limit_max_interval_s,
+            target_latency_s=settings.rate_limit_target_latency_s,
+            failure_threshold=settings.circuit_failure_threshold,
+            cooldown_s=settings.circuit_cooldown_s,
+        )
+    return _shared_rate_limiter
 
 
 class PageFetcher:
-    def __init__(self) -> None:
-        self.rate_limiter = DomainRateLimiter(settings.rate_limit_per_domain_s)
+    def __init__(
+        self,
+        timer: Optional[StageTimer] = None,
+        rate_limiter: Optional[DomainRateLimiter] = None,
+        deadline: Optional[Deadline] = None,
+        hedger: Optional[Hedger] = None,
+    ) -> None:
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        self.timer = timer or StageTimer()
+        self.deadline = deadline
+        self.hedger = hedger
+        self.stats: Counter[str] = Counter()
 
     def _extract_text(self, html: str) -> Optional[str]:
+        import trafilatura
+        from bs4 import BeautifulSoup
+        from readability import Document
+
         text = trafilatura.extract(html)
         if text:
             return text
@@ -40,39 +109,186 @@ class PageFetcher:
             soup = BeautifulSoup(html, "html.parser")
             return soup.get_text("\n", strip=True)
 
-    @retry(stop=stop_after_attempt(settings.max_retries), wait=wait_exponential(min=1, max=10))
-    def fetch(self, url: str) -> FetchResult:
-        domain = urlparse(url).netloc
-        self.rate_limiter.wait(domain)
+    def _extract_pdf(self, path: Path) -> Optional[str]:
+        with self.timer.stage("pdf"):
+            try:
+                text = pdf_extractor().extract(path, settings.pdf_max_pages, settings.pdf_token_budget * 4)
+            except multiprocessing.TimeoutError:
+                self.stats["pdf_timeouts"] += 1
+                return None
+        self.stats["pdf_extracted" if text else "pdf_empty"] += 1
+        return text
+
+    def _iter_capped(self, resp: httpx.Response, limit: Optional[int] = None) -> Iterator[bytes]:
+        limit = settings.max_download_bytes if limit is None else limit
+        received = 0
+        for chunk in resp.iter_bytes():
+            received += len(chunk)
+            FETCH_BYTES.inc(len(chunk))
+            self.stats["bytes"] += len(chunk)
+            if received > limit:
+                self.stats["truncated"] += 1
+                yield chunk[: len(chunk) - (received - limit)]
+                return
+            yield chunk
+
+    def _stream_html(self, resp: httpx.Response, dest: Optional[Path]) -> str:
+        decoder = None
+        parts: List[str] = []
+        if dest:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+        out = open(_part_path(dest), "w", encoding="utf-8", newline="") if dest else None
+        try:
+            for chunk in self._iter_capped(resp):
+                if decoder is None:
+                    encoding = _detect_encoding(resp.charset_encoding, chunk)
+                    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                piece = decoder.decode(chunk)
+                parts.append(piece)
+                if out:
+                    out.write(piece)
+            if decoder is not None:
+                tail = decoder.decode(b"", final=True)
+                parts.append(tail)
+                if out:
+                    out.write(tail)
+        except BaseException:
+            if out:
+                out.close()
+                _part_path(dest).unlink(missing_ok=True)
+            raise
+        if out:
+            out.close()
+            os.replace(_part_path(dest), dest)
+        return "".join(parts)
 
+    def _stream_pdf(self, resp: httpx.Response, dest: Path) -> bool:
+        written = 0
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(_part_path(dest), "wb") as out:
+                # One byte past the cap tells a PDF of exactly MAX_DOWNLOAD_BYTES, which is kept, from a longer one.
+                for chunk in self._iter_capped(resp, settings.max_download_bytes + 1):
+                    out.write(chunk)
+                    written += len(chunk)
+            if written > settings.max_download_bytes:
+                # A cut-off PDF cannot be parsed; drop it rather than cache a broken file.
+                _part_path(dest).unlink(missing_ok=True)
+                return False
+        except BaseException:
+            _part_path(dest).unlink(missing_ok=True)
+            raise
+        os.replace(_part_path(dest), dest)
+        return True
+
+    @retry(
+        stop=stop_after_attempt(settings.max_retries) | deadline_stop,
+        wait=wait_exponential(min=1, max=10),
+        retry=retry_if_not_exception_type(CircuitOpenError),
+        before_sleep=count_retry("fetch"),
+    )
+    def fetch(self, url: str, html_dest: Optional[Path] = None, pdf_dest: Optional[Path] = None) -> FetchResult:
+        domain = urlparse(url).netloc
+        # Robots is checked before reserving a slot: a denial never reaches the domain, so there is nothing to record.
         if not can_fetch(url, settings.user_agent):
+            self.stats["robots_blocked"] += 1
             return FetchResult(url=url, html=None, text=None)
+        self.rate_limiter.set_crawl_delay(domain, crawl_delay(url, settings.user_agent))
+        self.rate_limiter.wait(domain)
 
         headers = {"User-Agent": settings.user_agent}
-        with httpx.Client(timeout=settings.request_timeout_s, headers=headers, follow_redirects=True) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
-            html = resp.text
+        timeout = self.deadline.timeout(settings.request_timeout_s) if self.deadline else settings.request_timeout_s
+        recorded = False
+        try:
+            with self.timer.stage("fetch"):
+                with httpx.Client(timeout=timeout, headers=headers, follow_redirects=True) as client:
+                    started = time.perf_counter()
+                    try:
+                        with client.stream("GET", url) as resp:
+                            self.rate_limiter.record(
+                                domain,
+                                latency_s=time.perf_counter() - started,
+                                status=resp.status_code,
+                                retry_after_s=parse_retry_after(resp.headers.get("retry-after")),
+                            )
+                            recorded = True
+                            FETCH_RESPONSES.labels(str(resp.status_code)).inc()
+                            resp.raise_for_status()
 
-        text = self._extract_text(html)
-        return FetchResult(url=url, html=html, text=text)
+                            content_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+                            if content_type and content_type not in HTML_CONTENT_TYPES | PDF_CONTENT_TYPES:
+                                self.stats["rejected_content_type"] += 1
+                                return FetchResult(url=url, html=None, text=None, content_type=content_type)
+                            declared = resp.headers.get("content-length", "")
+                            if declared.isdigit() and int(declared) > settings.max_download_bytes:
+                                self.stats["rejected_too_large"] += 1
+                                return FetchResult(url=url, html=None, text=None, content_type=content_type)
+
+                            if content_type in PDF_CONTENT_TYPES:
+                                if pdf_dest is None:
+                                    # A hedged duplicate has nowhere to store the body and will decline; nothing to count.
+                                    return FetchResult(url=url, html=None, text=None, content_type=content_type)
+                                stored = self._stream_pdf(resp, pdf_dest)
+                                self.stats["pdfs" if stored else "rejected_too_large"] += 1
+                                return FetchResult(url=url, html=None, text=None, content_type=content_type)
+                            html = self._stream_html(resp, html_dest)
+                    except httpx.TransportError:
+                        self.rate_limiter.record(domain, error=True)
+                        recorded = True
+                        raise
+        finally:
+            if not recorded:
+                self.rate_limiter.release(domain)
+        self.stats["pages"] += 1
+
+        with self.timer.stage("parse"):
+            text = self._extract_text(html)
+        return FetchResult(url=url, html=html, text=text, content_type=content_type or "text/html")
+
+    def _hedge_fetch(self, url: str, h_path: Path) -> FetchResult:
+        # The duplicate writes no artifacts while the primary may still be streaming to the same files.
+        result = self.fetch(url)
+        if result.content_type in PDF_CONTENT_TYPES:
+            raise HedgeDeclined(url)
+        if result.html and not h_path.exists():
+            write_artifact(h_path, result.html)
+        return result
 
     def fetch_with_cache(self, run_id: str, url: str, dry_run: bool = False) -> FetchResult:
         h_path = html_path(run_id, url)
         t_path = text_path(run_id, url)
 
         if dry_run:
-            if t_path.exists() and h_path.exists():
-                return FetchResult(
-                    url=url,
-                    html=h_path.read_text(encoding="utf-8"),
-                    text=t_path.read_text(encoding="utf-8"),
-                )
+            html = read_artifact(h_path)
+            text = read_artifact(t_path)
+            # PDFs only leave extracted text behind, so text alone counts as a cached page.
+            hit = text is not None
+            record_cache("page", hit)
+            self.stats["cache_hits" if hit else "cache_misses"] += 1
+            if hit:
+                return FetchResult(url=url, html=html, text=text)
             return FetchResult(url=url, html=None, text=None)
 
-        result = self.fetch(url)
-        if result.html:
-            h_path.write_text(result.html, encoding="utf-8")
+        if self.deadline is not None and self.deadline.expired():
+            self.stats["deadline_skipped"] += 1
+            return FetchResult(url=url, html=None, text=None)
+
+        p_path = pdf_path(run_id, url)
+        try:
+            if self.hedger is not None:
+                result = self.hedger.call(
+                    lambda: self.fetch(url, html_dest=h_path, pdf_dest=p_path), lambda: self._hedge_fetch(url, h_path)
+                )
+            else:
+                result = self.fetch(url, html_dest=h_path, pdf_dest=p_path)
+        except CircuitOpenError:
+            self.stats["circuit_open"] += 1
+            return FetchResult(url=url, html=None, text=None)
+        except (RetryError, httpx.HTTPError):
+            self.stats["errors"] += 1
+            return FetchResult(url=url, html=None, text=None)
+        if result.content_type in PDF_CONTENT_TYPES and p_path.exists():
+            result.text = self._extract_pdf(p_path)
         if result.text:
-            t_path.write_text(result.text, encoding="utf-8")
+            write_artifact(t_path, result.text)
         return result
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.services.openai_client import extraction_version
+from app.utils.filelock import locked_file
+from app.utils.text import normalize_text
+
+FINGERPRINT_BITS = 64
+INDEX_NAME = "fingerprints.jsonl"
+
+
+def shingles(text: str, size: int = 4) -> List[str]:
+    words = normalize_text(text).split()
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(features: List[str]) -> int:
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class Fingerprint:
+    url: str
+    value: int
+    cluster: str
+    run_id: str
+    seen: float = 0.0
+
+
+class FingerprintIndex:
+    # Banded LSH: with max_distance < bands, two fingerprints within range share at least one exact band.
+    def __init__(
+        self,
+        path: Path,
+        max_distance: int = 7,
+        bands: int = 8,
+        ttl_days: Optional[float] = None,
+        version: str = "",
+        now: Optional[float] = None,
+    ) -> None:
+        if max_distance >= bands:
+            raise ValueError("max_distance must be smaller than the number of bands")
+        self.path = path
+        self.max_distance = max_distance
+        self.bands = bands
+        self.ttl_s = ttl_days * 86400 if ttl_days else None
+        self.version = version
+        self._band_bits = FINGERPRINT_BITS // bands
+        self._buckets: Dict[tuple[int, int], List[Fingerprint]] = defaultdict(list)
+        self._by_url: Dict[str, Fingerprint] = {}
+        self._extractions: Dict[str, Dict[str, Any]] = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._lock_path = path.with_name(path.name + ".lock")
+        self._load(time.time() if now is None else now)
+
+    @classmethod
+    def from_settings(cls, compact: bool = True) -> "FingerprintIndex":
+        index = cls(
+            settings.data_dir / INDEX_NAME,
+            settings.near_dup_max_distance,
+            ttl_days=settings.near_dup_ttl_days,
+            version=extraction_version(),
+        )
+        # Rewrites the file once dead lines outnumber live ones, so a run never loads more than about twice the live set.
+        if compact and index._lines > max(2 * index.live_records(), 1000):
+            index.compact()
+        return index
+
+    def _bands(self, value: int) -> List[tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(band, value >> (band * self._band_bits) & mask) for band in range(self.bands)]
+
+    def _expired(self, seen: float, now: float) -> bool:
+        return self.ttl_s is not None and now - seen > self.ttl_s
+
+    def _load(self, now: float) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                self._lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append is skipped, not fatal.
+                    continue
+                seen = record.get("seen", 0.0)
+                if self._expired(seen, now):
+                    continue
+                if "extraction" in record:
+                    if record.get("version", "") == self.version:
+                        self._extractions[record["cluster"]] = {**record, "seen": seen}
+                    continue
+                self._insert(Fingerprint(record["url"], int(record["fp"], 16), record["cluster"], record["run_id"], seen))
+
+    def _insert(self, entry: Fingerprint) -> None:
+        previous = self._by_url.get(entry.url)
+        if previous is not None:
+            for key in self._bands(previous.value):
+                self._buckets[key].remove(previous)
+        self._by_url[entry.url] = entry
+        for key in self._bands(entry.value):
+            self._buckets[key].append(entry)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with locked_file(self._lock_path, self._lock), self.path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, ensure_ascii=True) + "\n")
+        self._lines += 1
+
+    def __len__(self) -> int:
+        return len(self._by_url)
+
+    def live_records(self) -> int:
+        return len(self._by_url) + len(self._extractions)
+
+    def lookup(self, value: int) -> Optional[Fingerprint]:
+        best: Optional[Fingerprint] = None
+        best_distance = self.max_distance + 1
+        with self._lock:
+            for key in self._bands(value):
+                for entry in self._buckets.get(key, ()):
+                    distance = hamming(value, entry.value)
+                    if distance < best_distance:
+                        best, best_distance = entry, distance
+        return best
+
+    def add(self, url: str, value: int, cluster: str, run_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            existing = self._by_url.get(url)
+            # An unchanged page is only re-recorded once it is halfway to expiry, to keep it alive without a line per run.
+            if existing is not None and existing.value == value:
+                if self.ttl_s is None or now - existing.seen < self.ttl_s / 2:
+                    return
+            self._insert(Fingerprint(url, value, cluster, run_id, now))
+        self._append({"url": url, "fp": f"{value:016x}", "cluster": cluster, "run_id": run_id, "seen": now})
+
+    def extraction(self, cluster: str) -> Optional[Dict[str, Any]]:
+        record = self._extractions.get(cluster)
+        return record["extraction"] if record is not None else None
+
+    def store_extraction(self, cluster: str, extraction: Dict[str, Any]) -> None:
+        record = {"cluster": cluster, "version": self.version, "extraction": extraction, "seen": time.time()}
+        with self._lock:
+            self._extractions[cluster] = record
+        self._append(record)
+
+    def compact(self, drop_runs: Iterable[str] = (), now: Optional[float] = None, dry_run: bool = False) -> int:
+        # Re-reads the file under the lock so lines appended by other processes since this index loaded are kept.
+        drop = set(drop_runs)
+        with locked_file(self._lock_path, self._lock):
+            fresh = FingerprintIndex(self.path, self.max_distance, self.bands, None, self.version)
+            now = time.time() if now is None else now
+            entries = [
+                entry for entry in fresh._by_url.values() if entry.run_id not in drop and not self._expired(entry.seen, now)
+            ]
+            clusters = {entry.cluster for entry in entries}
+            extractions = [
+                record
+                for cluster, record in fresh._extractions.items()
+                if cluster in clusters and not self._expired(record["seen"], now)
+            ]
+            removed = fresh._lines - len(entries) - len(extractions)
+            if dry_run:
+                return removed
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as fh:
+                for entry in entries:
+                    record = {"url": entry.url, "fp": f"{entry.value:016x}", "cluster": entry.cluster, "run_id": entry.run_id}
+                    fh.write(json.dumps({**record, "seen": entry.seen}, ensure_ascii=True) + "\n")
+                for record in extractions:
+                    fh.write(json.dumps(record, ensure_ascii=True) + "\n")
+            os.replace(tmp, self.path)
+            self._buckets.clear()
+            self._by_url.clear()
+            for entry in entries:
+                self._insert(entry)
+            self._extractions = {record["cluster"]: record for record in extractions}
+            self._lines = len(entries) + len(extractions)
+        return removed
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, DefaultDict, Dict, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Time spent per pipeline stage call",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+FETCH_BYTES = Counter("fetch_bytes_total", "Bytes downloaded by the page fetcher")
+FETCH_RESPONSES = Counter("fetch_responses_total", "HTTP responses seen by the page fetcher", ["status"])
+RETRIES = Counter("retries_total", "Retry attempts scheduled by tenacity", ["operation"])
+RATE_LIMITED = Counter("rate_limited_total", "HTTP 429 responses received", ["operation"])
+LLM_SECONDS = Histogram(
+    "llm_call_seconds",
+    "Latency of individual OpenAI API calls",
+    ["operation"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+)
+LLM_CALLS = Counter("llm_calls_total", "OpenAI API calls", ["operation", "model"])
+LLM_TOKENS = Counter("llm_tokens_total", "OpenAI tokens consumed", ["operation", "kind"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+RUNS = Counter("runs_total", "Pipeline runs by final status", ["status"])
+RUNS_IN_PROGRESS = Gauge("runs_in_progress", "Pipeline runs currently executing")
+
+
+class StageTimer:
+    # Fetch workers time their stages concurrently. timings holds wall-clock time during which at least one thread
+    # was in the stage; cumulative sums every thread's time, so it can exceed wall time.
+    def __init__(self) -> None:
+        self.timings: DefaultDict[str, float] = defaultdict(float)
+        self.cumulative: DefaultDict[str, float] = defaultdict(float)
+        self._active: DefaultDict[str, int] = defaultdict(int)
+        self._since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        with self._lock:
+            if not self._active[name]:
+                self._since[name] = start
+            self._active[name] += 1
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            STAGE_SECONDS.labels(name).observe(end - start)
+            with self._lock:
+                self.cumulative[name] += end - start
+                self._active[name] -= 1
+                if not self._active[name]:
+                    self.timings[name] += end - self._since.pop(name)
+
+    def as_stats(self) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in self.timings.items()}
+
+    def as_cumulative_stats(self) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in self.cumulative.items()}
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _status_code(exc: BaseException | None) -> int | None:
+    if exc is None:
+        return None
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def count_retry(operation: str) -> Callable[[Any], None]:
+    def before_sleep(retry_state: Any) -> None:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        rate_limited = _status_code(exc) == 429
+        RETRIES.labels(operation).inc()
+        if rate_limited:
+            RATE_LIMITED.labels(operation).inc()
+        # Retried methods belong to per-run client instances; mirror the counts into their stats.
+        stats = getattr(retry_state.args[0], "stats", None) if retry_state.args else None
+        if isinstance(stats, dict):
+            stats[f"{operation}_retries"] = stats.get(f"{operation}_retries", 0) + 1
+            if rate_limited:
+                stats[f"{operation}_429s"] = stats.get(f"{operation}_429s", 0) + 1
+
+    return before_sleep
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
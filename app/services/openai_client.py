@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import Any, Dict, List, Optional
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
 
-from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
+from pydantic import BaseModel
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
+from app.models.schemas import ExtractionOutput, PackedExtractionOutput, SynthesisOutput, TriageOutput
+from app.services.deadline import Deadline, deadline_stop
+from app.services.metrics import LLM_CALLS, LLM_SECONDS, LLM_TOKENS, count_retry
+from app.services.packing import PackDocument, estimate_tokens
+from app.utils.jsonparse import lenient_loads
+from app.utils.serialization import dumps
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 
 EXTRACTION_PROMPT = """
@@ -49,6 +61,69 @@ TEXT END
 """.strip()
 
 
+PACKED_EXTRACTION_PROMPT = """
+You are an information extraction model. You receive several short documents, each with its own URL, title and date header. Extract DISTINCT trade challenges relevant to the UK and/or EU from each document separately. Output ONLY JSON.
+
+Rules:
+- Treat every document independently. Never combine facts or quotes from different documents into one item.
+- Set "source_url" on every item to the exact URL from the header of the document it came from.
+- Only include challenges supported by the text. Do not guess.
+- Each challenge must clearly connect to UK/EU trade (direct or indirect).
+- Provide 1-3 short evidence quotes (<=25 words each) from that document's text that support the challenge.
+- Do not include personal data.
+- Documents that are not about trade challenges contribute no items. If none are, return {"items":[]}.
+
+Output JSON format:
+{
+  "items":[
+    {
+      "source_url":"<URL of the document>",
+      "title":"...",
+      "summary":"2-4 neutral sentences",
+      "challenge_type":"Regulatory|Logistics|Geopolitics|Tariffs|Sanctions|Customs|FX/Payments|Energy|SupplyChain|ESG/CBAM|Tech/ExportControls|Labor|Maritime|Insurance|Other",
+      "impact_area":["imports","exports","transit","services_trade","manufacturing"],
+      "severity":"low|medium|high",
+      "time_horizon":"now|0-3m|3-12m|12m+",
+      "uk_relevance":"direct|indirect",
+      "eu_relevance":"direct|indirect",
+      "affected_sectors":["automotive","agri-food","steel","chemicals","pharma","electronics","energy","shipping","retail","other"],
+      "evidence_quotes":["...","..."],
+      "confidence":0.0
+    }
+  ]
+}
+
+{{DOCUMENTS}}
+""".strip()
+
+
+PACKED_DOCUMENT_TEMPLATE = """
+=== DOCUMENT {{INDEX}} ===
+URL: {{URL}}
+Title: {{TITLE}}
+Published_at: {{PUBLISHED_AT_OR_NULL}}
+TEXT START
+{{ARTICLE_TEXT}}
+TEXT END
+""".strip()
+
+
+TRIAGE_PROMPT = """
+You are a relevance classifier. Decide whether the page below describes a current trade challenge affecting the UK and/or EU (tariffs, sanctions, customs, logistics, export controls, regulation, supply disruption). Output ONLY JSON.
+
+Schema:
+{"relevant": true|false, "score": 0.0}
+
+score is your confidence from 0.0 to 1.0 that the page is relevant.
+
+Title: {{TITLE}}
+
+TEXT START
+{{ARTICLE_TEXT}}
+TEXT END
+""".strip()
+
+
 SYNTHESIS_PROMPT = """
 You are a synthesis model. You receive many extracted challenge candidates from multiple sources. Your job is to:
 - Merge duplicates and near-duplicates.
@@ -88,11 +163,72 @@ Input candidates JSON:
 """.strip()
 
 
+_STRICT_SCHEMA_KEYS = {"type", "items", "enum", "anyOf", "$ref", "description", "const"}
+
+
+def openai_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    # Strict structured outputs need every property required, no extra keys, and no defaults/formats/length limits.
+    def convert(node: Any) -> Any:
+        if isinstance(node, list):
+            return [convert(child) for child in node]
+        if not isinstance(node, dict):
+            return node
+        out: Dict[str, Any] = {}
+        for key, value in node.items():
+            if key in ("properties", "$defs"):
+                out[key] = {name: convert(child) for name, child in value.items()}
+            elif key in _STRICT_SCHEMA_KEYS:
+                out[key] = convert(value)
+        if out.get("type") == "object":
+            out["required"] = list(out.get("properties", {}))
+            out["additionalProperties"] = False
+        return out
+
+    return convert(model.model_json_schema())
+
+
+ResponseFormat = Tuple[str, Dict[str, Any]]
+
+EXTRACTION_PROMPT_OVERHEAD_TOKENS = estimate_tokens(EXTRACTION_PROMPT)
+
+EXTRACTION_FORMAT: ResponseFormat = ("challenge_extraction", openai_json_schema(ExtractionOutput))
+PACKED_EXTRACTION_FORMAT: ResponseFormat = ("packed_challenge_extraction", openai_json_schema(PackedExtractionOutput))
+SYNTHESIS_FORMAT: ResponseFormat = ("challenge_synthesis", openai_json_schema(SynthesisOutput))
+TRIAGE_FORMAT: ResponseFormat = ("page_triage", openai_json_schema(TriageOutput))
+
+
+def extraction_version(model: Optional[str] = None) -> str:
+    # Changes whenever the extraction model, prompts or schema do, so stored extractions from older setups are not reused.
+    digest = hashlib.blake2b(digest_size=8)
+    for part in (model or settings.openai_model, EXTRACTION_PROMPT, PACKED_EXTRACTION_PROMPT, dumps(EXTRACTION_FORMAT)):
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class JSONRepairError(ValueError):
+    pass
+
+
 class OpenAIClient:
     def __init__(self) -> None:
         if not settings.openai_api_key:
             raise ValueError("OPENAI_API_KEY is required")
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self._client: Optional[OpenAI] = None
+        self.deadline: Optional[Deadline] = None
+        self.stats: Counter[str] = Counter()
+
+    @property
+    def client(self) -> OpenAI:
+        # The SDK is the slowest import in the service, so it is loaded on the first call rather than at startup.
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=settings.openai_api_key)
+        return self._client
+
+    @client.setter
+    def client(self, client: OpenAI) -> None:
+        self._client = client
 
     def _extract_text(self, response: Any) -> str:
         if hasattr(response, "output_text"):
@@ -105,48 +241,201 @@ class OpenAIClient:
             except Exception:
                 return ""
 
-    def _create_response(self, prompt: str) -> Any:
+    def _record_usage(self, operation: str, model: str, response: Any, started: float) -> None:
+        LLM_SECONDS.labels(operation).observe(time.perf_counter() - started)
+        LLM_CALLS.labels(operation, model).inc()
+        self.stats[f"{operation}_calls"] += 1
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        tokens = {
+            "input": getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None) or 0,
+            "output": getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", None) or 0,
+        }
+        for kind, count in tokens.items():
+            if count:
+                LLM_TOKENS.labels(operation, kind).inc(count)
+                self.stats[f"{kind}_tokens"] += count
+
+    def _create_response(
+        self,
+        prompt: str,
+        operation: str = "completion",
+        response_format: Optional[ResponseFormat] = None,
+        model: Optional[str] = None,
+    ) -> Any:
+        model = model or settings.openai_model
+        started = time.perf_counter()
+        structured = response_format if settings.openai_structured_outputs else None
+        # Bound the SDK's own timeout by the run deadline; synthesis is always given at least LLM_MIN_TIMEOUT_S.
+        options: Dict[str, Any] = {}
+        if self.deadline is not None:
+            options["timeout"] = self.deadline.timeout(settings.llm_timeout_s, floor=settings.llm_min_timeout_s)
         if hasattr(self.client, "responses"):
-            return self.client.responses.create(
-                model=settings.openai_model,
+            kwargs: Dict[str, Any] = dict(options)
+            if structured:
+                name, schema = structured
+                kwargs["text"] = {"format": {"type": "json_schema", "name": name, "schema": schema, "strict": True}}
+            response = self.client.responses.create(
+                model=model,
                 input=prompt,
                 temperature=0,
+                **kwargs,
             )
-        return self.client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-        )
+        else:
+            kwargs = dict(options)
+            if structured:
+                name, schema = structured
+                kwargs["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {"name": name, "schema": schema, "strict": True},
+                }
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                **kwargs,
+            )
+        self._record_usage(operation, model, response, started)
+        return response
 
-    @retry(stop=stop_after_attempt(settings.max_retries), wait=wait_exponential(min=1, max=10))
+    @retry(
+        stop=stop_after_attempt(settings.max_retries) | deadline_stop,
+        wait=wait_exponential(min=1, max=10),
+        retry=retry_if_not_exception_type(JSONRepairError),
+        before_sleep=count_retry("extraction"),
+    )
     def extract_candidates(self, text: str, url: str, title: str, published_at: Optional[str]) -> Dict[str, Any]:
         prompt = EXTRACTION_PROMPT.replace("{{URL}}", url).replace("{{TITLE}}", title).replace(
             "{{PUBLISHED_AT_OR_NULL}}", published_at or "null"
         ).replace("{{ARTICLE_TEXT}}", text)
 
-        response = self._create_response(prompt)
+        response = self._create_response(prompt, "extraction", EXTRACTION_FORMAT)
         raw = self._extract_text(response)
-        return self._load_json(raw)
+        return self._load_json(raw, EXTRACTION_FORMAT)
+
+    @retry(
+        stop=stop_after_attempt(settings.max_retries) | deadline_stop,
+        wait=wait_exponential(min=1, max=10),
+        retry=retry_if_not_exception_type(JSONRepairError),
+        before_sleep=count_retry("extraction"),
+    )
+    def extract_candidates_packed(self, docs: List[PackDocument]) -> Dict[str, Dict[str, Any]]:
+        sections = [
+            PACKED_DOCUMENT_TEMPLATE.replace("{{INDEX}}", str(index))
+            .replace("{{URL}}", doc.url)
+            .replace("{{TITLE}}", doc.title)
+            .replace("{{PUBLISHED_AT_OR_NULL}}", doc.published_at or "null")
+            .replace("{{ARTICLE_TEXT}}", doc.text)
+            for index, doc in enumerate(docs, start=1)
+        ]
+        prompt = PACKED_EXTRACTION_PROMPT.replace("{{DOCUMENTS}}", "\n\n".join(sections))
+        response = self._create_response(prompt, "extraction", PACKED_EXTRACTION_FORMAT)
+        data = self._load_json(self._extract_text(response), PACKED_EXTRACTION_FORMAT)
+
+        results: Dict[str, Dict[str, Any]] = {doc.url: {"items": []} for doc in docs}
+        by_normalized = {doc.url.rstrip("/"): doc.url for doc in docs}
+        for item in data.get("items", []):
+            url = by_normalized.get(str(item.pop("source_url", "")).strip().rstrip("/"))
+            if url is None:
+                self.stats["packed_items_unattributed"] += 1
+                continue
+            results[url]["items"].append(item)
+
+        self.stats["packed_calls"] += 1
+        self.stats["packed_documents"] += len(docs)
+        self.stats["prompt_overhead_tokens_saved"] += (len(docs) - 1) * EXTRACTION_PROMPT_OVERHEAD_TOKENS
+        return results
+
+    @retry(
+        stop=stop_after_attempt(settings.max_retries) | deadline_stop,
+        wait=wait_exponential(min=1, max=10),
+        retry=retry_if_not_exception_type(JSONRepairError),
+        before_sleep=count_retry("triage"),
+    )
+    def triage(self, title: str, text: str) -> float:
+        prompt = TRIAGE_PROMPT.replace("{{TITLE}}", title or "").replace("{{ARTICLE_TEXT}}", text)
+        response = self._create_response(prompt, "triage", TRIAGE_FORMAT, model=settings.triage_model)
+        data = self._load_json(self._extract_text(response), TRIAGE_FORMAT)
+        return max(0.0, min(float(data.get("score", 0.0)), 1.0))
 
-    @retry(stop=stop_after_attempt(settings.max_retries), wait=wait_exponential(min=1, max=10))
-    def synthesize(self, candidates_json: Dict[str, Any]) -> Dict[str, Any]:
-        prompt = SYNTHESIS_PROMPT.replace("{{CANDIDATES_JSON}}", json.dumps(candidates_json, ensure_ascii=True))
-        response = self._create_response(prompt)
+    @retry(
+        stop=stop_after_attempt(settings.max_retries) | deadline_stop,
+        wait=wait_exponential(min=1, max=10),
+        retry=retry_if_not_exception_type(JSONRepairError),
+        before_sleep=count_retry("synthesis"),
+    )
+    def synthesize(self, candidates_json: Dict[str, Any] | bytes) -> Dict[str, Any]:
+        # Pre-serialized bytes let the pipeline stream spilled candidates straight into the prompt.
+        payload = candidates_json if isinstance(candidates_json, bytes) else dumps(candidates_json)
+        prompt = SYNTHESIS_PROMPT.replace("{{CANDIDATES_JSON}}", payload.decode("utf-8"))
+        response = self._create_response(prompt, "synthesis", SYNTHESIS_FORMAT)
         raw = self._extract_text(response)
-        return self._load_json(raw)
+        return self._load_json(raw, SYNTHESIS_FORMAT)
 
-    @retry(stop=stop_after_attempt(settings.max_retries), wait=wait_exponential(min=1, max=10))
+    @retry(
+        stop=stop_after_attempt(settings.max_retries) | deadline_stop,
+        wait=wait_exponential(min=1, max=10),
+        before_sleep=count_retry("embeddings"),
+    )
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        options: Dict[str, Any] = {}
+        if self.deadline is not None:
+            options["timeout"] = self.deadline.timeout(settings.llm_timeout_s, floor=settings.llm_min_timeout_s)
         response = self.client.embeddings.create(
             model=settings.openai_embedding_model,
             input=texts,
+            **options,
         )
+        self._record_usage("embeddings", settings.openai_embedding_model, response, started)
         return [item.embedding for item in response.data]
 
-    def _load_json(self, raw: str) -> Dict[str, Any]:
+    def _load_json(self, raw: str, response_format: Optional[ResponseFormat] = None) -> Dict[str, Any]:
+        # Every response format is a JSON object; a bare list or string counts as unparsed.
         try:
-            return json.loads(raw)
+            data = json.loads(raw)
+            if isinstance(data, dict):
+                self.stats["json_strict"] += 1
+                return data
         except json.JSONDecodeError:
-            fix_prompt = f"Return ONLY valid JSON. Fix this:\n{raw}"
-            response = self._create_response(fix_prompt)
-            return json.loads(self._extract_text(response))
+            pass
+        try:
+            data = lenient_loads(raw)
+            if isinstance(data, dict):
+                self.stats["json_lenient"] += 1
+                return data
+        except ValueError:
+            pass
+        self.stats["json_remote_repair"] += 1
+        try:
+            return self._repair_json(raw, response_format)
+        except Exception as exc:
+            # Raised past the callers' retries: the repair already had its attempts, so re-asking would multiply calls.
+            self.stats["json_repair_failures"] += 1
+            raise JSONRepairError(f"Model output could not be repaired into a JSON object: {raw[:200]!r}") from exc
+
+    @retry(
+        stop=stop_after_attempt(2),
+        wait=wait_exponential(min=1, max=10),
+        before_sleep=count_retry("json_repair"),
+    )
+    def _repair_json(self, raw: str, response_format: Optional[ResponseFormat]) -> Dict[str, Any]:
+        fix_prompt = f"Return ONLY valid JSON. Fix this:\n{raw}"
+        response = self._create_response(fix_prompt, "json_repair", response_format)
+        data = lenient_loads(self._extract_text(response))
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+        return data
+
+    def json_parse_stats(self) -> Dict[str, float]:
+        strict = self.stats["json_strict"]
+        lenient = self.stats["json_lenient"]
+        remote = self.stats["json_remote_repair"]
+        total = strict + lenient + remote
+        return {
+            "strict": strict,
+            "lenient": lenient,
+            "remote_repair": remote,
+            "remote_repair_rate": round(remote / total, 4) if total else 0.0,
+        }
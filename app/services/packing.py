@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class PackDocument:
+    url: str
+    title: str
+    published_at: Optional[str]
+    text: str
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class DocumentPacker:
+    def __init__(self, token_budget: int, max_docs: int) -> None:
+        self.token_budget = token_budget
+        self.max_docs = max_docs
+        self._pending: List[PackDocument] = []
+        self._pending_tokens = 0
+
+    def add(self, doc: PackDocument) -> Optional[List[PackDocument]]:
+        tokens = estimate_tokens(doc.text)
+        ready = None
+        if self._pending and (
+            self._pending_tokens + tokens > self.token_budget or len(self._pending) >= self.max_docs
+        ):
+            ready = self.flush()
+        self._pending.append(doc)
+        self._pending_tokens += tokens
+        return ready
+
+    def flush(self) -> Optional[List[PackDocument]]:
+        if not self._pending:
+            return None
+        pack, self._pending, self._pending_tokens = self._pending, [], 0
+        return pack
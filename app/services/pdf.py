@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    # Content streams are only decoded by extract_text, so pages after the last one we ask for are never parsed.
+    from pypdf import PdfReader
+
+    reader = PdfReader(path, strict=False)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def extract_pdf_text(path: str, max_pages: int, max_chars: int) -> Optional[str]:
+    parts = []
+    total = 0
+    for index, page_text in enumerate(iter_pdf_pages(path)):
+        if index >= max_pages:
+            break
+        page_text = page_text.strip()
+        if page_text:
+            parts.append(page_text)
+            total += len(page_text)
+        if total >= max_chars:
+            break
+    text = "\n\n".join(parts)[:max_chars]
+    return text or None
+
+
+def _serve(conn: Connection) -> None:
+    # Worker loop: one task at a time over a pipe, until a None task or the parent closing its end.
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as exc:
+            conn.send((False, repr(exc)))
+
+
+class _Worker:
+    def __init__(self) -> None:
+        # spawn avoids forking an API process that already runs threads.
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1)
+        self.conn.close()
+
+
+class PdfExtractor:
+    # Each document runs in its own worker process, so a timeout kills only that process; other PDFs in flight on
+    # the fetch threads keep their workers.
+    def __init__(self, workers: int, timeout_s: float, max_tasks_per_worker: int = 50) -> None:
+        self.workers = workers
+        self.timeout_s = timeout_s
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._idle: List[_Worker] = []
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> _Worker:
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return _Worker()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        with self._lock:
+            keep = healthy and not self._closed and worker.tasks < self.max_tasks_per_worker
+            if keep:
+                self._idle.append(worker)
+        if not keep:
+            worker.stop(kill=not healthy)
+        self._slots.release()
+
+    def _run(self, fn: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[bool, Any]:
+        worker = self._acquire()
+        healthy = False
+        try:
+            worker.conn.send((fn, args))
+            worker.tasks += 1
+            if not worker.conn.poll(self.timeout_s):
+                raise multiprocessing.TimeoutError(f"no result after {self.timeout_s}s")
+            result = worker.conn.recv()
+            healthy = True
+            return result
+        except (EOFError, OSError) as exc:
+            # The worker died (crash, OOM kill); it is replaced on the next call.
+            return False, repr(exc)
+        finally:
+            self._release(worker, healthy)
+
+    def extract(self, path: Path, max_pages: int, max_chars: int) -> Optional[str]:
+        try:
+            ok, value = self._run(extract_pdf_text, (str(path), max_pages, max_chars))
+        except multiprocessing.TimeoutError:
+            logger.warning("PDF extraction timed out after %ss: %s", self.timeout_s, path)
+            raise
+        if not ok:
+            logger.warning("PDF extraction failed for %s: %s", path, value)
+            return None
+        return value
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_shared_extractor: Optional[PdfExtractor] = None
+
+
+def pdf_extractor() -> PdfExtractor:
+    global _shared_extractor
+    if _shared_extractor is None:
+        _shared_extractor = PdfExtractor(settings.pdf_workers, settings.pdf_timeout_s)
+        atexit.register(_shared_extractor.close)
+    return _shared_extractor
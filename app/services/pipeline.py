@@ -1,24 +1,58 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import socket
+import time
+from collections import Counter
+from contextlib import closing
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
 from urllib.parse import urlparse
 
-import trafilatura
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.schemas import OutputSchema
-from app.services.cache import html_path, text_path
+from app.services.cache import html_path, read_artifact, run_dir, text_path, write_artifact
+from app.services.deadline import Deadline, Hedger, latency_tracker
 from app.services.dedupe import dedupe_items
+from app.services.discovery import FeedDiscovery
 from app.services.fetcher import PageFetcher
+from app.services.fingerprints import FingerprintIndex, shingles, simhash
+from app.services.metrics import StageTimer
 from app.services.openai_client import OpenAIClient
+from app.services.packing import DocumentPacker, PackDocument, estimate_tokens
+from app.services.planner import Plan, QueryPlan, YieldPlanner
 from app.services.query import generate_queries
+from app.services.records import CandidateRecord, EvidenceRecord, PageRecord, SourceRef
+from app.services.search.base import SearchClient, SearchResult
 from app.services.search.bing import BingSearchClient
 from app.services.search.serpapi import SerpAPISearchClient
+from app.services.search_index import SearchIndexer
+from app.services.streaming import CandidateLog, RssSampler, bounded_map, serialize_candidates
+from app.services.triage import TriageCascade
+from app.services.work_queue import (
+    ClaimedItem,
+    SharedCache,
+    cache_key,
+    claim,
+    clear_run,
+    enqueue,
+    fail,
+    iter_results,
+    outstanding,
+    requeue_stale,
+    settle,
+    skip_pending,
+    status_counts,
+)
 from app.utils.hashing import dedupe_key
 from app.utils.text import clamp_quotes
 
+logger = logging.getLogger(__name__)
 
 AUTHORITATIVE_DOMAINS = {
     "gov.uk",
@@ -47,6 +81,8 @@ def _source_name(url: str) -> str:
 def _metadata_from_html(html: Optional[str]) -> Dict[str, Optional[str]]:
     if not html:
         return {"title": None, "published_at": None}
+    import trafilatura
+
     meta = trafilatura.extract_metadata(html)
     if not meta:
         return {"title": None, "published_at": None}
@@ -55,6 +91,285 @@ def _metadata_from_html(html: Optional[str]) -> Dict[str, Optional[str]]:
     return {"title": title, "published_at": date}
 
 
+@lru_cache(maxsize=4096)
+def _source_ref(url: str) -> SourceRef:
+    return SourceRef(url=url, source_name=_source_name(url), credibility=_credibility(url))
+
+
+def _candidates_from_extraction(
+    extracted: Dict[str, Any], url: str, published_at: Optional[str]
+) -> List[CandidateRecord]:
+    source = _source_ref(url)
+    candidates = []
+    for item in extracted.get("items", []):
+        record = CandidateRecord.from_extraction(item, source, published_at, clamp_quotes(item.get("evidence_quotes", [])))
+        if record is not None:
+            candidates.append(record)
+    return candidates
+
+
+def _extract_documents(llm: OpenAIClient, docs: List[PackDocument]) -> Dict[str, Dict[str, Any]]:
+    if len(docs) == 1:
+        doc = docs[0]
+        return {doc.url: llm.extract_candidates(doc.text, doc.url, doc.title, doc.published_at)}
+    return llm.extract_candidates_packed(docs)
+
+
+def _with_cluster_evidence(
+    candidate: CandidateRecord, clusters: Dict[str, List[tuple[str, Optional[str]]]]
+) -> CandidateRecord:
+    # Syndicated copies carry the same quotes, so each cluster member becomes evidence alongside its representative.
+    extra = [
+        EvidenceRecord.from_source(_source_ref(url), published_at or evidence.published_at, evidence.quote)
+        for evidence in candidate.evidence
+        for url, published_at in clusters.get(evidence.url, ())
+    ]
+    candidate.evidence.extend(extra)
+    return candidate
+
+
+def _load_page(fetcher: PageFetcher, run_id: str, result: SearchResult, dry_run: bool, timer: StageTimer) -> PageRecord:
+    # Runs on a fetch worker; the HTML is only needed for metadata and goes out of scope here.
+    fetched = fetcher.fetch_with_cache(run_id, result.url, dry_run=dry_run)
+    with timer.stage("parse"):
+        meta = _metadata_from_html(fetched.html)
+    return PageRecord(result.url, meta.get("title") or result.title or "", meta.get("published_at"), fetched.text)
+
+
+def _session_factory() -> Callable[[], Session]:
+    from app.models.db import SessionLocal
+
+    return SessionLocal
+
+
+def _work_counters(triage: TriageCascade, llm: OpenAIClient) -> Counter[str]:
+    counters: Counter[str] = Counter({f"triage:{name}": value for name, value in triage.counts.items()})
+    counters.update({f"bucket:{name}": value for name, value in triage.score_buckets.items()})
+    counters.update({f"llm:{name}": value for name, value in llm.stats.items()})
+    counters["latency:triage"] = triage.latency_s
+    return counters
+
+
+def _merge_work_stats(stats: Dict[str, float], triage: TriageCascade, llm: Optional[OpenAIClient]) -> None:
+    # `llm` is None for results the coordinator produced itself: its client has already counted those calls.
+    for key, value in stats.items():
+        kind, _, name = key.partition(":")
+        if kind == "triage":
+            triage.counts[name] += value
+        elif kind == "bucket":
+            triage.score_buckets[name] += value
+        elif kind == "latency":
+            triage.latency_s += value
+        elif kind == "llm" and llm is not None:
+            llm.stats[name] += value
+
+
+def _record_work(result: Dict[str, Any], before: Counter[str], triage: TriageCascade, llm: OpenAIClient) -> Counter[str]:
+    after = _work_counters(triage, llm)
+    delta = {key: value - before.get(key, 0) for key, value in after.items() if value != before.get(key, 0)}
+    if delta:
+        stats = result.setdefault("stats", {})
+        for key, value in delta.items():
+            stats[key] = stats.get(key, 0) + value
+    return after
+
+
+def process_work_items(
+    items: List[ClaimedItem],
+    *,
+    fetcher: PageFetcher,
+    llm: OpenAIClient,
+    cache: SharedCache,
+    worker_id: str,
+    timer: Optional[StageTimer] = None,
+) -> Dict[int, Dict[str, Any]]:
+    # The worker half of a sharded run: fetch, triage and extract a claimed batch, reusing the shared cache.
+    timer = timer or StageTimer()
+    triage = TriageCascade(settings.triage_mode, settings.triage_threshold, settings.triage_max_chars, llm=llm, timer=timer)
+    packer = DocumentPacker(settings.pack_token_budget, settings.pack_max_docs) if settings.extraction_packing else None
+    results: Dict[int, Dict[str, Any]] = {}
+    waiting: Dict[str, List[int]] = {}
+    extraction_keys: Dict[str, str] = {}
+
+    def load(item: ClaimedItem) -> tuple[Optional[PageRecord], bool, Optional[str], Optional[str]]:
+        try:
+            key = cache_key("page", item.url)
+            cached = cache.get(key)
+            if cached is not None:
+                return PageRecord(item.url, cached["title"], cached["published_at"], cached["text"]), True, None, None
+            result = SearchResult(title=item.payload.get("title") or "", url=item.url)
+            page = _load_page(fetcher, item.run_id, result, item.payload.get("dry_run", False), timer)
+            if page.text:
+                cache.put(key, "page", {"title": page.title, "published_at": page.published_at, "text": page.text})
+            # The HTML travels back with the result; this node's DATA_DIR is not visible to the coordinator.
+            return page, False, read_artifact(html_path(item.run_id, item.url)), None
+        except Exception as exc:
+            logger.warning("Work item %s failed on %s: %s", item.url, worker_id, exc)
+            return None, False, None, repr(exc)
+
+    def extract(batch: List[PackDocument]) -> None:
+        try:
+            with timer.stage("extraction"):
+                extracted = _extract_documents(llm, batch)
+        except Exception as exc:
+            for doc in batch:
+                for item_id in waiting.pop(doc.url, []):
+                    results[item_id]["error"] = repr(exc)
+            return
+        for doc in batch:
+            value = extracted.get(doc.url)
+            if value is not None:
+                cache.put(extraction_keys[doc.url], "extraction", value)
+            for item_id in waiting.pop(doc.url, []):
+                results[item_id]["extraction"] = value if value is not None else {"items": []}
+
+    def handle(
+        item: ClaimedItem, page: Optional[PageRecord], page_hit: bool, html: Optional[str], error: Optional[str]
+    ) -> None:
+        if page is None:
+            results[item.id] = {"error": error, "worker": worker_id}
+            return
+        result = results[item.id] = {
+            "title": page.title,
+            "published_at": page.published_at,
+            "text": page.text,
+            "html": html,
+            "worker": worker_id,
+            "page_cache_hit": page_hit,
+        }
+        if not page.text:
+            return
+        if not triage.passes(page.title, page.text):
+            result["rejected"] = True
+            return
+        if page.url in waiting:
+            waiting[page.url].append(item.id)
+            return
+        key = extraction_keys[page.url] = cache_key("extraction", settings.openai_model, page.url, page.text)
+        cached = cache.get(key)
+        if cached is not None:
+            result["extraction"] = cached
+            result["extraction_cache_hit"] = True
+            return
+        waiting[page.url] = [item.id]
+        doc = PackDocument(url=page.url, title=page.title, published_at=page.published_at, text=page.text)
+        batch: Optional[List[PackDocument]] = [doc]
+        if packer is not None and estimate_tokens(doc.text) <= settings.pack_short_doc_tokens:
+            batch = packer.add(doc)
+        if batch:
+            extract(batch)
+
+    # Each result carries the triage and LLM work done while handling it, so the coordinator's stats cover every node.
+    counters = _work_counters(triage, llm)
+    for item, loaded in zip(items, bounded_map(load, items, settings.fetch_workers, settings.pipeline_queue_size)):
+        handle(item, *loaded)
+        counters = _record_work(results[item.id], counters, triage, llm)
+    remaining = packer.flush() if packer is not None else None
+    if remaining:
+        extract(remaining)
+        settled = [item.id for item in items if "error" not in results[item.id]]
+        if settled:
+            _record_work(results[settled[-1]], counters, triage, llm)
+    return results
+
+
+def _write_artifacts(run_id: str, url: str, html: Optional[str], text: Optional[str]) -> None:
+    # Sources, archives and the API read artifacts from the coordinator's DATA_DIR, whichever node fetched the page.
+    for path, content in ((html_path(run_id, url), html), (text_path(run_id, url), text)):
+        if content and not path.exists():
+            write_artifact(path, content)
+
+
+def _distributed_pages(
+    run_id: str,
+    search_results: List[SearchResult],
+    *,
+    dry_run: bool,
+    fetcher: PageFetcher,
+    llm: OpenAIClient,
+    triage: TriageCascade,
+    timer: StageTimer,
+    deadline: Optional[Deadline],
+    session_factory: Callable[[], Session],
+    queue_stats: Dict[str, Any],
+) -> Iterator[PageRecord]:
+    # Coordinator: enqueue the run's URLs, work on them alongside any `app.services.worker` processes,
+    # then join the results back in priority order.
+    worker_id = f"coordinator:{socket.gethostname()}:{os.getpid()}"
+    cache = SharedCache.from_settings(session_factory)
+    with closing(session_factory()) as db:
+        queue_stats["items"] = enqueue(db, run_id, search_results, {"dry_run": dry_run})
+    rows: Optional[Iterator[Dict[str, Any]]] = None
+    # The queue is cleared however the join ends, so an aborted run leaves no items for workers to pick up.
+    try:
+        while True:
+            with closing(session_factory()) as db:
+                if deadline is not None and deadline.expired():
+                    queue_stats["skipped"] = skip_pending(db, run_id)
+                    break
+                requeue_stale(db, settings.work_lease_s)
+                items = claim(db, worker_id, settings.work_batch_size, run_id=run_id)
+                if not items and not outstanding(db, run_id):
+                    break
+            if not items:
+                time.sleep(settings.work_poll_s)
+                continue
+            try:
+                results = process_work_items(
+                    items, fetcher=fetcher, llm=llm, cache=cache, worker_id=worker_id, timer=timer
+                )
+            except Exception as exc:
+                logger.warning("Work batch failed in run %s: %s", run_id, exc)
+                with closing(session_factory()) as db:
+                    fail(db, [item.id for item in items], repr(exc), settings.work_max_attempts)
+                continue
+            with closing(session_factory()) as db:
+                settle(db, results, settings.work_max_attempts)
+
+        with closing(session_factory()) as db:
+            queue_stats["statuses"] = status_counts(db, run_id)
+        workers: Counter[str] = Counter()
+        rows = iter_results(session_factory, run_id)
+        for row in rows:
+            worker = row.get("worker") or "unknown"
+            workers[worker] += 1
+            _merge_work_stats(row.get("stats") or {}, triage, llm if worker != worker_id else None)
+            queue_stats["page_cache_hits"] = queue_stats.get("page_cache_hits", 0) + int(bool(row.get("page_cache_hit")))
+            queue_stats["extraction_cache_hits"] = queue_stats.get("extraction_cache_hits", 0) + int(
+                bool(row.get("extraction_cache_hit"))
+            )
+            if not dry_run:
+                _write_artifacts(run_id, row["url"], row.get("html"), row.get("text"))
+            yield PageRecord(
+                row["url"],
+                row.get("title") or "",
+                row.get("published_at"),
+                row.get("text"),
+                row.get("extraction"),
+                bool(row.get("rejected")),
+            )
+        queue_stats["workers"] = dict(workers)
+    finally:
+        if rows is not None:
+            rows.close()
+        with closing(session_factory()) as db:
+            clear_run(db, run_id)
+
+
+def _embed_texts(llm: OpenAIClient, texts: List[str], cache: Optional[SharedCache], stats: Dict[str, Any]) -> List[List[float]]:
+    if cache is None:
+        return llm.embed_texts(texts)
+    keys = [cache_key("embedding", settings.openai_embedding_model, text) for text in texts]
+    found = cache.get_many(keys)
+    missing = [index for index, key in enumerate(keys) if key not in found]
+    if missing:
+        for index, vector in zip(missing, llm.embed_texts([texts[index] for index in missing])):
+            found[keys[index]] = vector
+            cache.put(keys[index], "embedding", vector)
+    stats["embedding_cache_hits"] = len(texts) - len(missing)
+    return [found[key] for key in keys]
+
+
 def _make_search_client():
     if settings.search_provider == "serpapi":
         return SerpAPISearchClient()
@@ -64,70 +379,240 @@ def _make_search_client():
         return SerpAPISearchClient()
 
 
-def run_pipeline(run_id: str, params: Dict[str, Any]) -> tuple[OutputSchema, List[Dict[str, Any]]]:
+def run_pipeline(
+    run_id: str,
+    params: Dict[str, Any],
+    *,
+    search_client: Optional[SearchClient] = None,
+    fetcher: Optional[PageFetcher] = None,
+    llm: Optional[OpenAIClient] = None,
+    timer: Optional[StageTimer] = None,
+    indexer: Optional[SearchIndexer] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> tuple[OutputSchema, List[Dict[str, Any]], List[List[float]]]:
+    with RssSampler() as memory:
+        return _run_pipeline(
+            run_id,
+            params,
+            memory,
+            search_client=search_client,
+            fetcher=fetcher,
+            llm=llm,
+            timer=timer,
+            indexer=indexer,
+            session_factory=session_factory,
+        )
+
+
+def _run_pipeline(
+    run_id: str,
+    params: Dict[str, Any],
+    memory: RssSampler,
+    *,
+    search_client: Optional[SearchClient] = None,
+    fetcher: Optional[PageFetcher] = None,
+    llm: Optional[OpenAIClient] = None,
+    timer: Optional[StageTimer] = None,
+    indexer: Optional[SearchIndexer] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> tuple[OutputSchema, List[Dict[str, Any]], List[List[float]]]:
     top_n = params.get("top_n_per_query", settings.top_n_per_query)
     recency_days = params.get("recency_days", settings.recency_days)
     categories = params.get("categories")
     dry_run = params.get("dry_run", settings.dry_run)
     max_items = params.get("max_items", settings.max_items)
 
-    search_client = _make_search_client()
-    fetcher = PageFetcher()
-    llm = OpenAIClient()
+    timer = timer or StageTimer()
+    search_client = search_client or _make_search_client()
+    fetcher = fetcher or PageFetcher(timer=timer)
+    llm = llm or OpenAIClient()
+
+    run_budget_s = params.get("deadline_s") or settings.run_deadline_s
+    deadline = Deadline(run_budget_s) if run_budget_s else None
+    # Fetching and extraction stop early enough to leave DEADLINE_RESERVE_S for synthesis, embeddings and dedupe.
+    collect_deadline = deadline.child(settings.deadline_reserve_s) if deadline is not None else None
+    deadline_stats = {"skipped_urls": 0, "skipped_docs": 0}
+    fetch_hedger, extraction_hedger = (
+        Hedger(
+            latency_tracker(name),
+            collect_deadline,
+            settings.hedge_quantile,
+            settings.hedge_min_samples,
+            enabled=settings.hedge_enabled,
+        )
+        for name in ("fetch", "extraction")
+    )
+    fetcher.deadline, fetcher.hedger = collect_deadline, fetch_hedger
+    llm.deadline = collect_deadline
 
     queries = generate_queries(categories)
+    page_budget = params.get("page_budget") or settings.search_page_budget or top_n * len(queries)
+    planner = YieldPlanner.from_settings() if settings.planner_enabled else None
+    if planner is not None:
+        plan = planner.plan(queries, page_budget)
+    else:
+        plan = Plan(queries=[QueryPlan(q, top_n, 0.0) for q in queries], page_budget=page_budget)
+
     search_results = []
-    for q in queries:
-        search_results.extend(search_client.search(q, top_n=top_n, recency_days=recency_days))
+    url_queries: Dict[str, str] = {}
+    with timer.stage("search"):
+        for planned in plan.queries:
+            for result in search_client.search(planned.query, top_n=planned.top_n, recency_days=recency_days):
+                url_queries.setdefault(result.url, planned.query)
+                search_results.append(result)
+    discovery = FeedDiscovery.from_settings() if settings.discovery_enabled else None
+    if discovery is not None:
+        # Feeds and sitemaps of authoritative sources add only new or updated pages, outside the search budget.
+        with timer.stage("discovery"):
+            discovered = discovery.discover(recency_days)
+        search_results.extend(result for result in discovered if result.url not in url_queries)
+    if planner is not None:
+        # Highest-yield domains are fetched first, so a run cut short has already spent its time well.
+        search_results = planner.order_results(search_results)
+    fetched_urls: List[str] = []
+    candidates_per_url: Counter[str] = Counter()
 
-    candidates: List[Dict[str, Any]] = []
+    candidates = CandidateLog(run_dir(run_id) / "candidates.jsonl", settings.candidate_spill_threshold)
     sources: List[Dict[str, Any]] = []
+    packer = DocumentPacker(settings.pack_token_budget, settings.pack_max_docs) if settings.extraction_packing else None
+    triage = TriageCascade(settings.triage_mode, settings.triage_threshold, settings.triage_max_chars, llm=llm, timer=timer)
+    fingerprints = FingerprintIndex.from_settings() if settings.near_dup_enabled else None
+    clusters: Dict[str, List[tuple[str, Optional[str]]]] = {}
+    cluster_of: Dict[str, str] = {}
+    run_representatives: Dict[str, str] = {}
+    near_dup_stats = {"duplicates": 0, "reused_extractions": 0}
+    duplicate_urls: Set[str] = set()
 
-    for result in search_results:
-        fetched = fetcher.fetch_with_cache(run_id, result.url, dry_run=dry_run)
-        meta = _metadata_from_html(fetched.html)
-        title = meta.get("title") or result.title or ""
-        published_at = meta.get("published_at")
-
-        if not fetched.text:
-            continue
-
-        sources.append(
-            {
-                "url": result.url,
-                "source_name": _source_name(result.url),
-                "published_at": published_at,
-                "credibility": _credibility(result.url),
-                "html_path": str(html_path(run_id, result.url)),
-                "text_path": str(text_path(run_id, result.url)),
-            }
+    def extract(batch: List[PackDocument]) -> None:
+        if collect_deadline is not None and collect_deadline.expired():
+            deadline_stats["skipped_docs"] += len(batch)
+            return
+        with timer.stage("extraction"):
+            results = extraction_hedger.call(lambda: _extract_documents(llm, batch))
+        for doc in batch:
+            extracted = results.get(doc.url)
+            if extracted is None:
+                continue
+            if fingerprints is not None and doc.url in cluster_of:
+                fingerprints.store_extraction(cluster_of[doc.url], extracted)
+            found = _candidates_from_extraction(extracted, doc.url, doc.published_at)
+            candidates_per_url[doc.url] += len(found)
+            candidates.extend(found)
+
+    distributed = settings.work_queue_enabled
+    queue_stats: Dict[str, Any] = {}
+    if distributed:
+        session_factory = session_factory or _session_factory()
+        pages = _distributed_pages(
+            run_id,
+            search_results,
+            dry_run=dry_run,
+            fetcher=fetcher,
+            llm=llm,
+            triage=triage,
+            timer=timer,
+            deadline=collect_deadline,
+            session_factory=session_factory,
+            queue_stats=queue_stats,
+        )
+    else:
+        pages = bounded_map(
+            lambda result: _load_page(fetcher, run_id, result, dry_run, timer),
+            search_results,
+            settings.fetch_workers,
+            settings.pipeline_queue_size,
         )
+    # Closing releases the fetch pool, or the work queue and its result cursor, however the loop ends.
+    with closing(pages):
+        for page in pages:
+            # A sharded run has already applied the deadline while collecting; joining its results is cheap.
+            if not distributed and collect_deadline is not None and collect_deadline.expired():
+                # Results are in priority order, so what is left when time runs out is the low-yield tail.
+                deadline_stats["skipped_urls"] = len(search_results) - len(fetched_urls)
+                break
+            fetched_urls.append(page.url)
+            title, published_at = page.title, page.published_at
 
-        extracted = llm.extract_candidates(fetched.text, result.url, title, published_at)
-        for item in extracted.get("items", []):
-            quotes = clamp_quotes(item.get("evidence_quotes", []))
-            candidates.append(
+            if not page.text:
+                continue
+
+            sources.append(
                 {
-                    **item,
-                    "evidence": [
-                        {
-                            "source_name": _source_name(result.url),
-                            "url": result.url,
-                            "published_at": published_at,
-                            "quote": q,
-                            "credibility": _credibility(result.url),
-                        }
-                        for q in quotes
-                    ],
+                    "url": page.url,
+                    "source_name": _source_name(page.url),
+                    "published_at": published_at,
+                    "credibility": _credibility(page.url),
+                    "html_path": str(html_path(run_id, page.url)),
+                    "text_path": str(text_path(run_id, page.url)),
                 }
             )
+            if indexer is not None:
+                with timer.stage("index"):
+                    indexer.add_source(page.url, title, published_at, page.text)
 
-    candidate_blob = {
-        "items": candidates,
-        "stats": {"found": len(candidates)},
-    }
+            if fingerprints is not None:
+                with timer.stage("fingerprint"):
+                    features = shingles(page.text)
+                    value = simhash(features) if len(features) >= settings.near_dup_min_shingles else None
+                    match = fingerprints.lookup(value) if value is not None else None
+                if value is not None:
+                    cluster = match.cluster if match else page.url
+                    representative = run_representatives.get(cluster)
+                    fingerprints.add(page.url, value, cluster, run_id)
+                    if representative is not None:
+                        if representative != page.url:
+                            clusters[representative].append((page.url, published_at))
+                            near_dup_stats["duplicates"] += 1
+                            duplicate_urls.add(page.url)
+                        continue
+                    run_representatives[cluster] = page.url
+                    clusters[page.url] = []
+                    cluster_of[page.url] = cluster
+                    cached = fingerprints.extraction(cluster) if settings.near_dup_reuse_extractions else None
+                    if cached is not None:
+                        found = _candidates_from_extraction(cached, page.url, published_at)
+                        candidates_per_url[page.url] += len(found)
+                        candidates.extend(found)
+                        near_dup_stats["reused_extractions"] += 1
+                        continue
+
+            if page.rejected:
+                continue
+            if page.extraction is not None:
+                if fingerprints is not None and page.url in cluster_of:
+                    fingerprints.store_extraction(cluster_of[page.url], page.extraction)
+                found = _candidates_from_extraction(page.extraction, page.url, published_at)
+                candidates_per_url[page.url] += len(found)
+                candidates.extend(found)
+                continue
 
-    synthesized = llm.synthesize(candidate_blob)
+            # Cheap first tier: only pages that look like UK/EU trade challenges reach full extraction.
+            if not triage.passes(title, page.text):
+                continue
+
+            doc = PackDocument(url=page.url, title=title, published_at=published_at, text=page.text)
+            # Short pages share one extraction call so they don't each pay the full prompt overhead.
+            batch: Optional[List[PackDocument]] = [doc]
+            if packer is not None and estimate_tokens(doc.text) <= settings.pack_short_doc_tokens:
+                batch = packer.add(doc)
+            if batch:
+                extract(batch)
+
+    remaining = packer.flush() if packer is not None else None
+    if remaining:
+        extract(remaining)
+    if indexer is not None:
+        with timer.stage("index"):
+            indexer.flush()
+
+    candidate_blob = serialize_candidates(candidates, lambda candidate: _with_cluster_evidence(candidate, clusters))
+
+    llm.deadline = deadline
+    with timer.stage("synthesis"):
+        synthesized = llm.synthesize(candidate_blob)
+    del candidate_blob
+    found = len(candidates)
+    candidates.close()
     items = synthesized.get("items", [])
 
     valid_impact = {"imports", "exports", "transit", "services_trade", "manufacturing"}
@@ -176,23 +661,60 @@ def run_pipeline(run_id: str, params: Dict[str, Any]) -> tuple[OutputSchema, Lis
 
     # Apply deterministic dedupe on top of synthesis
     texts = [f"{item.get('title','')} {item.get('summary','')}" for item in items]
-    embeddings = llm.embed_texts(texts) if texts else []
-    deduped = dedupe_items(items, embeddings)
+    with timer.stage("embeddings"):
+        shared_cache = SharedCache.from_settings(session_factory) if distributed else None
+        embeddings = _embed_texts(llm, texts, shared_cache, queue_stats) if texts else []
+    with timer.stage("dedupe"):
+        deduped = dedupe_items(items, embeddings)
 
     kept = deduped.items[:max_items]
+    kept_embeddings = [emb.tolist() for emb in deduped.embeddings[:max_items]]
     for item in kept:
         item["dedupe_key"] = item.get("dedupe_key") or dedupe_key(item.get("title", ""), item.get("summary", ""))
         if item.get("severity") == "high" and len(item.get("evidence", [])) < 2:
             item["confidence"] = min(float(item.get("confidence", 0.5)), 0.5)
 
+    if discovery is not None:
+        discovery.commit()
+    if planner is not None and not dry_run:
+        kept_per_url = Counter(
+            str(ev["url"]) for item in kept for ev in (item.get("evidence") or [])[:1] if ev.get("url")
+        )
+        # Near-duplicates were never extracted, so they say nothing about the yield of their query or domain.
+        yield_urls = [url for url in fetched_urls if url not in duplicate_urls]
+        planner.record(plan, url_queries, yield_urls, candidates_per_url, kept_per_url)
+
     output = {
         "run_id": run_id,
         "scope": {"regions": ["UK", "EU"], "topic": "global trade challenges", "languages": ["en"]},
         "items": kept,
         "stats": {
-            "found": len(candidates),
+            "found": found,
             "kept": len(kept),
             "duplicates_removed": deduped.duplicates_removed,
+            "timings_s": timer.as_stats(),
+            "timings_cumulative_s": timer.as_cumulative_stats(),
+            "fetch": dict(fetcher.stats),
+            "llm": dict(llm.stats),
+            "json_parse": llm.json_parse_stats(),
+            "triage": triage.stats(),
+            "search_index": dict(indexer.stats) if indexer is not None else {},
+            "planner": plan.stats(),
+            "discovery": dict(discovery.stats) if discovery is not None else {},
+            "deadline": {**deadline.stats(), **deadline_stats} if deadline is not None else {},
+            "hedging": {"fetch": dict(fetch_hedger.stats), "extraction": dict(extraction_hedger.stats)},
+            "work_queue": queue_stats,
+            "memory": {
+                **memory.stats(),
+                "candidates_spilled": candidates.spilled,
+                "fetch_workers": settings.fetch_workers,
+                "queue_size": settings.pipeline_queue_size,
+            },
+            "near_duplicates": {
+                **near_dup_stats,
+                "clusters": sum(1 for members in clusters.values() if members),
+                "index_size": len(fingerprints) if fingerprints is not None else 0,
+            },
         },
     }
-    return OutputSchema.model_validate(output), sources
+    return OutputSchema.model_validate(output), sources, kept_embeddings
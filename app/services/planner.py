@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.services.search.base import SearchResult
+from app.utils.filelock import locked_file
+
+HISTORY_NAME = "yield_history.json"
+
+# Unseen queries and domains start at this many candidates per page, worth this many pages of evidence.
+PRIOR_YIELD = 0.5
+PRIOR_PAGES = 5.0
+
+
+def _domain(url: str) -> str:
+    return urlparse(url).netloc.lower().removeprefix("www.")
+
+
+@dataclass
+class QueryPlan:
+    query: str
+    top_n: int
+    score: float
+
+
+@dataclass
+class Plan:
+    queries: List[QueryPlan]
+    dropped: List[str] = field(default_factory=list)
+    unfunded: List[str] = field(default_factory=list)
+    page_budget: int = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "page_budget": self.page_budget,
+            "queries_planned": len(self.queries),
+            "queries_dropped": len(self.dropped),
+            "queries_unfunded": len(self.unfunded),
+            "pages_planned": sum(q.top_n for q in self.queries),
+        }
+
+
+def allocate(scores: Mapping[str, float], budget: int, max_top_n: int) -> Dict[str, int]:
+    # Every query the budget covers keeps at least one slot, highest score first, so the total never exceeds the
+    # budget; the rest is shared in proportion to score by largest remainder.
+    if not scores:
+        return {}
+    floored = set(sorted(scores, key=lambda q: scores[q], reverse=True)[: max(budget, 0)])
+    allocation = {query: int(query in floored) for query in scores}
+    remaining = max(budget - len(floored), 0)
+    total = sum(scores.values()) or 1.0
+    shares = {query: remaining * score / total for query, score in scores.items()}
+    for query, share in shares.items():
+        allocation[query] = min(max_top_n, allocation[query] + math.floor(share))
+    leftover = budget - sum(allocation.values())
+    for query in sorted(shares, key=lambda q: shares[q] - math.floor(shares[q]), reverse=True):
+        if leftover <= 0:
+            break
+        if allocation[query] < max_top_n:
+            allocation[query] += 1
+            leftover -= 1
+    return allocation
+
+
+class YieldPlanner:
+    def __init__(
+        self,
+        path: Path,
+        decay: float = 0.8,
+        stale_runs: int = 3,
+        retry_after_runs: int = 10,
+        max_top_n: int = 10,
+    ) -> None:
+        self.path = path
+        self.decay = decay
+        self.stale_runs = stale_runs
+        self.retry_after_runs = retry_after_runs
+        self.max_top_n = max_top_n
+        self.history = self._load()
+
+    @classmethod
+    def from_settings(cls) -> "YieldPlanner":
+        return cls(
+            settings.data_dir / HISTORY_NAME,
+            decay=settings.planner_decay,
+            stale_runs=settings.planner_stale_runs,
+            retry_after_runs=settings.planner_retry_after_runs,
+            max_top_n=settings.planner_max_top_n,
+        )
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.path.exists():
+            return {"queries": {}, "domains": {}}
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        return {"queries": data.get("queries", {}), "domains": data.get("domains", {})}
+
+    @staticmethod
+    def score(entry: Optional[Dict[str, Any]]) -> float:
+        entry = entry or {}
+        candidates = entry.get("candidates", 0.0) + 0.5 * entry.get("kept", 0.0)
+        return (candidates + PRIOR_YIELD * PRIOR_PAGES) / (entry.get("fetched", 0.0) + PRIOR_PAGES)
+
+    def _is_stale(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return bool(entry) and entry.get("zero_streak", 0) >= self.stale_runs
+
+    def plan(self, queries: Sequence[str], page_budget: int) -> Plan:
+        active: Dict[str, float] = {}
+        dropped: List[str] = []
+        stats = self.history["queries"]
+        for query in dict.fromkeys(queries):
+            entry = stats.get(query)
+            if self._is_stale(entry) and entry.get("skipped", 0) < self.retry_after_runs:
+                dropped.append(query)
+                continue
+            active[query] = self.score(entry)
+        allocation = allocate(active, page_budget, self.max_top_n)
+        plans = [QueryPlan(query, allocation[query], round(score, 4)) for query, score in active.items() if allocation[query]]
+        unfunded = [query for query in active if not allocation[query]]
+        return Plan(queries=plans, dropped=dropped, unfunded=unfunded, page_budget=page_budget)
+
+    def order_results(self, results: Iterable[SearchResult]) -> List[SearchResult]:
+        # Stable sort: within a domain tier the search engine's ranking is kept.
+        domains = self.history["domains"]
+        return sorted(results, key=lambda r: self.score(domains.get(_domain(r.url))), reverse=True)
+
+    def _update(self, table: Dict[str, Dict[str, Any]], key: str, fetched: int, candidates: int, kept: int, now: str) -> None:
+        entry = table.setdefault(key, {"fetched": 0.0, "candidates": 0.0, "kept": 0.0, "runs": 0, "zero_streak": 0})
+        for name, value in (("fetched", fetched), ("candidates", candidates), ("kept", kept)):
+            entry[name] = round(entry.get(name, 0.0) * self.decay + value, 4)
+        entry["runs"] = entry.get("runs", 0) + 1
+        if fetched:
+            entry["zero_streak"] = 0 if candidates else entry.get("zero_streak", 0) + 1
+        entry["skipped"] = 0
+        entry["last_run"] = now
+
+    def record(
+        self,
+        plan: Plan,
+        url_queries: Mapping[str, str],
+        fetched_urls: Iterable[str],
+        candidates_per_url: Mapping[str, int],
+        kept_per_url: Mapping[str, int],
+    ) -> None:
+        per_query: Dict[str, Counter[str]] = {q.query: Counter() for q in plan.queries}
+        per_domain: Dict[str, Counter[str]] = {}
+        for url in fetched_urls:
+            counts = Counter(fetched=1, candidates=candidates_per_url.get(url, 0), kept=kept_per_url.get(url, 0))
+            query = url_queries.get(url)
+            if query is not None:
+                per_query.setdefault(query, Counter()).update(counts)
+            per_domain.setdefault(_domain(url), Counter()).update(counts)
+
+        now = datetime.utcnow().isoformat()
+        with locked_file(self.path.with_suffix(".lock")):
+            # Re-read under the lock so concurrent runs merge instead of overwriting each other.
+            self.history = self._load()
+            for query, counts in per_query.items():
+                self._update(self.history["queries"], query, counts["fetched"], counts["candidates"], counts["kept"], now)
+            for domain, counts in per_domain.items():
+                self._update(self.history["domains"], domain, counts["fetched"], counts["candidates"], counts["kept"], now)
+            for query in plan.dropped:
+                entry = self.history["queries"].setdefault(query, {})
+                entry["skipped"] = entry.get("skipped", 0) + 1
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.history, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
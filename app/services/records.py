@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True, frozen=True)
+class SourceRef:
+    url: str
+    source_name: str
+    credibility: str
+
+
+@dataclass(slots=True)
+class PageRecord:
+    # What the pipeline keeps of a fetched page once metadata is parsed; the HTML is not carried forward.
+    url: str
+    title: str
+    published_at: Optional[str]
+    text: Optional[str]
+    # Set when a queue worker already triaged and extracted the page.
+    extraction: Optional[Dict[str, Any]] = None
+    rejected: bool = False
+
+
+@dataclass(slots=True)
+class EvidenceRecord:
+    source_name: str
+    url: str
+    published_at: Optional[str]
+    quote: str
+    credibility: str
+
+    @classmethod
+    def from_source(cls, source: SourceRef, published_at: Optional[str], quote: str) -> "EvidenceRecord":
+        return cls(source.source_name, source.url, published_at, quote, source.credibility)
+
+
+def _str_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(v) for v in value if v is not None]
+
+
+def _confidence(value: Any) -> float:
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return 0.5
+
+
+@dataclass(slots=True)
+class CandidateRecord:
+    title: str
+    summary: str
+    challenge_type: str
+    impact_area: List[str]
+    severity: str
+    time_horizon: str
+    uk_relevance: str
+    eu_relevance: str
+    affected_sectors: List[str]
+    confidence: float
+    evidence: List[EvidenceRecord]
+
+    @classmethod
+    def from_extraction(
+        cls, item: Dict[str, Any], source: SourceRef, published_at: Optional[str], quotes: List[str]
+    ) -> Optional["CandidateRecord"]:
+        # Model output is checked once here; everything downstream can rely on the field types.
+        title = str(item.get("title") or "").strip()
+        if not title:
+            return None
+        return cls(
+            title=title,
+            summary=str(item.get("summary") or ""),
+            challenge_type=str(item.get("challenge_type") or "Other"),
+            impact_area=_str_list(item.get("impact_area")),
+            severity=str(item.get("severity") or "medium"),
+            time_horizon=str(item.get("time_horizon") or "now"),
+            uk_relevance=str(item.get("uk_relevance") or "indirect"),
+            eu_relevance=str(item.get("eu_relevance") or "indirect"),
+            affected_sectors=_str_list(item.get("affected_sectors")),
+            confidence=_confidence(item.get("confidence", 0.5)),
+            evidence=[EvidenceRecord.from_source(source, published_at, quote) for quote in quotes],
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CandidateRecord":
+        return cls(**{**data, "evidence": [EvidenceRecord(**ev) for ev in data["evidence"]]})
@@ -1,7 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+def _item_lines(idx: int, item: Dict[str, Any], heading: str = "##") -> List[str]:
+    lines = []
+    lines.append(f"{heading} {idx}. {item.get('title')}")
+    lines.append("")
+    lines.append(item.get("summary", ""))
+    lines.append("")
+    lines.append(f"- Type: {item.get('challenge_type')}")
+    lines.append(f"- Severity: {item.get('severity')}")
+    lines.append(f"- Time horizon: {item.get('time_horizon')}")
+    lines.append(f"- UK relevance: {item.get('uk_relevance')}")
+    lines.append(f"- EU relevance: {item.get('eu_relevance')}")
+    lines.append("")
+    lines.append("Evidence:")
+    for ev in item.get("evidence") or []:
+        lines.append(
+            f"- {ev.get('source_name')}: {ev.get('quote')} ({ev.get('published_at')})"
+        )
+    lines.append("")
+    return lines
 
 
 def to_markdown(output: Dict[str, Any]) -> str:
@@ -13,20 +34,14 @@ def to_markdown(output: Dict[str, Any]) -> str:
     lines.append("")
 
     for idx, item in enumerate(output.get("items", []), start=1):
-        lines.append(f"## {idx}. {item.get('title')}")
-        lines.append("")
-        lines.append(item.get("summary", ""))
-        lines.append("")
-        lines.append(f"- Type: {item.get('challenge_type')}")
-        lines.append(f"- Severity: {item.get('severity')}")
-        lines.append(f"- Time horizon: {item.get('time_horizon')}")
-        lines.append(f"- UK relevance: {item.get('uk_relevance')}")
-        lines.append(f"- EU relevance: {item.get('eu_relevance')}")
-        lines.append("")
-        lines.append("Evidence:")
-        for ev in item.get("evidence", []):
-            lines.append(
-                f"- {ev.get('source_name')}: {ev.get('quote')} ({ev.get('published_at')})"
-            )
-        lines.append("")
+        lines.extend(_item_lines(idx, item))
     return "\n".join(lines)
+
+
+def to_markdown_stream(outputs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    # One run section at a time; "items" may be a lazy iterator, so a section never holds more than one item.
+    yield f"# Trade Challenges Report\n\nGenerated: {datetime.utcnow().isoformat()}Z\n\n"
+    for output in outputs:
+        yield f"## Run {output.get('run_id')}\n\n"
+        for idx, item in enumerate(output.get("items", []), start=1):
+            yield "\n".join(_item_lines(idx, item, heading="###")) + "\n"
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    gzipped: Optional[bytes] = None
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() != "gzip":
+            continue
+        q = params.strip().replace(" ", "")
+        return q not in {"q=0", "q=0.0", "q=0.00", "q=0.000"}
+    return False
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, gzip_enabled: bool = False, gzip_min_bytes: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.gzip_enabled = gzip_enabled
+        self.gzip_min_bytes = gzip_min_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def build(self, body: bytes) -> CachedResponse:
+        gzipped = None
+        if self.gzip_enabled and len(body) >= self.gzip_min_bytes:
+            gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+        return CachedResponse(body=body, etag=make_etag(body), gzipped=gzipped)
+
+    def put(self, key: str, body: bytes) -> CachedResponse:
+        entry = self.build(body)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
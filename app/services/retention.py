@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.db import CacheEntry, Challenge, Run, SearchDocument, Source, WorkItem
+from app.services.fingerprints import INDEX_NAME, FingerprintIndex
+from app.services.trends import apply_counts, count_challenges
+
+ACTIVE_STATUSES = {"queued", "running"}
+
+
+@dataclass
+class RetentionPolicy:
+    keep_last_runs: Optional[int]
+    max_age_days: Optional[int]
+    batch_size: int = 500
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        return cls(
+            keep_last_runs=settings.retention_keep_last_runs,
+            max_age_days=settings.retention_max_age_days,
+            batch_size=settings.retention_batch_size,
+        )
+
+
+@dataclass
+class RetentionReport:
+    dry_run: bool
+    runs: List[str] = field(default_factory=list)
+    rows: Dict[str, int] = field(default_factory=dict)
+    files: int = 0
+    bytes: int = 0
+
+
+def select_expired_runs(
+    runs: Iterable[Tuple[str, datetime, str]],
+    policy: RetentionPolicy,
+    now: datetime,
+) -> List[str]:
+    # Each limit applies on its own: a run expires once it is past the newest keep_last_runs or older than max_age_days.
+    ordered = sorted(runs, key=lambda run: run[1], reverse=True)
+    cutoff = now - timedelta(days=policy.max_age_days) if policy.max_age_days is not None else None
+    expired = []
+    for position, (run_id, created_at, status) in enumerate(ordered):
+        if status in ACTIVE_STATUSES:
+            continue
+        over_count = policy.keep_last_runs is not None and position >= policy.keep_last_runs
+        over_age = cutoff is not None and created_at < cutoff
+        if over_count or over_age:
+            expired.append(run_id)
+    return expired
+
+
+def _run_files(root: Path) -> List[Path]:
+    return sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else []
+
+
+def _challenge_ids(db: Session, run_ids: Sequence[str]) -> List[int]:
+    ids: List[int] = []
+    for start in range(0, len(run_ids), 500):
+        ids.extend(db.scalars(select(Challenge.id).where(Challenge.run_id.in_(run_ids[start : start + 500]))))
+    return ids
+
+
+def _clean_global_indexes(run_ids: Sequence[str], challenge_ids: Sequence[int], dry_run: bool) -> Dict[str, int]:
+    # The fingerprint and vector indexes live beside the run directories and outlive them unless cleaned here.
+    rows = {}
+    if (settings.data_dir / INDEX_NAME).exists():
+        rows["fingerprints"] = FingerprintIndex.from_settings(compact=False).compact(drop_runs=run_ids, dry_run=dry_run)
+    if (settings.data_dir / "vectors").is_dir():
+        from app.services.vector_index import VectorIndex
+
+        rows["vectors"] = VectorIndex.from_settings().remove(challenge_ids, dry_run=dry_run)
+    return rows
+
+
+def _purge_cache_entries(db: Session, now: datetime, dry_run: bool) -> int:
+    # Shared cache entries are not tied to a run, so they are purged on their TTL whether or not any run expired.
+    expired = CacheEntry.created_at < now - timedelta(hours=settings.shared_cache_ttl_hours)
+    if dry_run:
+        return db.scalar(select(func.count()).select_from(CacheEntry).where(expired)) or 0
+    result = db.execute(delete(CacheEntry).where(expired))
+    db.commit()
+    return result.rowcount or 0
+
+
+def _count_rows(db: Session, model, run_ids: Sequence[str]) -> int:
+    total = 0
+    for start in range(0, len(run_ids), 500):
+        chunk = run_ids[start : start + 500]
+        total += db.scalar(select(func.count()).select_from(model).where(model.run_id.in_(chunk))) or 0
+    return total
+
+
+def _delete_in_batches(db: Session, model, run_ids: Sequence[str], batch_size: int) -> int:
+    deleted = 0
+    for start in range(0, len(run_ids), 500):
+        chunk = run_ids[start : start + 500]
+        while True:
+            ids = select(model.id).where(model.run_id.in_(chunk)).limit(batch_size).scalar_subquery()
+            result = db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+            db.commit()
+            deleted += result.rowcount or 0
+            if not result.rowcount:
+                break
+    return deleted
+
+
+def _delete_challenges_in_batches(db: Session, run_ids: Sequence[str], batch_size: int) -> int:
+    # Challenges go a run at a time so each run's trend counts are taken back in the same transaction as its rows.
+    deleted = 0
+    for run_id in run_ids:
+        counts, _ = count_challenges(db, [run_id])
+        apply_counts(db, counts, sign=-1)
+        while True:
+            ids = select(Challenge.id).where(Challenge.run_id == run_id).limit(batch_size).scalar_subquery()
+            result = db.execute(delete(Challenge).where(Challenge.id.in_(ids)).execution_options(synchronize_session=False))
+            deleted += result.rowcount or 0
+            if not result.rowcount:
+                break
+        db.commit()
+    return deleted
+
+
+def apply_retention(db: Session, policy: RetentionPolicy, dry_run: bool = True, now: Optional[datetime] = None) -> RetentionReport:
+    now = now or datetime.utcnow()
+    runs = db.execute(select(Run.id, Run.created_at, Run.status)).all()
+    expired = select_expired_runs(runs, policy, now)
+    report = RetentionReport(dry_run=dry_run, runs=expired)
+    report.rows["cache_entries"] = _purge_cache_entries(db, now, dry_run)
+    if not expired:
+        return report
+
+    files = {run_id: _run_files(settings.data_dir / run_id) for run_id in expired}
+    report.files = sum(len(paths) for paths in files.values())
+    report.bytes = sum(path.stat().st_size for paths in files.values() for path in paths)
+    # Vectors go before their challenge rows, so a similarity search never returns an id the database no longer has.
+    report.rows.update(_clean_global_indexes(expired, _challenge_ids(db, expired), dry_run))
+
+    if dry_run:
+        report.rows.update(
+            sources=_count_rows(db, Source, expired),
+            challenges=_count_rows(db, Challenge, expired),
+            search_documents=_count_rows(db, SearchDocument, expired),
+            work_items=_count_rows(db, WorkItem, expired),
+            runs=len(expired),
+        )
+        return report
+
+    report.rows.update(
+        sources=_delete_in_batches(db, Source, expired, policy.batch_size),
+        challenges=_delete_challenges_in_batches(db, expired, policy.batch_size),
+        search_documents=_delete_in_batches(db, SearchDocument, expired, policy.batch_size),
+        work_items=_delete_in_batches(db, WorkItem, expired, policy.batch_size),
+    )
+    runs_deleted = 0
+    for start in range(0, len(expired), policy.batch_size):
+        result = db.execute(delete(Run).where(Run.id.in_(expired[start : start + policy.batch_size])))
+        db.commit()
+        runs_deleted += result.rowcount or 0
+    report.rows["runs"] = runs_deleted
+
+    for run_id in expired:
+        shutil.rmtree(settings.data_dir / run_id, ignore_errors=True)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Delete expired runs from the database and data_dir.")
+    parser.add_argument("--apply", action="store_true", help="delete instead of reporting what would be reclaimed")
+    parser.add_argument("--keep-last", type=int, default=settings.retention_keep_last_runs)
+    parser.add_argument("--max-age-days", type=int, default=settings.retention_max_age_days)
+    parser.add_argument("--batch-size", type=int, default=settings.retention_batch_size)
+    args = parser.parse_args(argv)
+
+    from app.models.db import SessionLocal
+
+    policy = RetentionPolicy(keep_last_runs=args.keep_last, max_age_days=args.max_age_days, batch_size=args.batch_size)
+    db = SessionLocal()
+    try:
+        report = apply_retention(db, policy, dry_run=not args.apply)
+    finally:
+        db.close()
+    print(json.dumps(asdict(report), indent=2))
+
+
+if __name__ == "__main__":
+    main()
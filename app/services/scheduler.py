@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.db import Run, Schedule
+from app.models.schemas import RunConfig
+from app.utils.hashing import stable_hash
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def params_hash(params: Dict[str, Any]) -> str:
+    normalized = RunConfig.model_validate(params).model_dump()
+    if normalized.get("categories"):
+        normalized["categories"] = sorted(set(normalized["categories"]))
+    return stable_hash(json.dumps(normalized, sort_keys=True))
+
+
+class RunCoordinator:
+    # Singleflight: identical params share one run while it is queued or running.
+    def __init__(self, job: Callable[[str, Dict[str, Any]], None], max_concurrent_runs: int) -> None:
+        self.job = job
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_runs, thread_name_prefix="run")
+        self._inflight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _find_active_run(self, db: Session, key: str, now: datetime) -> Optional[str]:
+        # Covers runs started by another API process; rows older than the stale window are assumed dead.
+        cutoff = now - timedelta(minutes=settings.run_stale_after_minutes)
+        rows = (
+            db.query(Run.id, Run.params)
+            .filter(Run.status.in_(ACTIVE_STATUSES), Run.created_at >= cutoff)
+            .order_by(Run.created_at.desc())
+            .all()
+        )
+        for run_id, params in rows:
+            try:
+                if params_hash(params or {}) == key:
+                    return run_id
+            except ValueError:
+                continue
+        return None
+
+    def submit(self, db: Session, params: Dict[str, Any], now: Optional[datetime] = None) -> Tuple[str, bool]:
+        now = now or datetime.utcnow()
+        key = params_hash(params)
+        with self._lock:
+            run_id = self._inflight.get(key) or self._find_active_run(db, key, now)
+            if run_id is not None:
+                return run_id, True
+
+            # The suffix keeps runs submitted in the same instant (e.g. schedules due on one tick) distinct.
+            run_id = f"{now.isoformat()}-{uuid.uuid4().hex[:8]}"
+            db.add(Run(id=run_id, created_at=now, status="queued", params=params, stats={}))
+            db.commit()
+            self._inflight[key] = run_id
+        try:
+            self._executor.submit(self._execute, key, run_id, params)
+        except Exception as exc:
+            # E.g. RuntimeError after shutdown: a queued row left behind would coalesce new requests until stale.
+            with self._lock:
+                if self._inflight.get(key) == run_id:
+                    del self._inflight[key]
+            run = db.get(Run, run_id)
+            if run is not None:
+                run.status = "failed"
+                run.error = f"Could not start run: {exc}"
+                db.commit()
+            raise
+        return run_id, False
+
+    def _execute(self, key: str, run_id: str, params: Dict[str, Any]) -> None:
+        try:
+            self.job(run_id, params)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) == run_id:
+                    del self._inflight[key]
+
+    def inflight(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._inflight)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def next_due_schedule(db: Session, now: datetime, exclude_ids: Set[int]) -> Optional[Schedule]:
+    # SKIP LOCKED keeps two API processes from firing the same schedule; SQLite ignores it.
+    query = db.query(Schedule).filter(Schedule.enabled.is_(True), Schedule.next_run_at <= now)
+    if exclude_ids:
+        query = query.filter(Schedule.id.notin_(exclude_ids))
+    return query.order_by(Schedule.next_run_at).limit(1).with_for_update(skip_locked=True).first()
+
+
+def fire_due_schedules(db: Session, coordinator: RunCoordinator, now: Optional[datetime] = None) -> int:
+    now = now or datetime.utcnow()
+    fired = 0
+    seen: Set[int] = set()
+    # One schedule per transaction: the row stays locked until submit() commits its run together with the advanced
+    # next_run_at, so a failed submit rolls back and the schedule is retried on the next tick.
+    while (schedule := next_due_schedule(db, now, seen)) is not None:
+        seen.add(schedule.id)
+        name = schedule.name
+        try:
+            # Missed ticks (e.g. while the service was down) collapse into a single run.
+            schedule.next_run_at = now + timedelta(minutes=schedule.interval_minutes)
+            run_id, coalesced = coordinator.submit(db, schedule.params or {}, now=now)
+            schedule.last_run_id = run_id
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error("Schedule %s failed to fire: %s", name, exc)
+            continue
+        fired += 1
+        logger.info("Schedule %s fired run %s%s", name, run_id, " (coalesced)" if coalesced else "")
+    return fired
+
+
+class Scheduler:
+    def __init__(
+        self,
+        coordinator: RunCoordinator,
+        session_factory: Callable[[], Session],
+        poll_s: float,
+    ) -> None:
+        self.coordinator = coordinator
+        self.session_factory = session_factory
+        self.poll_s = poll_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def tick(self) -> int:
+        db = self.session_factory()
+        try:
+            return fire_due_schedules(db, self.coordinator)
+        except Exception as exc:
+            db.rollback()
+            logger.error("Scheduler tick failed: %s", exc)
+            return 0
+        finally:
+            db.close()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.poll_s)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_s)
+            self._thread = None
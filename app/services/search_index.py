@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.db import SearchDocument
+from app.utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+SEARCH_KINDS = ("source", "challenge")
+
+_HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter=\" … \""
+
+# Rank first and only build headlines for the page of results: ts_headline re-parses the whole body.
+_POSTGRES_SEARCH = """
+WITH query AS (SELECT websearch_to_tsquery('english', :q) AS q),
+top AS (
+    SELECT d.id, d.kind, d.run_id, d.url, d.title, d.body, d.published_at,
+           ts_rank_cd(d.search_vector, query.q) AS rank
+    FROM search_documents d, query
+    WHERE d.search_vector @@ query.q
+      AND d.kind = ANY(:kinds)
+      AND (CAST(:since AS timestamp) IS NULL OR d.created_at >= :since)
+    ORDER BY rank DESC
+    LIMIT :limit
+)
+SELECT top.kind, top.run_id, top.url, top.title, top.published_at, top.rank,
+       ts_headline('english', top.body, query.q, '{options}') AS snippet
+FROM top, query
+ORDER BY top.rank DESC
+""".format(options=_HEADLINE_OPTIONS.replace("'", "''"))
+
+
+@dataclass
+class SearchHit:
+    kind: str
+    run_id: str
+    url: Optional[str]
+    title: Optional[str]
+    published_at: Optional[str]
+    rank: float
+    snippet: str
+
+
+class SearchIndexer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        run_id: str,
+        batch_size: int = 50,
+        max_body_chars: Optional[int] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.max_body_chars = max_body_chars or settings.search_max_body_chars
+        self.stats: Counter[str] = Counter()
+        self._pending: List[SearchDocument] = []
+
+    def add_source(self, url: str, title: Optional[str], published_at: Optional[str], body: str) -> None:
+        self._pending.append(
+            SearchDocument(
+                run_id=self.run_id,
+                kind="source",
+                url=url,
+                title=title or None,
+                body=body[: self.max_body_chars],
+                published_at=published_at,
+            )
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        db = self.session_factory()
+        try:
+            db.add_all(batch)
+            db.commit()
+            self.stats["indexed"] += len(batch)
+        except Exception as exc:
+            # The index is secondary; a failed batch is counted, not allowed to fail the run.
+            db.rollback()
+            self.stats["errors"] += len(batch)
+            logger.warning("Search indexing failed for run %s: %s", self.run_id, exc)
+        finally:
+            db.close()
+
+
+def challenge_documents(run_id: str, items: Iterable[Any]) -> List[SearchDocument]:
+    documents = []
+    for item in items:
+        evidence = item.evidence[0] if item.evidence else None
+        documents.append(
+            SearchDocument(
+                run_id=run_id,
+                kind="challenge",
+                url=str(evidence.url) if evidence else None,
+                title=item.title,
+                body=item.summary,
+                published_at=evidence.published_at if evidence else None,
+            )
+        )
+    return documents
+
+
+def _snippet(body: str, terms: Sequence[str], width: int = 160) -> str:
+    lowered = body.lower()
+    positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    return body[start : start + width].strip()
+
+
+def _fallback_search(
+    db: Session, q: str, kinds: Sequence[str], since: Optional[datetime], limit: int
+) -> List[SearchHit]:
+    # Substring matching for SQLite/dev databases without tsvector support.
+    terms = normalize_text(q).split()
+    if not terms:
+        return []
+    haystack = func.lower(func.coalesce(SearchDocument.title, "") + " " + SearchDocument.body)
+    stmt = select(SearchDocument).where(
+        and_(*[haystack.contains(term) for term in terms]), SearchDocument.kind.in_(kinds)
+    )
+    if since is not None:
+        stmt = stmt.where(SearchDocument.created_at >= since)
+    hits = []
+    for doc in db.scalars(stmt.limit(limit * 10)):
+        text_lower = f"{doc.title or ''} {doc.body}".lower()
+        rank = sum(text_lower.count(term) for term in terms) / (1 + len(text_lower) / 1000)
+        hits.append(SearchHit(doc.kind, doc.run_id, doc.url, doc.title, doc.published_at, rank, _snippet(doc.body, terms)))
+    hits.sort(key=lambda hit: hit.rank, reverse=True)
+    return hits[:limit]
+
+
+def search_documents(
+    db: Session,
+    q: str,
+    kinds: Sequence[str] = SEARCH_KINDS,
+    since: Optional[datetime] = None,
+    limit: int = 20,
+) -> List[SearchHit]:
+    if db.get_bind().dialect.name != "postgresql":
+        return _fallback_search(db, q, kinds, since, limit)
+    rows = db.execute(text(_POSTGRES_SEARCH), {"q": q, "kinds": list(kinds), "since": since, "limit": limit})
+    return [
+        SearchHit(row.kind, row.run_id, row.url, row.title, row.published_at, float(row.rank), row.snippet)
+        for row in rows
+    ]
+
+
+def hit_to_dict(hit: SearchHit) -> Dict[str, Any]:
+    return {
+        "kind": hit.kind,
+        "run_id": hit.run_id,
+        "url": hit.url,
+        "title": hit.title,
+        "published_at": hit.published_at,
+        "rank": round(hit.rank, 6),
+        "snippet": hit.snippet,
+    }
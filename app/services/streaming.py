@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import resource
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from app.services.records import CandidateRecord
+from app.utils.serialization import dumps, loads
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], workers: int, max_pending: int) -> Iterator[R]:
+    # Results come back in input order, and at most max_pending are in flight or waiting, so a slow
+    # consumer (extraction) holds the fetchers back instead of letting fetched pages pile up in memory.
+    source = iter(items)
+    pending: Deque[Future[R]] = deque()
+    pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="pipeline")
+    try:
+        for item in source:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= max(max_pending, 1):
+                break
+        while pending:
+            result = pending.popleft().result()
+            for item in source:
+                pending.append(pool.submit(fn, item))
+                break
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is the process high-water mark: kilobytes on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb() -> float:
+    # Falls back to the high-water mark where /proc is unavailable (macOS), which can only overstate the current size.
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+    return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+
+
+class RssSampler:
+    # ru_maxrss never resets, so in the long-running API process it reports whichever run peaked first. This samples
+    # the current RSS on a background thread for the span of one run instead. Concurrent runs share the process,
+    # so the growth figure includes their allocations too.
+    def __init__(self, interval_s: float = 0.25) -> None:
+        self.interval_s = interval_s
+        self.start_mb = current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return {
+            "rss_start_mb": self.start_mb,
+            "rss_peak_mb": self.peak_mb,
+            "rss_growth_mb": round(self.peak_mb - self.start_mb, 1),
+        }
+
+
+class CandidateLog:
+    # Candidates stay in memory up to `threshold`; past that each batch is appended to a JSONL file
+    # and streamed back on iteration, so a run's candidate count no longer bounds its memory.
+    def __init__(self, path: Path, threshold: int = 500) -> None:
+        self.path = path
+        self.threshold = threshold
+        self.spilled = 0
+        self._memory: List[CandidateRecord] = []
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._memory)
+
+    def extend(self, records: Iterable[CandidateRecord]) -> None:
+        self._memory.extend(records)
+        if len(self._memory) >= self.threshold:
+            self._spill()
+
+    def _spill(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as fh:
+            fh.writelines(dumps(record) + b"\n" for record in self._memory)
+        self.spilled += len(self._memory)
+        self._memory = []
+
+    def __iter__(self) -> Iterator[CandidateRecord]:
+        if self.spilled:
+            with self.path.open("rb") as fh:
+                for line in fh:
+                    yield CandidateRecord.from_dict(loads(line))
+        yield from self._memory
+
+    def close(self, remove: bool = True) -> None:
+        self._memory = []
+        if remove:
+            self.path.unlink(missing_ok=True)
+
+
+def json_array(chunks: Iterable[bytes]) -> bytes:
+    out = bytearray(b"[")
+    for index, chunk in enumerate(chunks):
+        if index:
+            out += b","
+        out += chunk
+    out += b"]"
+    return bytes(out)
+
+
+def serialize_candidates(log: CandidateLog, transform: Optional[Callable[[CandidateRecord], CandidateRecord]] = None) -> bytes:
+    # Same bytes as dumps({"items": [...], "stats": {...}}) without materializing the list of records.
+    records = (transform(record) if transform else record for record in log)
+    items = json_array(dumps(record) for record in records)
+    return b'{"items":' + items + b',"stats":' + dumps({"found": len(log)}) + b"}"
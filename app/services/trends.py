@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.db import Challenge, ChallengeTrend, Run
+
+TREND_DIMENSIONS = ("challenge_type", "severity", "sector", "impact_area")
+
+TrendKey = Tuple[date, str, str]
+
+_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def week_of(moment: datetime) -> date:
+    # Weeks start on Monday and are keyed by the run's creation time, since challenges carry no timestamp of their own.
+    return (moment - timedelta(days=moment.weekday())).date()
+
+
+def trend_keys(
+    week: date, challenge_type: str, severity: str, sectors: Optional[Iterable[str]], impact_area: Optional[Iterable[str]]
+) -> Iterator[TrendKey]:
+    yield week, "challenge_type", challenge_type
+    yield week, "severity", severity
+    # A challenge counts once per distinct sector or impact area, however often the model repeated it.
+    for sector in sorted(set(sectors or [])):
+        yield week, "sector", sector
+    for area in sorted(set(impact_area or [])):
+        yield week, "impact_area", area
+
+
+def count_items(week: date, items: Iterable[Any]) -> Counter[TrendKey]:
+    counts: Counter[TrendKey] = Counter()
+    for item in items:
+        counts.update(trend_keys(week, item.challenge_type, item.severity, item.affected_sectors, item.impact_area))
+    return counts
+
+
+def apply_counts(db: Session, counts: Counter[TrendKey], sign: int = 1) -> int:
+    # Upserts in key order, so concurrent runs touching the same weeks take row locks in the same order.
+    # Nothing is committed here: the caller commits alongside the challenge rows the counts describe.
+    rows = [
+        {"week": week, "dimension": dimension, "value": value[:256], "count": sign * count}
+        for (week, dimension, value), count in sorted(counts.items())
+        if count
+    ]
+    if not rows:
+        return 0
+    insert = _INSERTS[db.get_bind().dialect.name]
+    for start in range(0, len(rows), 500):
+        stmt = insert(ChallengeTrend).values(rows[start : start + 500])
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ChallengeTrend.week, ChallengeTrend.dimension, ChallengeTrend.value],
+                set_={"count": ChallengeTrend.count + stmt.excluded["count"]},
+            )
+        )
+    if sign < 0:
+        db.execute(delete(ChallengeTrend).where(ChallengeTrend.count <= 0))
+    return len(rows)
+
+
+def record_run(db: Session, run_id: str, items: Iterable[Any]) -> int:
+    run = db.get(Run, run_id)
+    if run is None:
+        return 0
+    return apply_counts(db, count_items(week_of(run.created_at), items))
+
+
+def _challenge_rows(db: Session, run_ids: Optional[Sequence[str]] = None, chunk_size: int = 1000) -> Iterable[Any]:
+    stmt = select(
+        Run.created_at, Challenge.challenge_type, Challenge.severity, Challenge.affected_sectors, Challenge.impact_area
+    ).join(Run, Run.id == Challenge.run_id)
+    if run_ids is not None:
+        stmt = stmt.where(Challenge.run_id.in_(list(run_ids)))
+    return db.execute(stmt.execution_options(yield_per=chunk_size))
+
+
+def count_challenges(db: Session, run_ids: Optional[Sequence[str]] = None) -> Tuple[Counter[TrendKey], int]:
+    counts: Counter[TrendKey] = Counter()
+    challenges = 0
+    for created_at, challenge_type, severity, sectors, impact_area in _challenge_rows(db, run_ids):
+        counts.update(trend_keys(week_of(created_at), challenge_type, severity, sectors, impact_area))
+        challenges += 1
+    return counts, challenges
+
+
+def rebuild(db: Session) -> Dict[str, int]:
+    # Backfill for history stored before the aggregates existed, or a repair if they were edited by hand.
+    counts, challenges = count_challenges(db)
+    db.execute(delete(ChallengeTrend))
+    rows = apply_counts(db, counts)
+    db.commit()
+    return {"challenges": challenges, "rows": rows}
+
+
+def query_trends(
+    db: Session,
+    dimensions: Sequence[str] = TREND_DIMENSIONS,
+    weeks: int = 12,
+    top: int = 20,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    # Reads only the aggregate rows for the window, so cost follows weeks x values rather than stored challenges.
+    last = week_of(now or datetime.utcnow())
+    axis = [last - timedelta(weeks=offset) for offset in range(weeks - 1, -1, -1)]
+    position = {week: index for index, week in enumerate(axis)}
+    stmt = select(ChallengeTrend.dimension, ChallengeTrend.value, ChallengeTrend.week, ChallengeTrend.count).where(
+        ChallengeTrend.dimension.in_(list(dimensions)), ChallengeTrend.week >= axis[0], ChallengeTrend.week <= last
+    )
+    series: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+    for dimension, value, week, count in db.execute(stmt):
+        series[dimension].setdefault(value, [0] * len(axis))[position[week]] += count
+    trends: Dict[str, List[Dict[str, Any]]] = {}
+    for dimension in dimensions:
+        ranked = sorted(series[dimension].items(), key=lambda entry: (-sum(entry[1]), entry[0]))[:top]
+        trends[dimension] = [{"value": value, "total": sum(counts), "counts": counts} for value, counts in ranked]
+    return {"weeks": [week.isoformat() for week in axis], "trends": trends}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the weekly challenge trend aggregates from stored challenges.")
+    parser.parse_args(argv)
+
+    from app.models.db import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        report = rebuild(db)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from app.services.metrics import StageTimer
+from app.utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+TRADE_TERMS = {
+    "tariff", "tariffs", "duty", "duties", "customs", "import", "imports", "export", "exports", "trade",
+    "sanction", "sanctions", "quota", "quotas", "antidumping", "dumping", "safeguard", "cbam", "carbon",
+    "border", "shipping", "freight", "port", "ports", "logistics", "supply", "shortage", "shortages",
+    "licence", "license", "licensing", "dual", "controls", "wto", "regulation", "compliance",
+    "insurance", "vessel", "vessels", "container", "rates", "haulage", "driver", "drivers", "energy", "gas",
+}
+REGION_TERMS = {
+    "uk", "britain", "british", "england", "scotland", "wales", "eu", "europe", "european", "brussels",
+    "commission", "germany", "france", "netherlands", "rotterdam", "felixstowe", "dover", "calais",
+}
+
+
+def local_triage_score(title: str, text: str) -> float:
+    tokens = set(normalize_text(f"{title} {text}").split())
+    trade_hits = len(tokens & TRADE_TERMS)
+    region_hit = bool(tokens & REGION_TERMS)
+    score = min(1.0, trade_hits / 5)
+    return round(score if region_hit else score * 0.5, 3)
+
+
+class TriageCascade:
+    def __init__(
+        self,
+        mode: str,
+        threshold: float,
+        max_chars: int,
+        llm: Optional[Any] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> None:
+        self.mode = mode
+        self.threshold = threshold
+        self.max_chars = max_chars
+        self.llm = llm
+        self.timer = timer or StageTimer()
+        self.counts: Counter[str] = Counter()
+        self.score_buckets: Counter[str] = Counter()
+        self.latency_s = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _score(self, title: str, text: str) -> float:
+        head = text[: self.max_chars]
+        if self.mode == "model" and self.llm is not None:
+            return self.llm.triage(title, head)
+        return local_triage_score(title, head)
+
+    def passes(self, title: str, text: str) -> bool:
+        if not self.enabled:
+            return True
+        started = time.perf_counter()
+        try:
+            with self.timer.stage("triage"):
+                score = self._score(title, text)
+        except Exception as exc:
+            # Fail open: a broken triage tier must not silently drop pages.
+            logger.warning("Triage failed, passing page to extraction: %s", exc)
+            self.counts["errors"] += 1
+            score = 1.0
+        self.latency_s += time.perf_counter() - started
+        self.counts["triaged"] += 1
+        self.score_buckets[f"{min(int(score * 10), 9) / 10:.1f}"] += 1
+        passed = score >= self.threshold
+        self.counts["passed" if passed else "rejected"] += 1
+        return passed
+
+    def stats(self) -> Dict[str, Any]:
+        triaged = self.counts["triaged"]
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "triaged": triaged,
+            "passed": self.counts["passed"],
+            "rejected": self.counts["rejected"],
+            "errors": self.counts["errors"],
+            "avg_latency_s": round(self.latency_s / triaged, 4) if triaged else 0.0,
+            "score_histogram": dict(sorted(self.score_buckets.items())),
+        }
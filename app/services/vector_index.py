@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.filelock import locked_file
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+ASSIGN_FILE = "assign.i32"
+CENTROIDS_FILE = "centroids.npy"
+META_FILE = "meta.json"
+
+_TRAIN_SAMPLE = 50_000
+_KMEANS_ITERATIONS = 12
+_ASSIGN_CHUNK = 8192
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+
+def kmeans(sample: np.ndarray, nlist: int, iterations: int = _KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    # Spherical k-means: vectors are unit length, so assignment is by dot product and centroids are renormalized.
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        empty = counts == 0
+        # Re-seed empty lists from random points so every list stays in use.
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    # Everything a search reads, published as one object so readers never mix files from two commits.
+    mtime: Optional[int]
+    meta: Dict[str, Any]
+    vectors: Optional[np.ndarray] = None
+    ids: Optional[np.ndarray] = None
+    rows: Dict[int, int] = field(default_factory=dict)
+    centroids: Optional[np.ndarray] = None
+    order: Optional[np.ndarray] = None
+    bounds: Optional[np.ndarray] = None
+
+
+_EMPTY = _Snapshot(None, {"count": 0, "dim": None, "model": None, "trained_count": 0})
+
+
+class VectorIndex:
+    # IVF over append-only memory-mapped files; meta.json is written last, so its count marks the committed rows.
+    def __init__(self, root: Path, nprobe: int = 8, min_train: int = 1024) -> None:
+        self.root = root
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._state = _EMPTY
+
+    @classmethod
+    def from_settings(cls) -> "VectorIndex":
+        return cls(settings.data_dir / "vectors", settings.vector_nprobe, settings.vector_min_train)
+
+    def _path(self, name: str) -> Path:
+        return self.root / name
+
+    def _read_meta(self) -> Dict[str, Any]:
+        path = self._path(META_FILE)
+        if not path.exists():
+            return {"count": 0, "dim": None, "model": None, "trained_count": 0}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = self._path(META_FILE + ".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self._path(META_FILE))
+
+    def _writer(self) -> ContextManager[None]:
+        return locked_file(self._path(".lock"), self._lock)
+
+    def _snapshot(self) -> _Snapshot:
+        path = self._path(META_FILE)
+        mtime = path.stat().st_mtime_ns if path.exists() else None
+        with self._state_lock:
+            current = self._state
+        if mtime == current.mtime:
+            return current
+        if mtime is None:
+            snapshot = _EMPTY
+        else:
+            # A shared flock keeps remove() and retraining, which replace files, from landing between these reads.
+            with locked_file(self._path(".lock"), shared=True):
+                snapshot = self._load(path.stat().st_mtime_ns)
+        with self._state_lock:
+            self._state = snapshot
+        return snapshot
+
+    def _load(self, mtime: int) -> _Snapshot:
+        meta = self._read_meta()
+        count, dim = meta["count"], meta["dim"]
+        if not count:
+            return _Snapshot(mtime, meta)
+        vectors = np.memmap(self._path(VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+        ids = np.fromfile(self._path(IDS_FILE), dtype=np.int64, count=count)
+        # Later rows win, matching the order ids were added in.
+        rows = dict(zip(ids.tolist(), range(count)))
+        if not meta["trained_count"]:
+            return _Snapshot(mtime, meta, vectors, ids, rows)
+        centroids = np.load(self._path(CENTROIDS_FILE))
+        assign = np.fromfile(self._path(ASSIGN_FILE), dtype=np.int32, count=count)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        return _Snapshot(mtime, meta, vectors, ids, rows, centroids, order, bounds)
+
+    def __len__(self) -> int:
+        return int(self._snapshot().meta.get("count", 0))
+
+    def add(self, ids: Sequence[int], vectors: Sequence[Sequence[float]], model: str) -> int:
+        if not len(ids):
+            return 0
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._writer():
+            meta = self._read_meta()
+            if meta["dim"] is None:
+                meta.update(dim=int(matrix.shape[1]), model=model)
+            if matrix.shape[1] != meta["dim"] or model != meta["model"]:
+                raise ValueError(
+                    f"Index holds {meta['dim']}-d vectors from {meta['model']}; got {matrix.shape[1]}-d from {model}"
+                )
+            count = meta["count"]
+            # Drop any bytes from an append that crashed before meta.json was updated.
+            self._append(VECTORS_FILE, matrix.tobytes(), count * meta["dim"] * 4)
+            self._append(IDS_FILE, np.asarray(ids, dtype=np.int64).tobytes(), count * 8)
+            if meta["trained_count"]:
+                centroids = np.load(self._path(CENTROIDS_FILE))
+                self._append(ASSIGN_FILE, _nearest(matrix, centroids).tobytes(), count * 4)
+            meta["count"] = count + len(ids)
+            if meta["count"] >= self.min_train and meta["count"] >= 2 * meta["trained_count"]:
+                self._train(meta)
+            self._write_meta(meta)
+        return len(ids)
+
+    def remove(self, ids: Sequence[int], dry_run: bool = False) -> int:
+        # Rewrites the files without the given rows; readers holding the old maps keep them until their next refresh.
+        if not len(ids):
+            return 0
+        with self._writer():
+            meta = self._read_meta()
+            count, dim = meta["count"], meta["dim"]
+            if not count:
+                return 0
+            stored = np.fromfile(self._path(IDS_FILE), dtype=np.int64, count=count)
+            keep = ~np.isin(stored, np.asarray(ids, dtype=np.int64))
+            removed = int(count - keep.sum())
+            if dry_run or not removed:
+                return removed
+            vectors = np.memmap(self._path(VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+            with self._path(VECTORS_FILE + ".tmp").open("wb") as fh:
+                for start in range(0, count, _ASSIGN_CHUNK):
+                    fh.write(np.asarray(vectors[start : start + _ASSIGN_CHUNK])[keep[start : start + _ASSIGN_CHUNK]].tobytes())
+            del vectors
+            stored[keep].tofile(self._path(IDS_FILE + ".tmp"))
+            names = [VECTORS_FILE, IDS_FILE]
+            if meta["trained_count"]:
+                assign = np.fromfile(self._path(ASSIGN_FILE), dtype=np.int32, count=count)
+                assign[keep].tofile(self._path(ASSIGN_FILE + ".tmp"))
+                names.append(ASSIGN_FILE)
+            for name in names:
+                os.replace(self._path(name + ".tmp"), self._path(name))
+            meta["count"] = count - removed
+            self._write_meta(meta)
+        return removed
+
+    def _append(self, name: str, data: bytes, committed_bytes: int) -> None:
+        path = self._path(name)
+        with path.open("ab") as fh:
+            fh.truncate(committed_bytes)
+            fh.write(data)
+
+    def _train(self, meta: Dict[str, Any]) -> None:
+        # Retrained each time the index doubles, which keeps list sizes near sqrt(n) as history grows.
+        count, dim = meta["count"], meta["dim"]
+        vectors = np.memmap(self._path(VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+        rng = np.random.default_rng(count)
+        sample_rows = np.sort(rng.choice(count, size=min(count, _TRAIN_SAMPLE), replace=False))
+        sample = np.asarray(vectors[sample_rows])
+        nlist = max(int(min(max(np.sqrt(count), 16), 4096, len(sample) // 8)), 1)
+        centroids = kmeans(sample, nlist)
+        assign = np.concatenate(
+            [_nearest(np.asarray(vectors[start : start + _ASSIGN_CHUNK]), centroids) for start in range(0, count, _ASSIGN_CHUNK)]
+        )
+        with self._path(CENTROIDS_FILE + ".tmp").open("wb") as fh:
+            np.save(fh, centroids)
+        os.replace(self._path(CENTROIDS_FILE + ".tmp"), self._path(CENTROIDS_FILE))
+        assign.tofile(self._path(ASSIGN_FILE + ".tmp"))
+        os.replace(self._path(ASSIGN_FILE + ".tmp"), self._path(ASSIGN_FILE))
+        meta["trained_count"] = count
+        logger.info("Trained vector index: %s vectors in %s lists", count, nlist)
+
+    def _candidate_rows(self, snapshot: _Snapshot, query: np.ndarray) -> np.ndarray:
+        if snapshot.centroids is None:
+            return np.arange(len(snapshot.ids))
+        probes = np.argsort(snapshot.centroids @ query)[-self.nprobe :]
+        return np.concatenate([snapshot.order[snapshot.bounds[c] : snapshot.bounds[c + 1]] for c in probes])
+
+    def search(self, vector: Sequence[float], k: int = 10, exclude_ids: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        snapshot = self._snapshot()
+        if snapshot.vectors is None:
+            return []
+        query = _normalize(np.asarray([vector], dtype=np.float32))[0]
+        rows = self._candidate_rows(snapshot, query)
+        if exclude_ids:
+            rows = rows[~np.isin(snapshot.ids[rows], np.asarray(exclude_ids, dtype=np.int64))]
+        if not len(rows):
+            return []
+        rows.sort()
+        scores = np.asarray(snapshot.vectors[rows]) @ query
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(snapshot.ids[rows[i]]), float(scores[i])) for i in top]
+
+    def vector_for(self, challenge_id: int) -> Optional[np.ndarray]:
+        snapshot = self._snapshot()
+        row = snapshot.rows.get(challenge_id)
+        if row is None:
+            return None
+        return np.asarray(snapshot.vectors[row])
+
+
+_shared_index: Optional[VectorIndex] = None
+_shared_lock = threading.Lock()
+
+
+def vector_index() -> VectorIndex:
+    global _shared_index
+    if _shared_index is None:
+        with _shared_lock:
+            if _shared_index is None:
+                _shared_index = VectorIndex.from_settings()
+    return _shared_index
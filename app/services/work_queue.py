@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.db import CacheEntry, WorkItem
+from app.services.search.base import SearchResult
+from app.utils.hashing import stable_hash
+
+OUTSTANDING_STATUSES = ("pending", "claimed")
+
+
+@dataclass
+class ClaimedItem:
+    id: int
+    run_id: str
+    url: str
+    priority: int
+    payload: Dict[str, Any]
+
+
+def enqueue(db: Session, run_id: str, results: Sequence[SearchResult], payload: Optional[Dict[str, Any]] = None) -> int:
+    # Priority is the position in the planner's ordering, so workers take high-yield URLs first.
+    db.add_all(
+        WorkItem(run_id=run_id, url=result.url, priority=position, payload={"title": result.title, **(payload or {})})
+        for position, result in enumerate(results)
+    )
+    db.commit()
+    return len(results)
+
+
+def claim(
+    db: Session, worker_id: str, limit: int, run_id: Optional[str] = None, now: Optional[datetime] = None
+) -> List[ClaimedItem]:
+    # SKIP LOCKED lets any number of workers poll the same table without blocking on each other's batches.
+    stmt = select(WorkItem).where(WorkItem.status == "pending")
+    if run_id is not None:
+        stmt = stmt.where(WorkItem.run_id == run_id)
+    stmt = stmt.order_by(WorkItem.priority, WorkItem.id).limit(limit).with_for_update(skip_locked=True)
+    rows = db.scalars(stmt).all()
+    now = now or datetime.utcnow()
+    for row in rows:
+        row.status = "claimed"
+        row.claimed_by = worker_id
+        row.claimed_at = now
+        row.attempts += 1
+    claimed = [ClaimedItem(row.id, row.run_id, row.url, row.priority, dict(row.payload or {})) for row in rows]
+    db.commit()
+    return claimed
+
+
+def complete(db: Session, results: Dict[int, Dict[str, Any]]) -> None:
+    for item_id, result in results.items():
+        db.execute(update(WorkItem).where(WorkItem.id == item_id).values(status="done", result=result, error=None))
+    db.commit()
+
+
+def fail(db: Session, item_ids: Iterable[int], error: str, max_attempts: int) -> None:
+    # Items go back to pending until they have used up max_attempts claims.
+    for item in db.scalars(select(WorkItem).where(WorkItem.id.in_(list(item_ids)))):
+        item.error = error[:2000]
+        item.status = "failed" if item.attempts >= max_attempts else "pending"
+        item.claimed_by = None
+    db.commit()
+
+
+def settle(db: Session, results: Dict[int, Dict[str, Any]], max_attempts: int) -> int:
+    # Items that raised are failed one at a time, so one bad page does not send the whole batch back to be re-fetched.
+    errors = {item_id: result["error"] for item_id, result in results.items() if "error" in result}
+    complete(db, {item_id: result for item_id, result in results.items() if item_id not in errors})
+    for item_id, error in errors.items():
+        fail(db, [item_id], error, max_attempts)
+    return len(errors)
+
+
+def requeue_stale(db: Session, lease_s: float, now: Optional[datetime] = None) -> int:
+    # A worker that died mid-batch leaves its items claimed; they are released once the lease runs out.
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=lease_s)
+    result = db.execute(
+        update(WorkItem)
+        .where(WorkItem.status == "claimed", WorkItem.claimed_at < cutoff)
+        .values(status="pending", claimed_by=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def skip_pending(db: Session, run_id: str) -> int:
+    result = db.execute(
+        update(WorkItem)
+        .where(WorkItem.run_id == run_id, WorkItem.status == "pending")
+        .values(status="skipped")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def outstanding(db: Session, run_id: str) -> int:
+    stmt = select(func.count()).select_from(WorkItem).where(
+        WorkItem.run_id == run_id, WorkItem.status.in_(OUTSTANDING_STATUSES)
+    )
+    return db.scalar(stmt) or 0
+
+
+def status_counts(db: Session, run_id: str) -> Dict[str, int]:
+    rows = db.execute(select(WorkItem.status, func.count()).where(WorkItem.run_id == run_id).group_by(WorkItem.status))
+    return {status: count for status, count in rows}
+
+
+def iter_results(session_factory: Callable[[], Session], run_id: str, chunk_size: int = 50) -> Iterator[Dict[str, Any]]:
+    # Streamed in priority order so the coordinator joins results exactly as a single process would have seen them.
+    db = session_factory()
+    try:
+        stmt = (
+            select(WorkItem.url, WorkItem.result)
+            .where(WorkItem.run_id == run_id, WorkItem.status == "done")
+            .order_by(WorkItem.priority, WorkItem.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        for url, result in db.execute(stmt):
+            yield {"url": url, **(result or {})}
+    finally:
+        db.close()
+
+
+def clear_run(db: Session, run_id: str) -> int:
+    result = db.execute(delete(WorkItem).where(WorkItem.run_id == run_id))
+    db.commit()
+    return result.rowcount or 0
+
+
+def cache_key(kind: str, *parts: str) -> str:
+    return f"{kind}:{stable_hash('|'.join(parts))}"
+
+
+class SharedCache:
+    def __init__(self, session_factory: Callable[[], Session], ttl_s: Optional[float] = None) -> None:
+        self.session_factory = session_factory
+        self.ttl_s = ttl_s
+
+    @classmethod
+    def from_settings(cls, session_factory: Callable[[], Session]) -> "SharedCache":
+        return cls(session_factory, ttl_s=settings.shared_cache_ttl_hours * 3600)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        stmt = select(CacheEntry.key, CacheEntry.value).where(CacheEntry.key.in_(list(keys)))
+        if self.ttl_s is not None:
+            stmt = stmt.where(CacheEntry.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl_s))
+        db = self.session_factory()
+        try:
+            return {key: value for key, value in db.execute(stmt)}
+        finally:
+            db.close()
+
+    def put(self, key: str, kind: str, value: Any) -> None:
+        db = self.session_factory()
+        try:
+            db.merge(CacheEntry(key=key, kind=kind, value=value, created_at=datetime.utcnow()))
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same key first; both computed the same value.
+            db.rollback()
+        finally:
+            db.close()
+
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import closing
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.fetcher import PageFetcher
+from app.services.openai_client import OpenAIClient
+from app.services.pipeline import process_work_items
+from app.services.work_queue import SharedCache, claim, fail, requeue_stale, settle
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(
+    session_factory: Callable[[], Session],
+    worker_id: str,
+    *,
+    fetcher: Optional[PageFetcher] = None,
+    llm: Optional[OpenAIClient] = None,
+    batch_size: Optional[int] = None,
+    poll_s: Optional[float] = None,
+    once: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> int:
+    # Claims URL batches from any run until stopped; with `once`, exits as soon as the queue is empty.
+    fetcher = fetcher or PageFetcher()
+    llm = llm or OpenAIClient()
+    cache = SharedCache.from_settings(session_factory)
+    batch_size = batch_size or settings.work_batch_size
+    poll_s = settings.work_poll_s if poll_s is None else poll_s
+    stop = stop or threading.Event()
+    processed = 0
+    while not stop.is_set():
+        with closing(session_factory()) as db:
+            requeue_stale(db, settings.work_lease_s)
+            items = claim(db, worker_id, batch_size)
+        if not items:
+            if once:
+                break
+            stop.wait(poll_s)
+            continue
+        try:
+            results = process_work_items(items, fetcher=fetcher, llm=llm, cache=cache, worker_id=worker_id)
+        except Exception as exc:
+            logger.exception("Work batch failed on %s", worker_id)
+            with closing(session_factory()) as db:
+                fail(db, [item.id for item in items], repr(exc), settings.work_max_attempts)
+            continue
+        with closing(session_factory()) as db:
+            failed = settle(db, results, settings.work_max_attempts)
+        processed += len(results) - failed
+    return processed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fetch and extract queued URLs for pipeline runs.")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument("--batch-size", type=int, default=settings.work_batch_size)
+    parser.add_argument("--poll-s", type=float, default=settings.work_poll_s)
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty instead of polling")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from app.models.db import SessionLocal
+
+    started = time.perf_counter()
+    processed = run_worker(SessionLocal, args.worker_id, batch_size=args.batch_size, poll_s=args.poll_s, once=args.once)
+    logger.info("Worker %s processed %s items in %.1fs", args.worker_id, processed, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import fcntl
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+@contextmanager
+def locked_file(lock_path: Path, thread_lock: Optional[threading.Lock] = None, shared: bool = False) -> Iterator[None]:
+    # Serializes writers to a file under DATA_DIR across the API and worker processes that share it. Each call opens its
+    # own descriptor, so threads of one process exclude each other too; thread_lock additionally guards in-memory state.
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with thread_lock or nullcontext(), lock_path.open("w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+_FENCE = re.compile(r"^```[a-zA-Z0-9_-]*\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+
+
+def _strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = False
+    escaped = False
+    pending_comma = None
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if pending_comma is not None:
+            if ch.isspace():
+                pending_comma.append(ch)
+                continue
+            if ch not in "}]":
+                out.extend(pending_comma)
+            else:
+                out.extend(pending_comma[1:])
+            pending_comma = None
+        if ch == ",":
+            pending_comma = [ch]
+            continue
+        if ch == '"':
+            in_string = True
+        out.append(ch)
+    if pending_comma is not None:
+        out.extend(pending_comma)
+    return "".join(out)
+
+
+def _outer_json(text: str) -> str:
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]")
+    return text[start : end + 1] if end > start else text[start:]
+
+
+def lenient_loads(raw: str) -> Any:
+    text = raw.strip().lstrip("\ufeff")
+    fenced = _FENCE.match(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    candidate = _strip_trailing_commas(_outer_json(text))
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Unparseable JSON: {exc}") from exc
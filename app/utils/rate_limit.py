@@ -1,18 +1,159 @@
 from __future__ import annotations
 
+import asyncio
+import threading
 import time
-from collections import defaultdict
-from typing import DefaultDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, domain: str, retry_in_s: float) -> None:
+        super().__init__(f"Circuit open for {domain}; retry in {retry_in_s:.1f}s")
+        self.domain = domain
+        self.retry_in_s = retry_in_s
+
+
+@dataclass
+class _DomainState:
+    interval_s: float
+    floor_s: float
+    next_allowed: float = 0.0
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    probing: bool = False
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
 
 
 class DomainRateLimiter:
-    def __init__(self, min_interval_s: float) -> None:
+    def __init__(
+        self,
+        min_interval_s: float,
+        floor_interval_s: Optional[float] = None,
+        max_interval_s: float = 60.0,
+        target_latency_s: float = 2.0,
+        backoff_factor: float = 2.0,
+        failure_threshold: int = 5,
+        cooldown_s: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
         self.min_interval_s = min_interval_s
-        self._last_seen: DefaultDict[str, float] = defaultdict(lambda: 0.0)
+        self.floor_interval_s = min_interval_s if floor_interval_s is None else min(floor_interval_s, min_interval_s)
+        self.max_interval_s = max(max_interval_s, min_interval_s)
+        self.target_latency_s = target_latency_s
+        self.backoff_factor = backoff_factor
+        # Additive step in rate terms: each fast response shortens the interval by a tenth of the start value.
+        self.additive_step_s = max(min_interval_s * 0.1, 0.01)
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._sleep = sleep
+        self._domains: Dict[str, _DomainState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = _DomainState(interval_s=self.min_interval_s, floor_s=self.floor_interval_s)
+            self._domains[domain] = state
+        return state
+
+    def _reserve(self, domain: str) -> float:
+        with self._lock:
+            state = self._state(domain)
+            now = self._clock()
+            if state.open_until:
+                if now < state.open_until or state.probing:
+                    raise CircuitOpenError(domain, max(state.open_until - now, 0.0))
+                # Half-open: let a single probe through; its outcome closes or re-opens the circuit.
+                state.probing = True
+            slot = max(now, state.next_allowed)
+            state.next_allowed = slot + state.interval_s
+            return slot - now
 
     def wait(self, domain: str) -> None:
-        now = time.time()
-        elapsed = now - self._last_seen[domain]
-        if elapsed < self.min_interval_s:
-            time.sleep(self.min_interval_s - elapsed)
-        self._last_seen[domain] = time.time()
+        delay = self._reserve(domain)
+        if delay > 0:
+            self._sleep(delay)
+
+    async def wait_async(self, domain: str) -> None:
+        delay = self._reserve(domain)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def release(self, domain: str) -> None:
+        # Ends a reservation that produced no response to record (robots denial, local error). A half-open probe is
+        # handed back so the next request can probe, instead of the circuit staying open for good.
+        with self._lock:
+            state = self._domains.get(domain)
+            if state is not None:
+                state.probing = False
+
+    def allow(self, domain: str) -> bool:
+        with self._lock:
+            state = self._domains.get(domain)
+            return state is None or not state.open_until or (self._clock() >= state.open_until and not state.probing)
+
+    def interval(self, domain: str) -> float:
+        with self._lock:
+            return self._state(domain).interval_s
+
+    def set_crawl_delay(self, domain: str, delay_s: Optional[float]) -> None:
+        if not delay_s:
+            return
+        with self._lock:
+            state = self._state(domain)
+            state.floor_s = max(self.floor_interval_s, float(delay_s))
+            state.interval_s = min(max(state.interval_s, state.floor_s), max(self.max_interval_s, state.floor_s))
+
+    def record(
+        self,
+        domain: str,
+        latency_s: Optional[float] = None,
+        status: Optional[int] = None,
+        retry_after_s: Optional[float] = None,
+        error: bool = False,
+    ) -> None:
+        with self._lock:
+            state = self._state(domain)
+            now = self._clock()
+            ceiling = max(self.max_interval_s, state.floor_s)
+
+            if status in THROTTLE_STATUSES:
+                state.interval_s = min(ceiling, state.interval_s * self.backoff_factor)
+                if retry_after_s is not None:
+                    state.next_allowed = max(state.next_allowed, now + retry_after_s)
+            elif not error and (status is None or status < 500):
+                if latency_s is not None and latency_s > self.target_latency_s:
+                    state.interval_s = min(ceiling, state.interval_s * 1.25)
+                else:
+                    state.interval_s = max(state.floor_s, state.interval_s - self.additive_step_s)
+
+            if error or (status is not None and status >= 500):
+                state.consecutive_failures += 1
+                if state.probing or state.consecutive_failures >= self.failure_threshold:
+                    state.open_until = now + self.cooldown_s
+                state.probing = False
+            else:
+                state.consecutive_failures = 0
+                state.open_until = 0.0
+                state.probing = False
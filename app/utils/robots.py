@@ -1,23 +1,65 @@
 from __future__ import annotations
 
+import threading
+import time
 import urllib.robotparser
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 import httpx
 
 from app.core.config import settings
 
+ROBOTS_TTL_S = 3600.0
 
-def can_fetch(url: str, user_agent: str) -> bool:
-    parsed = urlparse(url)
-    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+_cache: Dict[Tuple[str, str], Tuple[float, Optional[urllib.robotparser.RobotFileParser]]] = {}
+_lock = threading.Lock()
+
+
+def _load(robots_url: str, user_agent: str) -> Optional[urllib.robotparser.RobotFileParser]:
     rp = urllib.robotparser.RobotFileParser()
     try:
         with httpx.Client(timeout=settings.request_timeout_s, headers={"User-Agent": user_agent}) as client:
             resp = client.get(robots_url)
             if resp.status_code >= 400:
-                return True
+                return None
             rp.parse(resp.text.splitlines())
+        return rp
+    except Exception:
+        return None
+
+
+def _parser(url: str, user_agent: str) -> Optional[urllib.robotparser.RobotFileParser]:
+    parsed = urlparse(url)
+    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+    key = (robots_url, user_agent)
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(key)
+    if cached and now - cached[0] < ROBOTS_TTL_S:
+        return cached[1]
+    rp = _load(robots_url, user_agent)
+    with _lock:
+        _cache[key] = (now, rp)
+    return rp
+
+
+def can_fetch(url: str, user_agent: str) -> bool:
+    rp = _parser(url, user_agent)
+    if rp is None:
+        return True
+    try:
         return rp.can_fetch(user_agent, url)
     except Exception:
         return True
+
+
+def crawl_delay(url: str, user_agent: str) -> Optional[float]:
+    rp = _parser(url, user_agent)
+    if rp is None:
+        return None
+    try:
+        delay = rp.crawl_delay(user_agent)
+    except Exception:
+        return None
+    return float(delay) if delay is not None else None
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+
+
+def dumps(obj: Any) -> bytes:
+    # orjson serializes slotted dataclasses and datetimes natively; anything else falls back to str like json.dumps(default=str).
+    return orjson.dumps(obj, default=str)
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Loaded only on the code paths that use them; none should be imported by starting the API.
+HEAVY_MODULES = ("trafilatura", "readability", "bs4", "numpy", "openai", "pypdf", "httpx")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"import_s": elapsed, "modules": len(sys.modules), "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str = "app.main") -> Dict[str, Any]:
+    # A fresh interpreter per sample, so nothing is already in sys.modules.
+    probe = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    out = subprocess.run(
+        [sys.executable, "-c", probe], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_benchmark(module: str = "app.main", repeats: int = 5) -> Dict[str, Any]:
+    samples = [measure_import(module) for _ in range(repeats)]
+    times = [sample["import_s"] for sample in samples]
+    return {
+        "module": module,
+        "min_ms": round(min(times) * 1000, 1),
+        "median_ms": round(statistics.median(times) * 1000, 1),
+        "modules": samples[-1]["modules"],
+        "heavy": samples[-1]["heavy"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Time a cold import and list heavy dependencies it loads.")
+    parser.add_argument("--modules", nargs="+", default=["app.main", "app.services.pipeline", "app.services.worker"])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+    for module in args.modules:
+        result = run_benchmark(module, args.repeats)
+        heavy = ", ".join(result["heavy"]) or "-"
+        print(f"{module:<28} min {result['min_ms']:>8} ms  median {result['median_ms']:>8} ms  "
+              f"modules {result['modules']:>5}  heavy {heavy}")
+
+
+if __name__ == "__main__":
+    main()
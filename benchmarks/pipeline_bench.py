@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.metrics import StageTimer
+from app.services.pipeline import run_pipeline
+from app.services.query import generate_queries
+from benchmarks.stubs import Latency, RecordedFixtures, StubOpenAIClient, StubPageFetcher, StubSearchClient
+
+
+def run_scenario(
+    scale: int,
+    latency: Latency,
+    fixtures: Optional[RecordedFixtures] = None,
+    trace_memory: bool = True,
+    near_duplicates: bool = False,
+) -> Dict[str, Any]:
+    fixtures = fixtures or RecordedFixtures.load()
+    original_data_dir, original_key, original_near_dup = settings.data_dir, settings.openai_api_key, settings.near_dup_enabled
+    with tempfile.TemporaryDirectory(prefix="pipeline-bench-") as tmp:
+        settings.data_dir = Path(tmp)
+        settings.openai_api_key = original_key or "offline-benchmark"
+        # The recorded corpus repeats each page under many URLs; near-dup collapsing would hide scale effects.
+        settings.near_dup_enabled = near_duplicates
+        try:
+            corpus = fixtures.corpus(scale)
+            timer = StageTimer()
+            queries = generate_queries()
+            params = {
+                "top_n_per_query": math.ceil(scale / len(queries)),
+                "max_items": 25,
+                "dry_run": False,
+            }
+            search_client = StubSearchClient(corpus, latency)
+            fetcher = StubPageFetcher(fixtures, latency, timer=timer)
+            llm = StubOpenAIClient(fixtures, latency)
+
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            output, sources, _ = run_pipeline(
+                f"bench-{scale}",
+                params,
+                search_client=search_client,
+                fetcher=fetcher,
+                llm=llm,
+                timer=timer,
+            )
+            wall_s = time.perf_counter() - started
+            peak_bytes = 0
+            if trace_memory:
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        finally:
+            settings.data_dir, settings.openai_api_key = original_data_dir, original_key
+            settings.near_dup_enabled = original_near_dup
+
+    return {
+        "scale": scale,
+        "sources": len(sources),
+        "items": len(output.items),
+        "wall_s": round(wall_s, 3),
+        "peak_mem_mb": round(peak_bytes / 1e6, 2) if trace_memory else None,
+        "stages_s": output.stats.get("timings_s", {}),
+        "llm": output.stats.get("llm", {}),
+        "triage": output.stats.get("triage", {}),
+        "near_duplicates": output.stats.get("near_duplicates", {}),
+        "evidence_urls": sorted({ev.url for item in output.items for ev in item.evidence}),
+    }
+
+
+def _format_table(results: List[Dict[str, Any]]) -> str:
+    stages = sorted({stage for result in results for stage in result["stages_s"]})
+    header = ["scale", "sources", "wall_s", "peak_mb", *stages]
+    rows = [header]
+    for result in results:
+        rows.append(
+            [
+                str(result["scale"]),
+                str(result["sources"]),
+                f"{result['wall_s']:.3f}",
+                "-" if result["peak_mem_mb"] is None else f"{result['peak_mem_mb']:.2f}",
+                *[f"{result['stages_s'].get(stage, 0.0):.3f}" for stage in stages],
+            ]
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded fixtures through run_pipeline end to end.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per search call")
+    parser.add_argument("--fetch-latency", type=float, default=0.0, help="seconds per page fetch")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per embeddings call")
+    parser.add_argument("--no-trace-memory", action="store_true", help="skip tracemalloc (it slows wall time)")
+    parser.add_argument("--near-duplicates", action="store_true", help="collapse repeated pages before extraction")
+    parser.add_argument("--json", type=Path, help="write full results as JSON")
+    args = parser.parse_args(argv)
+
+    latency = Latency(
+        search_s=args.search_latency,
+        fetch_s=args.fetch_latency,
+        llm_s=args.llm_latency,
+        embed_s=args.embed_latency,
+    )
+    fixtures = RecordedFixtures.load()
+    results = [
+        run_scenario(scale, latency, fixtures, trace_memory=not args.no_trace_memory, near_duplicates=args.near_duplicates)
+        for scale in args.scales
+    ]
+    print(_format_table(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
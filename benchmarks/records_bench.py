@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.pipeline import _candidates_from_extraction, _credibility, _source_name, _source_ref
+from app.utils.serialization import dumps
+from app.utils.text import clamp_quotes
+from benchmarks.stubs import RecordedFixtures
+
+Page = Tuple[str, Optional[str], Dict[str, Any]]
+
+
+def _legacy_candidates(extracted: Dict[str, Any], url: str, published_at: Optional[str]) -> List[Dict[str, Any]]:
+    # The dict-based path run_pipeline used before typed records, kept here as the baseline.
+    candidates = []
+    for item in extracted.get("items", []):
+        quotes = clamp_quotes(item.get("evidence_quotes", []))
+        candidates.append(
+            {
+                **item,
+                "evidence": [
+                    {
+                        "source_name": _source_name(url),
+                        "url": url,
+                        "published_at": published_at,
+                        "quote": q,
+                        "credibility": _credibility(url),
+                    }
+                    for q in quotes
+                ],
+            }
+        )
+    return candidates
+
+
+def _record_candidates(extracted: Dict[str, Any], url: str, published_at: Optional[str]) -> List[Any]:
+    return _candidates_from_extraction(extracted, url, published_at)
+
+
+def _legacy_serialize(candidates: List[Any]) -> bytes:
+    # Both paths emit the same single compact payload, so the timing compares serializers rather than call counts.
+    return json.dumps({"items": candidates, "stats": {"found": len(candidates)}}, ensure_ascii=True).encode("utf-8")
+
+
+def _record_serialize(candidates: List[Any]) -> bytes:
+    return dumps({"items": candidates, "stats": {"found": len(candidates)}})
+
+
+def build_pages(fixtures: RecordedFixtures, pages: int) -> List[Page]:
+    extractions = [page["extraction"] for page in fixtures.pages.values() if page["extraction"]["items"]]
+    corpus = []
+    for i in range(pages):
+        # Pages spread over a realistic number of hosts so the per-URL source lookups repeat.
+        url = f"https://news{i % 40}.example.co.uk/story-{i}"
+        corpus.append((url, "2026-02-01", extractions[i % len(extractions)]))
+    return corpus
+
+
+def _measure(
+    build: Callable[[Dict[str, Any], str, Optional[str]], List[Any]],
+    serialize: Callable[[List[Any]], bytes],
+    corpus: List[Page],
+    repeats: int,
+) -> Dict[str, float]:
+    build_s = serialize_s = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        candidates = [c for url, published_at, extracted in corpus for c in build(extracted, url, published_at)]
+        built = time.perf_counter()
+        serialize(candidates)
+        build_s = min(build_s, built - started)
+        serialize_s = min(serialize_s, time.perf_counter() - built)
+
+    _source_ref.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    candidates = [c for url, published_at, extracted in corpus for c in build(extracted, url, published_at)]
+    retained, _ = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    return {
+        "candidates": len(candidates),
+        "build_ms": round(build_s * 1000, 3),
+        "serialize_ms": round(serialize_s * 1000, 3),
+        "retained_kb": round(retained / 1024, 1),
+        "alloc_blocks": blocks,
+    }
+
+
+def run_comparison(pages: int, repeats: int = 5, fixtures: Optional[RecordedFixtures] = None) -> Dict[str, Any]:
+    corpus = build_pages(fixtures or RecordedFixtures.load(), pages)
+    return {
+        "pages": pages,
+        "dicts": _measure(_legacy_candidates, _legacy_serialize, corpus, repeats),
+        "records": _measure(_record_candidates, _record_serialize, corpus, repeats),
+    }
+
+
+def _format_table(results: List[Dict[str, Any]]) -> str:
+    metrics = ["build_ms", "serialize_ms", "retained_kb", "alloc_blocks"]
+    header = ["pages", "path", "candidates", *metrics]
+    rows = [header]
+    for result in results:
+        for path in ("dicts", "records"):
+            row = result[path]
+            rows.append([str(result["pages"]), path, str(row["candidates"]), *[str(row[m]) for m in metrics]])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare dict candidates + json against slotted records + orjson.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+    fixtures = RecordedFixtures.load()
+    print(_format_table([run_comparison(pages, args.repeats, fixtures) for pages in args.pages]))
+
+
+if __name__ == "__main__":
+    main()
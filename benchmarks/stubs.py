@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.cache import write_artifact
+from app.services.fetcher import FetchResult, PageFetcher
+from app.services.metrics import StageTimer
+from app.services.openai_client import OpenAIClient
+from app.services.search.base import SearchResult
+from app.services.triage import local_triage_score
+from app.utils.hashing import stable_hash
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+SEED_OUTPUT = Path(__file__).resolve().parents[1] / "examples" / "sample_output.json"
+
+_URL_LINE = re.compile(r"^- URL: (\S+)$", re.MULTILINE)
+_PACKED_URL_LINE = re.compile(r"^URL: (\S+)$", re.MULTILINE)
+
+
+@dataclass
+class Latency:
+    search_s: float = 0.0
+    fetch_s: float = 0.0
+    llm_s: float = 0.0
+    embed_s: float = 0.0
+
+
+@dataclass
+class RecordedPage:
+    url: str
+    page_id: str
+    title: str
+
+
+@dataclass
+class RecordedFixtures:
+    pages: Dict[str, Dict[str, Any]]
+    seed_output: Dict[str, Any]
+    by_url: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path = FIXTURES_DIR / "recorded.json", seed_path: Path = SEED_OUTPUT) -> "RecordedFixtures":
+        pages = json.loads(path.read_text(encoding="utf-8"))["pages"]
+        seed = json.loads(seed_path.read_text(encoding="utf-8"))
+        return cls(pages=pages, seed_output=seed)
+
+    def corpus(self, scale: int) -> List[RecordedPage]:
+        page_ids = sorted(self.pages)
+        corpus = []
+        for i in range(scale):
+            page_id = page_ids[i % len(page_ids)]
+            search = self.pages[page_id]["search"]
+            url = f"https://{search['domain']}/{search['slug']}-{i}"
+            self.by_url[url] = page_id
+            corpus.append(RecordedPage(url=url, page_id=page_id, title=search["title"]))
+        return corpus
+
+    def html(self, url: str) -> Optional[str]:
+        page_id = self.by_url.get(url)
+        return self.pages[page_id]["html"] if page_id else None
+
+    def extraction(self, url: str) -> Dict[str, Any]:
+        page_id = self.by_url.get(url)
+        return self.pages[page_id]["extraction"] if page_id else {"items": []}
+
+
+class StubSearchClient:
+    def __init__(self, corpus: List[RecordedPage], latency: Latency) -> None:
+        self.corpus = corpus
+        self.latency = latency
+        self._cursor = 0
+
+    def search(self, query: str, top_n: int, recency_days: int) -> List[SearchResult]:
+        time.sleep(self.latency.search_s)
+        batch = self.corpus[self._cursor : self._cursor + top_n]
+        self._cursor += len(batch)
+        return [SearchResult(title=page.title, url=page.url, snippet=None, source="recorded") for page in batch]
+
+
+class StubPageFetcher(PageFetcher):
+    def __init__(self, fixtures: RecordedFixtures, latency: Latency, timer: Optional[StageTimer] = None) -> None:
+        super().__init__(timer=timer)
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def fetch(self, url: str, html_dest: Optional[Path] = None, pdf_dest: Optional[Path] = None) -> FetchResult:
+        with self.timer.stage("fetch"):
+            time.sleep(self.latency.fetch_s)
+            html = self.fixtures.html(url)
+            if html is not None and html_dest is not None:
+                write_artifact(html_dest, html)
+        if html is None:
+            return FetchResult(url=url, html=None, text=None)
+        self.stats["pages"] += 1
+        self.stats["bytes"] += len(html.encode("utf-8"))
+        with self.timer.stage("parse"):
+            text = self._extract_text(html)
+        return FetchResult(url=url, html=html, text=text)
+
+
+class _RecordedResponses:
+    def __init__(self, fixtures: RecordedFixtures, latency: Latency) -> None:
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def create(self, model: str, input: str, **kwargs: Any) -> Any:
+        time.sleep(self.latency.llm_s)
+        text = json.dumps(self._reply(input))
+        usage = SimpleNamespace(input_tokens=len(input) // 4, output_tokens=len(text) // 4)
+        return SimpleNamespace(output_text=text, usage=usage)
+
+    def _reply(self, prompt: str) -> Dict[str, Any]:
+        if prompt.startswith("You are an information extraction model. You receive several"):
+            items = []
+            for url in _PACKED_URL_LINE.findall(prompt):
+                items.extend({**item, "source_url": url} for item in self.fixtures.extraction(url)["items"])
+            return {"items": items}
+        if prompt.startswith("You are an information extraction model"):
+            match = _URL_LINE.search(prompt)
+            return self.fixtures.extraction(match.group(1) if match else "")
+        if prompt.startswith("You are a synthesis model"):
+            return self._synthesize(prompt)
+        if prompt.startswith("You are a relevance classifier"):
+            score = local_triage_score("", prompt.split("TEXT START", 1)[-1])
+            return {"relevant": score >= 0.5, "score": score}
+        return {"items": []}
+
+    def _synthesize(self, prompt: str) -> Dict[str, Any]:
+        candidates = json.loads(prompt.split("Input candidates JSON:\n", 1)[1])["items"]
+        seed = self.fixtures.seed_output
+        merged: Dict[str, Dict[str, Any]] = {item["title"]: item for item in seed["items"]}
+        for candidate in candidates:
+            item = merged.setdefault(
+                candidate["title"],
+                {key: value for key, value in candidate.items() if key != "evidence_quotes"} | {"evidence": []},
+            )
+            if len(item["evidence"]) < 3:
+                item["evidence"].extend(candidate.get("evidence", [])[: 3 - len(item["evidence"])])
+        items = list(merged.values())[:25]
+        return {"run_id": seed["run_id"], "scope": seed["scope"], "items": items, "stats": {"found": len(candidates)}}
+
+
+class _RecordedEmbeddings:
+    def __init__(self, latency: Latency, dimensions: int = 64) -> None:
+        self.latency = latency
+        self.dimensions = dimensions
+
+    def create(self, model: str, input: List[str], **kwargs: Any) -> Any:
+        time.sleep(self.latency.embed_s)
+        data = []
+        for text in input:
+            rng = np.random.default_rng(int(stable_hash(text), 16))
+            data.append(SimpleNamespace(embedding=rng.standard_normal(self.dimensions).tolist()))
+        usage = SimpleNamespace(prompt_tokens=sum(len(text) for text in input) // 4)
+        return SimpleNamespace(data=data, usage=usage)
+
+
+class StubOpenAIClient(OpenAIClient):
+    def __init__(self, fixtures: RecordedFixtures, latency: Latency) -> None:
+        super().__init__()
+        self.client = SimpleNamespace(
+            responses=_RecordedResponses(fixtures, latency),
+            embeddings=_RecordedEmbeddings(latency),
+        )
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db import Base
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    # A file database rather than :memory:, so sessions opened on worker and scheduler threads share the tables.
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture()
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
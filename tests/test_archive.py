@@ -0,0 +1,47 @@
+from app.core.config import settings
+from app.services.archive import ARCHIVE_NAME, RunArchive, _archives, archive_run, migrate
+from app.services.cache import html_path, read_artifact, text_path, write_artifact
+
+
+def test_archive_run_packs_and_serves_lookups(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    url = "https://www.gov.uk/guidance/cbam"
+    h_path = html_path("run-1", url)
+    t_path = text_path("run-1", url)
+    write_artifact(h_path, "<html><body>CBAM</body></html>")
+    write_artifact(t_path, "CBAM reporting – £ costs")
+
+    assert archive_run(tmp_path / "run-1") == 2
+    assert not h_path.exists() and not t_path.exists()
+    assert read_artifact(h_path) == "<html><body>CBAM</body></html>"
+    assert read_artifact(t_path) == "CBAM reporting – £ costs"
+    assert read_artifact(text_path("run-1", "https://example.com/missing")) is None
+    assert sorted(p.name for p in (tmp_path / "run-1").iterdir()) == [ARCHIVE_NAME]
+
+
+def test_migrate_merges_into_existing_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    write_artifact(text_path("run-2", "https://a.example/1"), "first")
+    archive_run(tmp_path / "run-2")
+    write_artifact(text_path("run-2", "https://a.example/2"), "second")
+
+    assert migrate(tmp_path) == {"run-2": 2}
+    archive = RunArchive(tmp_path / "run-2" / ARCHIVE_NAME)
+    try:
+        assert len(archive.names()) == 2
+        assert all(name.startswith("text/") for name in archive.names())
+    finally:
+        archive.close()
+    assert read_artifact(text_path("run-2", "https://a.example/1")) == "first"
+
+
+def test_replaced_archive_stays_open_until_its_reader_finishes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    write_artifact(text_path("run-3", "https://a.example/1"), "first")
+    archive_run(tmp_path / "run-3")
+    with _archives.open(tmp_path / "run-3" / ARCHIVE_NAME) as reader:
+        write_artifact(text_path("run-3", "https://a.example/2"), "second")
+        archive_run(tmp_path / "run-3")
+        assert reader.read("text/" + text_path("run-3", "https://a.example/1").name) == b"first"
+    assert reader._mm.closed
+    assert read_artifact(text_path("run-3", "https://a.example/2")) == "second"
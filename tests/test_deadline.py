@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+
+from app.core.config import settings
+from app.services.deadline import Deadline, HedgeDeclined, Hedger, LatencyTracker, deadline_stop
+from app.services.fetcher import PageFetcher
+from app.utils.rate_limit import DomainRateLimiter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_deadline_budgets_timeouts_and_children():
+    clock = FakeClock()
+    deadline = Deadline(60, clock=clock)
+    stage = deadline.child(reserve_s=20)
+    assert stage.remaining() == 40
+    assert deadline.timeout(15) == 15
+    clock.now += 50
+    assert stage.expired() and not deadline.expired()
+    assert deadline.timeout(15) == 10
+    clock.now += 30
+    assert deadline.timeout(15, floor=2) == 2
+
+
+def test_deadline_stop_cuts_retries_short():
+    class Flaky:
+        def __init__(self, deadline):
+            self.deadline = deadline
+            self.calls = 0
+
+        @retry(stop=stop_after_attempt(10) | deadline_stop, wait=wait_fixed(0.05))
+        def call(self):
+            self.calls += 1
+            raise ValueError("boom")
+
+    flaky = Flaky(Deadline(0.12))
+    with pytest.raises(RetryError):
+        flaky.call()
+    assert 1 < flaky.calls < 10
+
+
+def test_latency_tracker_quantile_needs_enough_samples():
+    tracker = LatencyTracker()
+    for value in range(1, 20):
+        tracker.record(value / 100)
+    assert tracker.quantile(0.95) is None
+    tracker.record(1.0)
+    assert tracker.quantile(0.95) == 0.19
+
+
+def test_hedger_races_a_backup_once_primary_passes_p95():
+    tracker = LatencyTracker()
+    for _ in range(20):
+        tracker.record(0.02)
+    hedger = Hedger(tracker, min_samples=20)
+
+    assert hedger.call(lambda: "fast") == "fast"
+    assert hedger.call(lambda: time.sleep(0.5) or "slow", lambda: "backup") == "backup"
+    assert hedger.stats == {"hedged": 1, "hedge_wins": 1}
+
+    def declined():
+        raise HedgeDeclined("pdf")
+
+    assert hedger.call(lambda: time.sleep(0.1) or "primary", declined) == "primary"
+    assert Hedger(tracker, enabled=False).call(lambda: time.sleep(0.1) or "primary", lambda: "backup") == "primary"
+
+
+def test_fetcher_skips_urls_once_deadline_expired(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    fetcher = PageFetcher(rate_limiter=DomainRateLimiter(0.0), deadline=Deadline(0))
+    result = fetcher.fetch_with_cache("run-1", "https://slow.example/page")
+    assert result.text is None
+    assert fetcher.stats["deadline_skipped"] == 1
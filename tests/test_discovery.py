@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services.discovery import DiscoveryState, FeedDiscovery, parse_feed
+from app.utils.rate_limit import DomainRateLimiter
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+RECENT = (NOW - timedelta(days=2)).isoformat()
+OLD = (NOW - timedelta(days=400)).isoformat()
+
+RSS = f"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Trade news</title><link>/news</link>
+<item><title>New tariff quota</title><link>/news/quota</link><pubDate>{format_datetime(NOW - timedelta(days=1))}</pubDate></item>
+<item><title>Archive piece</title><link>/news/archive</link><pubDate>{format_datetime(NOW - timedelta(days=400))}</pubDate></item>
+</channel></rss>"""
+
+ATOM = f"""<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Notices</title><link rel="self" href="/atom.xml"/>
+<entry><title>Rules of origin guidance</title><link href="/notices/origin"/><updated>{RECENT}</updated></entry>
+</feed>"""
+
+SITEMAP_INDEX = f"""<?xml version="1.0"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>/sitemap-pages.xml</loc><lastmod>{RECENT}</lastmod></sitemap>
+</sitemapindex>"""
+
+SITEMAP_PAGES = f"""<?xml version="1.0"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>/guidance/export-controls</loc><lastmod>{RECENT}</lastmod></url>
+<url><loc>/guidance/old</loc><lastmod>{OLD}</lastmod></url>
+</urlset>"""
+
+
+@pytest.fixture
+def feed_server():
+    documents = {"/rss.xml": RSS, "/atom.xml": ATOM, "/sitemap.xml": SITEMAP_INDEX, "/sitemap-pages.xml": SITEMAP_PAGES}
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = documents.get(self.path)
+            requests.append((self.path, self.headers.get("If-None-Match")))
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = f'"{hash(body) & 0xFFFF:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", documents, requests
+    server.shutdown()
+
+
+def test_parse_feed_handles_rss_atom_and_sitemaps():
+    rss = parse_feed(RSS.encode(), "https://trade.example/rss.xml")
+    assert [e.url for e in rss] == ["https://trade.example/news/quota", "https://trade.example/news/archive"]
+    assert rss[0].lastmod is not None and rss[0].title == "New tariff quota"
+    atom = parse_feed(ATOM.encode(), "https://trade.example/atom.xml")
+    assert [e.url for e in atom] == ["https://trade.example/notices/origin"]
+    index = parse_feed(SITEMAP_INDEX.encode(), "https://trade.example/sitemap.xml")
+    assert index[0].is_sitemap and index[0].url == "https://trade.example/sitemap-pages.xml"
+
+
+def test_discovery_returns_only_new_or_updated_urls(tmp_path, feed_server):
+    base, documents, requests = feed_server
+    feeds = [f"{base}/rss.xml", f"{base}/atom.xml", f"{base}/sitemap.xml"]
+    state_path = tmp_path / "discovery_state.jsonl"
+
+    def discover():
+        discovery = FeedDiscovery(feeds, DiscoveryState(state_path), rate_limiter=DomainRateLimiter(0.0))
+        results = discovery.discover(recency_days=30)
+        discovery.commit()
+        return {r.url.removeprefix(base) for r in results}, discovery.stats
+
+    first, stats = discover()
+    assert first == {"/news/quota", "/notices/origin", "/guidance/export-controls"}
+    assert stats["too_old"] == 2
+
+    # Unchanged feeds answer 304 to the stored ETag, and nothing is rediscovered.
+    second, stats = discover()
+    assert second == set()
+    assert stats["not_modified"] == 3
+    assert all(etag for path, etag in requests[-3:])
+
+    # An updated page in a changed feed is surfaced again; untouched entries are not.
+    documents["/atom.xml"] = ATOM.replace(RECENT, NOW.isoformat())
+    third, stats = discover()
+    assert third == {"/notices/origin"}
+    assert stats["updated"] == 1
+
+
+def test_entries_cut_by_max_urls_are_found_on_later_runs(tmp_path, feed_server, monkeypatch):
+    base, documents, requests = feed_server
+    feeds = [f"{base}/rss.xml", f"{base}/atom.xml", f"{base}/sitemap.xml"]
+    state_path = tmp_path / "discovery_state.jsonl"
+
+    def discover():
+        discovery = FeedDiscovery(feeds, DiscoveryState(state_path), max_urls=1, rate_limiter=DomainRateLimiter(0.0))
+        results = discovery.discover(recency_days=30)
+        discovery.commit()
+        return [r.url.removeprefix(base) for r in results], discovery.stats
+
+    found = []
+    for _ in range(3):
+        urls, stats = discover()
+        found += urls
+    assert sorted(found) == ["/guidance/export-controls", "/news/quota", "/notices/origin"]
+    urls, stats = discover()
+    assert urls == [] and stats["overflow"] == 0
+
+    monkeypatch.setattr(settings, "max_download_bytes", 64)
+    capped = DiscoveryState(tmp_path / "capped.jsonl")
+    discovery = FeedDiscovery([f"{base}/atom.xml"], capped, rate_limiter=DomainRateLimiter(0.0))
+    assert discovery.discover(recency_days=30) == []
+    assert discovery.stats["too_large"] == 1
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.db import Challenge, Run
+from app.services.export import ExportFilters, stream_export
+
+NOW = datetime(2026, 6, 1)
+
+
+def _challenge(run_id, i, severity="medium"):
+    return Challenge(
+        run_id=run_id,
+        title=f"Challenge {i}",
+        summary="Summary, with a comma",
+        challenge_type="Customs",
+        impact_area=["imports", "exports"],
+        severity=severity,
+        time_horizon="now",
+        uk_relevance="direct",
+        eu_relevance="indirect",
+        affected_sectors=["retail"],
+        evidence=[{"source_name": "gov.uk", "url": "https://www.gov.uk/x", "quote": "q", "published_at": None}],
+        confidence=0.5 + i / 100,
+        dedupe_key=f"k{i}",
+    )
+
+
+@pytest.fixture()
+def session_factory(session_factory):
+    db = session_factory()
+    db.add_all(
+        [
+            Run(id="old", created_at=NOW - timedelta(days=30), status="completed"),
+            Run(id="new", created_at=NOW, status="completed"),
+            Run(id="failed", created_at=NOW, status="failed"),
+        ]
+    )
+    db.add_all([_challenge("old", i) for i in range(5)])
+    db.add_all([_challenge("new", i, severity="high") for i in range(5, 12)])
+    db.add(_challenge("failed", 99))
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def test_ndjson_streams_in_chunks_and_skips_unfinished_runs(session_factory):
+    parts = list(stream_export(session_factory, ExportFilters(), "ndjson", chunk_size=4))
+    assert len(parts) == 3
+    rows = [json.loads(line) for part in parts for line in part.splitlines()]
+    assert len(rows) == 12
+    assert [row["run_id"] for row in rows[:5]] == ["old"] * 5
+    assert rows[0]["impact_area"] == ["imports", "exports"]
+
+
+def test_csv_applies_filters_and_flattens_lists(session_factory):
+    filters = ExportFilters(since=NOW - timedelta(days=1), severity="high", min_confidence=0.6)
+    body = b"".join(stream_export(session_factory, filters, "csv", chunk_size=2)).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [row["title"] for row in rows] == [f"Challenge {i}" for i in range(10, 12)]
+    assert rows[0]["impact_area"] == "imports|exports"
+    assert json.loads(rows[0]["evidence"])[0]["source_name"] == "gov.uk"
+
+
+def test_csv_with_no_rows_still_has_a_header(session_factory):
+    body = b"".join(stream_export(session_factory, ExportFilters(run_ids=["missing"]), "csv"))
+    assert body.decode("utf-8").startswith("run_id,run_created_at,title")
+
+
+def test_markdown_stream_groups_items_per_run(session_factory):
+    body = b"".join(stream_export(session_factory, ExportFilters(), "md", chunk_size=3)).decode("utf-8")
+    assert body.index("## Run old") < body.index("## Run new")
+    assert body.count("### 1. ") == 2
+
+
+def test_parquet_writes_one_row_group_per_chunk(session_factory):
+    pq = pytest.importorskip("pyarrow.parquet")
+    body = b"".join(stream_export(session_factory, ExportFilters(), "parquet", chunk_size=5))
+    parquet = pq.ParquetFile(io.BytesIO(body))
+    assert parquet.metadata.num_rows == 12
+    assert parquet.metadata.num_row_groups == 3
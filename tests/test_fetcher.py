@@ -0,0 +1,129 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from tenacity import RetryError
+
+from app.core.config import settings
+from app.services import fetcher as fetcher_module
+from app.services.fetcher import PageFetcher
+from app.utils.rate_limit import DomainRateLimiter
+
+LATIN1_PAGE = (
+    "<html><head><meta charset='iso-8859-1'><title>Tarifs</title></head>"
+    "<body><article><p>Les droits de douane sur l'acier augmentent de 25 % à partir de février.</p></article></body></html>"
+).encode("latin-1")
+
+ROUTES = {
+    "/latin1": ("text/html", LATIN1_PAGE),
+    "/video": ("video/mp4", b"\x00" * 2048),
+    "/big": ("text/html; charset=utf-8", b"<html><body>" + b"a" * 50_000 + b"</body></html>"),
+    "/report.pdf": ("application/pdf", b"%PDF-1.4\n" + b"0" * 100),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        route = ROUTES.get(self.path)
+        if route is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content_type, body = route
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture()
+def fetcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    return PageFetcher(rate_limiter=DomainRateLimiter(0.0))
+
+
+def test_streams_html_with_meta_charset_to_cache(server, fetcher, tmp_path):
+    dest = tmp_path / "page.html"
+    result = fetcher.fetch(f"{server}/latin1", html_dest=dest)
+    assert "25 % à partir de février" in result.html
+    assert dest.read_text(encoding="utf-8") == result.html
+    assert not (tmp_path / "page.html.part").exists()
+
+
+def test_rejects_unsupported_content_type_from_headers(server, fetcher):
+    result = fetcher.fetch(f"{server}/video")
+    assert result.html is None and result.content_type == "video/mp4"
+    assert fetcher.stats["rejected_content_type"] == 1
+    assert fetcher.stats["bytes"] == 0
+
+
+def test_caps_download_size(server, fetcher, monkeypatch):
+    monkeypatch.setattr(settings, "max_download_bytes", 1024)
+    result = fetcher.fetch(f"{server}/big")
+    assert len(result.html) == 1024
+    assert fetcher.stats["truncated"] == 1
+
+
+def test_pdf_bytes_are_written_to_cache_file(server, fetcher, tmp_path):
+    dest = tmp_path / "pdf" / "report.pdf"
+    result = fetcher.fetch(f"{server}/report.pdf", pdf_dest=dest)
+    assert result.content_type == "application/pdf"
+    assert dest.read_bytes().startswith(b"%PDF-1.4")
+
+
+def test_pdf_of_exactly_the_cap_is_kept(server, fetcher, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "max_download_bytes", len(ROUTES["/report.pdf"][1]))
+    dest = tmp_path / "pdf" / "report.pdf"
+    fetcher.fetch(f"{server}/report.pdf", pdf_dest=dest)
+    assert dest.read_bytes() == ROUTES["/report.pdf"][1]
+    assert fetcher.stats["pdfs"] == 1 and fetcher.stats["rejected_too_large"] == 0
+
+    monkeypatch.setattr(settings, "max_download_bytes", len(ROUTES["/report.pdf"][1]) - 1)
+    fetcher.fetch(f"{server}/report.pdf", pdf_dest=tmp_path / "pdf" / "short.pdf")
+    assert not (tmp_path / "pdf" / "short.pdf").exists()
+    assert fetcher.stats["rejected_too_large"] == 1
+
+
+def test_pdf_without_destination_is_not_counted_as_rejected(server, fetcher):
+    result = fetcher.fetch(f"{server}/report.pdf")
+    assert result.content_type == "application/pdf"
+    assert fetcher.stats["rejected_too_large"] == 0 and fetcher.stats["pdfs"] == 0
+
+
+def test_half_open_probe_is_released_when_no_response_is_recorded(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    limiter = DomainRateLimiter(0.0, failure_threshold=1, cooldown_s=0.0)
+    fetcher = PageFetcher(rate_limiter=limiter)
+    domain = server.split("://")[1]
+    limiter.record(domain, error=True)
+
+    monkeypatch.setattr(fetcher_module, "can_fetch", lambda url, agent: False)
+    assert fetcher.fetch(f"{server}/latin1").html is None
+    assert limiter.allow(domain)
+
+    monkeypatch.setattr(fetcher_module, "can_fetch", lambda url, agent: True)
+
+    def broken_stream(self, *args, **kwargs):
+        raise ValueError("bad request")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(httpx.Client, "stream", broken_stream)
+        with pytest.raises(RetryError):
+            fetcher.fetch.retry_with(stop=lambda state: True)(fetcher, f"{server}/latin1")
+    assert limiter.allow(domain)
+
+    assert "février" in fetcher.fetch(f"{server}/latin1").html
+    assert limiter.allow(domain)
@@ -0,0 +1,90 @@
+import time
+
+from app.services.fingerprints import FingerprintIndex, hamming, shingles, simhash
+from benchmarks.pipeline_bench import run_scenario
+from benchmarks.stubs import Latency
+
+STORY = (
+    "Shipping lines diverted container vessels away from the Red Sea after further attacks, adding up to two weeks "
+    "to Asia to Europe voyages. Freight rates into Rotterdam and Felixstowe rose sharply and importers warned of "
+    "stock shortages for retail and automotive parts through the spring as insurers raised war risk premiums. "
+    "Carriers said the longer route around the Cape of Good Hope would absorb around a tenth of global container "
+    "capacity, and several announced emergency surcharges on bookings from Shanghai and Singapore. UK retailers "
+    "told ministers that clothing and electronics deliveries were already running late, while European car plants "
+    "reported gaps in parts supply that could pause assembly lines for days."
+)
+
+
+def test_simhash_is_close_for_syndicated_copies_and_far_for_other_text():
+    original = simhash(shingles(STORY))
+    syndicated = simhash(shingles("LONDON (Wire) - " + STORY + " Additional reporting by a staff correspondent."))
+    edited = simhash(shingles(STORY.replace("sharply", "steeply")))
+    unrelated = simhash(shingles("The council approved a new cycle lane on the high street after a public consultation ran all summer."))
+    assert hamming(original, syndicated) <= 7
+    assert hamming(original, edited) < hamming(original, unrelated)
+
+
+def test_index_finds_near_matches_and_persists(tmp_path):
+    path = tmp_path / "fingerprints.jsonl"
+    index = FingerprintIndex(path)
+    value = simhash(shingles(STORY))
+    index.add("https://wire.example/a", value, "https://wire.example/a", "run-1")
+    index.store_extraction("https://wire.example/a", {"items": [{"title": "Red Sea diversions"}]})
+
+    near = value ^ 0b10110
+    assert index.lookup(near).cluster == "https://wire.example/a"
+    assert index.lookup(value ^ 0xFFFF_FFFF) is None
+
+    reloaded = FingerprintIndex(path)
+    assert len(reloaded) == 1
+    assert reloaded.lookup(near).url == "https://wire.example/a"
+    assert reloaded.extraction("https://wire.example/a")["items"][0]["title"] == "Red Sea diversions"
+
+
+def test_index_skips_torn_lines(tmp_path):
+    path = tmp_path / "fingerprints.jsonl"
+    FingerprintIndex(path).add("https://a.example/1", 42, "https://a.example/1", "run-1")
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write('{"url": "https://b.exa')
+    assert len(FingerprintIndex(path)) == 1
+
+
+def test_pipeline_extracts_once_per_cluster_and_keeps_all_urls_as_evidence():
+    result = run_scenario(10, Latency(), trace_memory=False, near_duplicates=True)
+    assert result["sources"] == 10
+    assert result["near_duplicates"]["duplicates"] == 6
+    assert result["llm"]["packed_documents"] == 4
+    assert len(result["evidence_urls"]) > 4
+
+
+def test_index_expires_old_entries_and_ignores_extractions_from_another_version(tmp_path):
+    path = tmp_path / "fingerprints.jsonl"
+    index = FingerprintIndex(path, version="v1")
+    index.add("https://a.example/1", 42, "https://a.example/1", "run-1")
+    index.store_extraction("https://a.example/1", {"items": []})
+    assert FingerprintIndex(path, version="v1").extraction("https://a.example/1") == {"items": []}
+    assert FingerprintIndex(path, version="v2").extraction("https://a.example/1") is None
+
+    later = time.time() + 31 * 86400
+    expired = FingerprintIndex(path, ttl_days=30, version="v1", now=later)
+    assert len(expired) == 0
+    assert expired.extraction("https://a.example/1") is None
+
+
+def test_compact_drops_deleted_runs_expired_entries_and_stale_extractions(tmp_path):
+    path = tmp_path / "fingerprints.jsonl"
+    old = FingerprintIndex(path, version="v1")
+    old.add("https://a.example/1", 1, "https://a.example/1", "run-1")
+    old.store_extraction("https://a.example/1", {"items": ["stale"]})
+    index = FingerprintIndex(path, ttl_days=30, version="v2")
+    index.add("https://a.example/1", 1 | 1 << 40, "https://a.example/1", "run-2")
+    index.add("https://b.example/1", 1 << 20, "https://b.example/1", "run-3")
+    index.store_extraction("https://b.example/1", {"items": ["fresh"]})
+
+    assert index.compact(drop_runs=["run-3"]) == 4
+    assert len(path.read_text().splitlines()) == 1
+    reloaded = FingerprintIndex(path, ttl_days=30, version="v2")
+    assert [entry.run_id for entry in reloaded._by_url.values()] == ["run-2"]
+    assert reloaded.extraction("https://b.example/1") is None
+    assert index.compact(now=time.time() + 31 * 86400) == 1
+    assert path.read_text() == ""
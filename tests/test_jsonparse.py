@@ -0,0 +1,22 @@
+import pytest
+
+from app.utils.jsonparse import lenient_loads
+
+
+def test_strips_code_fences_and_trailing_commas():
+    raw = '```json\n{"items": [{"title": "a, b",}, ],}\n```'
+    assert lenient_loads(raw) == {"items": [{"title": "a, b"}]}
+
+
+def test_extracts_object_from_surrounding_prose():
+    raw = 'Here is the JSON you asked for:\n{"items": []}\nLet me know if you need more.'
+    assert lenient_loads(raw) == {"items": []}
+
+
+def test_keeps_commas_inside_strings():
+    assert lenient_loads('{"quote": "tariffs, ]quotas,}",}') == {"quote": "tariffs, ]quotas,}"}
+
+
+def test_raises_value_error_when_unrecoverable():
+    with pytest.raises(ValueError):
+        lenient_loads('{"items": [')
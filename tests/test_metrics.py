@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+from tenacity import retry, stop_after_attempt, wait_none
+
+from app.services.metrics import StageTimer, count_retry
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+class _Client:
+    def __init__(self) -> None:
+        self.stats: Counter[str] = Counter()
+        self.calls = 0
+
+    @retry(stop=stop_after_attempt(3), wait=wait_none(), before_sleep=count_retry("fetch"))
+    def call(self) -> str:
+        self.calls += 1
+        if self.calls < 3:
+            raise _RateLimited()
+        return "ok"
+
+
+def test_stage_timer_accumulates_per_stage():
+    timer = StageTimer()
+    with timer.stage("fetch"):
+        pass
+    with timer.stage("fetch"):
+        pass
+    with pytest.raises(RuntimeError):
+        with timer.stage("parse"):
+            raise RuntimeError("boom")
+    assert set(timer.as_stats()) == {"fetch", "parse"}
+
+
+def test_retries_and_429s_are_mirrored_into_instance_stats():
+    client = _Client()
+    assert client.call() == "ok"
+    assert client.stats["fetch_retries"] == 2
+    assert client.stats["fetch_429s"] == 2
+
+
+def test_stage_timer_reports_wall_time_alongside_cumulative_thread_time():
+    timer = StageTimer()
+    barrier = threading.Barrier(4)
+
+    def work():
+        barrier.wait()
+        with timer.stage("parse"):
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 0.1 <= timer.as_stats()["parse"] < 0.3
+    assert timer.as_cumulative_stats()["parse"] >= 0.4
@@ -0,0 +1,103 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from tenacity import wait_none
+
+from app.core.config import settings
+from app.services.openai_client import EXTRACTION_FORMAT, JSONRepairError, OpenAIClient
+
+
+class _Responses:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(output_text=self.outputs.pop(0), usage=None)
+
+
+def _client(monkeypatch, outputs):
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    client = OpenAIClient()
+    client.client = SimpleNamespace(responses=_Responses(outputs))
+    return client
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def test_extraction_schema_is_strict():
+    _, schema = EXTRACTION_FORMAT
+    objects = [node for node in _walk(schema) if node.get("type") == "object"]
+    assert objects
+    for node in objects:
+        assert node["additionalProperties"] is False
+        assert sorted(node["required"]) == sorted(node["properties"])
+    assert not any("default" in node or "format" in node for node in _walk(schema))
+
+
+def test_extraction_requests_structured_output(monkeypatch):
+    client = _client(monkeypatch, ['{"items": []}'])
+    assert client.extract_candidates("text", "https://example.com", "title", None) == {"items": []}
+    fmt = client.client.responses.calls[0]["text"]["format"]
+    assert fmt["type"] == "json_schema" and fmt["strict"] is True
+    assert client.json_parse_stats()["strict"] == 1
+
+
+def test_lenient_parse_avoids_remote_repair(monkeypatch):
+    client = _client(monkeypatch, ['```json\n{"items": [],}\n```'])
+    assert client.extract_candidates("text", "https://example.com", "title", None) == {"items": []}
+    assert len(client.client.responses.calls) == 1
+    assert client.json_parse_stats()["lenient"] == 1
+
+
+def test_remote_repair_is_last_resort(monkeypatch):
+    client = _client(monkeypatch, ["items: none", json.dumps({"items": []})])
+    assert client.extract_candidates("text", "https://example.com", "title", None) == {"items": []}
+    assert len(client.client.responses.calls) == 2
+    stats = client.json_parse_stats()
+    assert stats["remote_repair"] == 1 and stats["remote_repair_rate"] == 1.0
+
+
+def test_failed_repair_is_not_retried_by_the_extraction(monkeypatch):
+    monkeypatch.setattr(OpenAIClient._repair_json.retry, "wait", wait_none())
+    client = _client(monkeypatch, ['["not", "an", "object"]', "[]", '"still not"', json.dumps({"items": []})])
+    with pytest.raises(JSONRepairError):
+        client.extract_candidates("text", "https://example.com", "title", None)
+    assert len(client.client.responses.calls) == 3
+    assert client.stats["json_repair_failures"] == 1
+
+
+def test_packed_extraction_splits_items_by_source_url(monkeypatch):
+    from app.services.packing import PackDocument
+
+    reply = {
+        "items": [
+            {"source_url": "https://a.example/1/", "title": "A"},
+            {"source_url": "https://b.example/2", "title": "B"},
+            {"source_url": "https://made-up.example", "title": "C"},
+        ]
+    }
+    client = _client(monkeypatch, [json.dumps(reply)])
+    docs = [
+        PackDocument(url="https://a.example/1", title="a", published_at=None, text="alpha"),
+        PackDocument(url="https://b.example/2", title="b", published_at="2026-01-01", text="beta"),
+        PackDocument(url="https://c.example/3", title="c", published_at=None, text="gamma"),
+    ]
+    results = client.extract_candidates_packed(docs)
+    assert [item["title"] for item in results["https://a.example/1"]["items"]] == ["A"]
+    assert [item["title"] for item in results["https://b.example/2"]["items"]] == ["B"]
+    assert results["https://c.example/3"] == {"items": []}
+    prompt = client.client.responses.calls[0]["input"]
+    assert "=== DOCUMENT 3 ===\nURL: https://c.example/3" in prompt
+    assert client.stats["packed_items_unattributed"] == 1
+    assert client.stats["packed_documents"] == 3
@@ -0,0 +1,25 @@
+from app.services.packing import DocumentPacker, PackDocument
+
+
+def _doc(i: int, chars: int) -> PackDocument:
+    return PackDocument(url=f"https://news.example/{i}", title=f"t{i}", published_at=None, text="x" * chars)
+
+
+def test_packer_fills_up_to_token_budget_in_order():
+    packer = DocumentPacker(token_budget=100, max_docs=10)
+    ready = [packer.add(_doc(i, 160)) for i in range(5)]
+    assert ready[:2] == [None, None]
+    assert [doc.url for doc in ready[2]] == ["https://news.example/0", "https://news.example/1"]
+    assert [doc.url for doc in packer.flush()] == ["https://news.example/4"]
+    assert packer.flush() is None
+
+
+def test_packer_respects_max_docs_and_oversized_documents():
+    packer = DocumentPacker(token_budget=10_000, max_docs=2)
+    assert packer.add(_doc(0, 10)) is None
+    assert packer.add(_doc(1, 10)) is None
+    assert len(packer.add(_doc(2, 10))) == 2
+
+    packer = DocumentPacker(token_budget=10, max_docs=5)
+    assert packer.add(_doc(0, 400)) is None
+    assert [doc.url for doc in packer.add(_doc(1, 4))] == ["https://news.example/0"]
@@ -0,0 +1,80 @@
+import multiprocessing
+import threading
+import time
+
+from app.services.pdf import PdfExtractor, extract_pdf_text
+
+
+def _write_pdf(path, pages):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def test_extract_stops_at_page_limit_and_char_budget(tmp_path):
+    path = tmp_path / "guidance.pdf"
+    _write_pdf(path, ["CBAM reporting starts in October", "Importers must register", "Annex on penalties"])
+
+    assert extract_pdf_text(str(path), max_pages=10, max_chars=10_000).count("\n\n") == 2
+    two_pages = extract_pdf_text(str(path), max_pages=2, max_chars=10_000)
+    assert "Importers must register" in two_pages and "Annex" not in two_pages
+    assert extract_pdf_text(str(path), max_pages=10, max_chars=10) == "CBAM repor"
+
+
+def test_extractor_runs_in_worker_pool_and_survives_bad_files(tmp_path):
+    good = tmp_path / "good.pdf"
+    _write_pdf(good, ["Steel safeguard quotas extended"])
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"not a pdf")
+
+    extractor = PdfExtractor(workers=1, timeout_s=30)
+    try:
+        assert extractor.extract(good, max_pages=5, max_chars=1000) == "Steel safeguard quotas extended"
+        assert extractor.extract(bad, max_pages=5, max_chars=1000) is None
+    finally:
+        extractor.close()
+
+
+def test_timeout_kills_only_the_stuck_worker(tmp_path):
+    good = tmp_path / "good.pdf"
+    _write_pdf(good, ["Rules of origin derogation"])
+    extractor = PdfExtractor(workers=2, timeout_s=3)
+    try:
+        assert extractor.extract(good, max_pages=5, max_chars=1000) == "Rules of origin derogation"
+        stuck = []
+
+        def hang():
+            try:
+                extractor._run(time.sleep, (60,))
+            except multiprocessing.TimeoutError:
+                stuck.append(True)
+
+        thread = threading.Thread(target=hang)
+        thread.start()
+        assert extractor.extract(good, max_pages=5, max_chars=1000) == "Rules of origin derogation"
+        thread.join(30)
+        assert stuck == [True]
+        # The extraction that ran alongside the timeout kept its worker; only the stuck one was killed.
+        assert len(extractor._idle) == 1 and extractor._idle[0].process.is_alive()
+        assert extractor.extract(good, max_pages=5, max_chars=1000) == "Rules of origin derogation"
+    finally:
+        extractor.close()
@@ -0,0 +1,12 @@
+from benchmarks.pipeline_bench import run_scenario
+from benchmarks.stubs import Latency
+
+
+def test_offline_pipeline_replays_fixtures_end_to_end():
+    result = run_scenario(10, Latency(), trace_memory=False)
+    assert result["sources"] == 10
+    assert result["items"] >= 3
+    assert {"search", "fetch", "parse", "extraction", "synthesis", "embeddings"} <= set(result["stages_s"])
+    assert result["llm"]["packed_documents"] == 10
+    assert result["llm"]["extraction_calls"] < 10
+    assert result["llm"]["synthesis_calls"] == 1
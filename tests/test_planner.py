@@ -0,0 +1,55 @@
+from app.services.planner import YieldPlanner, allocate
+from app.services.search.base import SearchResult
+
+
+def test_allocate_respects_budget_floor_and_cap():
+    allocation = allocate({"a": 3.0, "b": 1.0, "c": 0.0}, budget=12, max_top_n=8)
+    assert sum(allocation.values()) == 12
+    assert allocation["c"] == 1
+    assert allocation["a"] > allocation["b"] > allocation["c"]
+    assert max(allocate({"a": 1.0}, budget=50, max_top_n=8).values()) == 8
+
+
+def test_allocate_never_exceeds_a_budget_smaller_than_the_query_count(tmp_path):
+    allocation = allocate({"a": 0.2, "b": 3.0, "c": 1.0}, budget=2, max_top_n=8)
+    assert allocation == {"a": 0, "b": 1, "c": 1}
+
+    plan = YieldPlanner(tmp_path / "yield_history.json").plan(["q1", "q2", "q3"], page_budget=1)
+    assert sum(q.top_n for q in plan.queries) == 1
+    assert len(plan.unfunded) == 2 and plan.stats()["queries_unfunded"] == 2
+
+
+def test_unseen_queries_split_budget_evenly(tmp_path):
+    planner = YieldPlanner(tmp_path / "yield_history.json")
+    plan = planner.plan(["tariffs uk", "sanctions eu", "tariffs uk"], page_budget=10)
+    assert [(q.query, q.top_n) for q in plan.queries] == [("tariffs uk", 5), ("sanctions eu", 5)]
+
+
+def test_history_shifts_budget_and_drops_stale_queries(tmp_path):
+    path = tmp_path / "yield_history.json"
+    queries = ["rich query", "dry query"]
+    planner = YieldPlanner(path, stale_runs=2, retry_after_runs=1)
+    for run in range(2):
+        plan = planner.plan(queries, page_budget=10)
+        url_queries = {f"https://good.example/{run}": "rich query", f"https://spam.example/{run}": "dry query"}
+        planner.record(
+            plan,
+            url_queries,
+            list(url_queries),
+            {f"https://good.example/{run}": 4},
+            {f"https://good.example/{run}": 1},
+        )
+
+    reloaded = YieldPlanner(path, stale_runs=2, retry_after_runs=1)
+    plan = reloaded.plan(queries, page_budget=10)
+    assert plan.dropped == ["dry query"]
+    assert [(q.query, q.top_n) for q in plan.queries] == [("rich query", 10)]
+
+    ordered = reloaded.order_results(
+        [SearchResult("spam", "https://spam.example/x"), SearchResult("good", "https://www.good.example/y")]
+    )
+    assert [r.title for r in ordered] == ["good", "spam"]
+
+    # A dropped query is retried once it has sat out retry_after_runs runs.
+    reloaded.record(plan, {}, [], {}, {})
+    assert "dry query" in [q.query for q in reloaded.plan(queries, page_budget=10).queries]
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.rate_limit import CircuitOpenError, DomainRateLimiter, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _limiter(clock: FakeClock, **kwargs) -> DomainRateLimiter:
+    return DomainRateLimiter(1.0, floor_interval_s=0.2, max_interval_s=8.0, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_reservations_space_out_requests_per_domain():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    limiter.wait("a.example")
+    limiter.wait("a.example")
+    limiter.wait("b.example")
+    assert clock.slept == [1.0]
+
+
+def test_aimd_speeds_up_on_fast_responses_and_backs_off_on_429():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    for _ in range(20):
+        limiter.record("cdn.example", latency_s=0.1, status=200)
+    assert limiter.interval("cdn.example") == pytest.approx(0.2)
+
+    limiter.record("cdn.example", status=429, retry_after_s=30)
+    assert limiter.interval("cdn.example") == pytest.approx(0.4)
+    limiter.wait("cdn.example")
+    assert clock.slept == [30.0]
+
+    limiter.record("slow.example", latency_s=5.0, status=200)
+    assert limiter.interval("slow.example") == pytest.approx(1.25)
+
+
+def test_crawl_delay_sets_floor():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    limiter.set_crawl_delay("gov.example", 5)
+    for _ in range(50):
+        limiter.record("gov.example", latency_s=0.1, status=200)
+    assert limiter.interval("gov.example") == pytest.approx(5.0)
+
+
+def test_circuit_opens_after_failures_and_half_opens_after_cooldown():
+    clock = FakeClock()
+    limiter = _limiter(clock, failure_threshold=3, cooldown_s=60)
+    for _ in range(3):
+        limiter.record("down.example", error=True)
+    with pytest.raises(CircuitOpenError):
+        limiter.wait("down.example")
+    assert not limiter.allow("down.example")
+
+    clock.now += 61
+    limiter.wait("down.example")
+    with pytest.raises(CircuitOpenError):
+        limiter.wait("down.example")
+    limiter.record("down.example", latency_s=0.5, status=200)
+    assert limiter.allow("down.example")
+
+
+def test_release_hands_back_an_unused_probe():
+    clock = FakeClock()
+    limiter = _limiter(clock, failure_threshold=1, cooldown_s=60)
+    limiter.record("down.example", error=True)
+    clock.now += 61
+    limiter.wait("down.example")
+    assert not limiter.allow("down.example")
+    limiter.release("down.example")
+    assert limiter.allow("down.example")
+    limiter.wait("down.example")
+    limiter.record("down.example", error=True)
+    assert not limiter.allow("down.example")
+
+
+def test_wait_async_uses_same_reservations():
+    limiter = DomainRateLimiter(0.01)
+
+    async def run() -> None:
+        await asyncio.gather(*(limiter.wait_async("a.example") for _ in range(3)))
+
+    asyncio.run(run())
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    now = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Thu, 01 Jan 2026 12:00:30 GMT", now=now) == 30.0
+    assert parse_retry_after("soon") is None
@@ -0,0 +1,37 @@
+import json
+
+from app.services.records import CandidateRecord, SourceRef
+from app.utils.serialization import dumps
+from benchmarks.records_bench import run_comparison
+
+SOURCE = SourceRef(url="https://www.gov.uk/guidance/cbam", source_name="gov.uk", credibility="high")
+
+
+def test_from_extraction_coerces_once_and_drops_untitled_items():
+    record = CandidateRecord.from_extraction(
+        {"title": " CBAM reporting ", "impact_area": "exports", "confidence": "1.7", "affected_sectors": ["steel", None]},
+        SOURCE,
+        "2026-01-10",
+        ["Importers must report embedded emissions."],
+    )
+    assert record.title == "CBAM reporting"
+    assert record.impact_area == ["exports"]
+    assert record.affected_sectors == ["steel"]
+    assert record.confidence == 1.0
+    assert record.evidence[0].credibility == "high" and record.evidence[0].published_at == "2026-01-10"
+    assert CandidateRecord.from_extraction({"summary": "no title"}, SOURCE, None, []) is None
+
+
+def test_records_serialize_like_the_old_candidate_dicts():
+    record = CandidateRecord.from_extraction({"title": "t", "summary": "s"}, SOURCE, None, ["q"])
+    payload = json.loads(dumps({"items": [record]}))
+    assert payload["items"][0]["evidence"] == [
+        {"source_name": "gov.uk", "url": SOURCE.url, "published_at": None, "quote": "q", "credibility": "high"}
+    ]
+    assert not hasattr(record, "__dict__")
+
+
+def test_records_benchmark_reports_both_paths():
+    result = run_comparison(20, repeats=1)
+    assert result["dicts"]["candidates"] == result["records"]["candidates"] > 0
+    assert result["records"]["serialize_ms"] >= 0
@@ -0,0 +1,35 @@
+import gzip
+
+from app.services.response_cache import ResponseCache, accepts_gzip, etag_matches
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", b"{}")
+    cache.put("b", b"[]")
+    assert cache.get("a") is not None
+    cache.put("c", b"null")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_etag_is_strong_and_matches_if_none_match():
+    cache = ResponseCache(max_entries=4)
+    entry = cache.put("run", b'{"items":[]}')
+    assert entry.etag.startswith('"') and not entry.etag.startswith("W/")
+    assert etag_matches(entry.etag, entry.etag)
+    assert etag_matches(f'"other", W/{entry.etag}', entry.etag)
+    assert etag_matches("*", entry.etag)
+    assert not etag_matches('"other"', entry.etag)
+    assert not etag_matches(None, entry.etag)
+
+
+def test_gzip_precomputed_when_enabled():
+    body = b'{"items":[' + b'{"title":"x"},' * 200 + b'{}]}'
+    entry = ResponseCache(max_entries=1, gzip_enabled=True).put("run", body)
+    assert entry.gzipped is not None
+    assert gzip.decompress(entry.gzipped) == body
+    assert ResponseCache(max_entries=1).put("run", body).gzipped is None
+    assert accepts_gzip("br, gzip;q=0.8")
+    assert not accepts_gzip("gzip;q=0")
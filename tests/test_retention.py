@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.db import CacheEntry, Challenge, Run, Source
+from app.services.fingerprints import INDEX_NAME, FingerprintIndex
+from app.services.retention import RetentionPolicy, apply_retention, select_expired_runs
+from app.services.vector_index import VectorIndex
+
+NOW = datetime(2026, 6, 1)
+
+RUNS = [
+    ("new", NOW - timedelta(days=1), "completed"),
+    ("old-completed", NOW - timedelta(days=40), "completed"),
+    ("old-failed", NOW - timedelta(days=50), "failed"),
+    ("old-running", NOW - timedelta(days=60), "running"),
+    ("oldest", NOW - timedelta(days=70), "completed"),
+]
+
+
+def _challenge(run_id, key):
+    return Challenge(
+        run_id=run_id, title=f"t{key}", summary="s", challenge_type="Other", impact_area=[], severity="low",
+        time_horizon="now", uk_relevance="direct", eu_relevance="direct", affected_sectors=[], evidence=[],
+        confidence=0.5, dedupe_key=str(key),
+    )
+
+
+def test_select_expired_runs_applies_age_and_count_independently():
+    both = RetentionPolicy(keep_last_runs=3, max_age_days=45)
+    assert select_expired_runs(RUNS, both, NOW) == ["old-failed", "oldest"]
+    age_only = RetentionPolicy(keep_last_runs=None, max_age_days=30)
+    assert select_expired_runs(RUNS, age_only, NOW) == ["old-completed", "old-failed", "oldest"]
+    count_only = RetentionPolicy(keep_last_runs=2, max_age_days=None)
+    assert select_expired_runs(RUNS, count_only, NOW) == ["old-failed", "oldest"]
+    assert select_expired_runs(RUNS, RetentionPolicy(keep_last_runs=None, max_age_days=None), NOW) == []
+
+
+def test_count_only_retention_deletes_runs_past_the_newest(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    for day in range(4):
+        db.add(Run(id=f"run-{day}", created_at=NOW - timedelta(days=day), status="completed"))
+    db.commit()
+
+    report = apply_retention(db, RetentionPolicy(keep_last_runs=2, max_age_days=None), dry_run=False, now=NOW)
+    assert report.runs == ["run-2", "run-3"]
+    assert sorted(run.id for run in db.query(Run).all()) == ["run-0", "run-1"]
+
+
+def test_apply_retention_reports_then_deletes_run_files_rows_and_global_index_entries(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+
+    old_text = tmp_path / "old" / "text" / "a.txt"
+    new_text = tmp_path / "new" / "text" / "b.txt"
+    for path, body in ((old_text, "x" * 10), (new_text, "y" * 5)):
+        path.parent.mkdir(parents=True)
+        path.write_text(body)
+
+    db.add_all(
+        [
+            Run(id="old", created_at=NOW - timedelta(days=100), status="completed"),
+            Run(id="new", created_at=NOW, status="completed"),
+            Source(run_id="old", url="https://a", text_path=str(old_text)),
+            Source(run_id="new", url="https://b", text_path=str(new_text)),
+        ]
+    )
+    db.add_all([_challenge("old", i) for i in range(3)] + [_challenge("new", 3)])
+    db.commit()
+    ids = {run_id: [c.id for c in db.query(Challenge).filter_by(run_id=run_id)] for run_id in ("old", "new")}
+
+    vectors = VectorIndex.from_settings()
+    vectors.add(ids["old"] + ids["new"], np.eye(4).tolist(), settings.openai_embedding_model)
+    fingerprints = FingerprintIndex.from_settings()
+    fingerprints.add("https://a", 1, "https://a", "old")
+    fingerprints.add("https://b", 1 << 40, "https://b", "new")
+    policy = RetentionPolicy(keep_last_runs=1, max_age_days=30, batch_size=2)
+
+    report = apply_retention(db, policy, dry_run=True, now=NOW)
+    assert report.runs == ["old"]
+    assert report.rows == {
+        "sources": 1, "challenges": 3, "search_documents": 0, "work_items": 0, "cache_entries": 0, "runs": 1,
+        "fingerprints": 1, "vectors": 3,
+    }
+    assert (report.files, report.bytes) == (1, 10)
+    assert old_text.exists()
+    assert len(VectorIndex.from_settings()) == 4 and len(FingerprintIndex.from_settings()) == 2
+
+    report = apply_retention(db, policy, dry_run=False, now=NOW)
+    assert report.rows == {
+        "sources": 1, "challenges": 3, "search_documents": 0, "work_items": 0, "cache_entries": 0, "runs": 1,
+        "fingerprints": 1, "vectors": 3,
+    }
+    assert not (tmp_path / "old").exists()
+    assert new_text.exists()
+    assert db.query(Challenge).count() == 1
+    assert [run.id for run in db.query(Run).all()] == ["new"]
+
+    reopened = VectorIndex.from_settings()
+    assert len(reopened) == 1
+    assert [cid for cid, _ in reopened.search(np.eye(4)[0], k=4)] == ids["new"]
+    assert [line for line in (tmp_path / INDEX_NAME).read_text().splitlines() if '"old"' in line] == []
+    assert len(FingerprintIndex.from_settings()) == 1
+
+
+def test_expired_cache_entries_are_purged_when_no_run_expires(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    db.add(Run(id="new", created_at=NOW, status="completed"))
+    stale = NOW - timedelta(hours=settings.shared_cache_ttl_hours + 1)
+    db.add_all(
+        [
+            CacheEntry(key="page:old", kind="page", value={}, created_at=stale),
+            CacheEntry(key="page:new", kind="page", value={}, created_at=NOW),
+        ]
+    )
+    db.commit()
+    policy = RetentionPolicy(keep_last_runs=10, max_age_days=None)
+
+    report = apply_retention(db, policy, dry_run=True, now=NOW)
+    assert (report.runs, report.rows) == ([], {"cache_entries": 1})
+    assert db.query(CacheEntry).count() == 2
+    report = apply_retention(db, policy, dry_run=False, now=NOW)
+    assert report.rows == {"cache_entries": 1}
+    assert [entry.key for entry in db.query(CacheEntry).all()] == ["page:new"]
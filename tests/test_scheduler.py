@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.db import Run, Schedule
+from app.services.scheduler import RunCoordinator, fire_due_schedules, params_hash
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+class _BlockingJob:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, run_id, params):
+        self.calls.append(run_id)
+        self.release.wait(5)
+
+
+def test_params_hash_ignores_defaults_and_category_order():
+    assert params_hash({}) == params_hash({"max_items": 20, "dry_run": False})
+    assert params_hash({"categories": ["FX/payments", "energy inputs"]}) == params_hash(
+        {"categories": ["energy inputs", "FX/payments"]}
+    )
+    assert params_hash({"max_items": 5}) != params_hash({"max_items": 6})
+
+
+def test_identical_requests_coalesce_while_in_flight(db):
+    job = _BlockingJob()
+    coordinator = RunCoordinator(job, max_concurrent_runs=1)
+    try:
+        first, coalesced = coordinator.submit(db, {"max_items": 5}, now=NOW)
+        assert not coalesced
+        again, coalesced = coordinator.submit(db, {"max_items": 5, "dry_run": False}, now=NOW + timedelta(seconds=1))
+        assert (again, coalesced) == (first, True)
+        other, coalesced = coordinator.submit(db, {"max_items": 6}, now=NOW + timedelta(seconds=2))
+        assert other != first and not coalesced
+        assert db.query(Run).count() == 2
+        job.release.set()
+        deadline = time.monotonic() + 5
+        while coordinator.inflight() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert coordinator.inflight() == {}
+        assert job.calls == [first, other]
+    finally:
+        job.release.set()
+        coordinator.shutdown(wait=True)
+
+
+def test_submit_after_shutdown_fails_the_run_and_frees_the_key(db):
+    coordinator = RunCoordinator(_BlockingJob(), max_concurrent_runs=1)
+    coordinator.shutdown(wait=True)
+    with pytest.raises(RuntimeError):
+        coordinator.submit(db, {"max_items": 5}, now=NOW)
+    assert coordinator.inflight() == {}
+    run = db.query(Run).one()
+    assert run.status == "failed" and run.error.startswith("Could not start run")
+    assert coordinator._find_active_run(db, params_hash({"max_items": 5}), NOW) is None
+
+
+def test_active_runs_in_db_coalesce_across_processes_until_stale(db):
+    db.add(Run(id="elsewhere", created_at=NOW - timedelta(minutes=5), status="running", params={"max_items": 5}))
+    db.add(Run(id="stale", created_at=NOW - timedelta(days=2), status="running", params={"max_items": 7}))
+    db.commit()
+    job = _BlockingJob()
+    job.release.set()
+    coordinator = RunCoordinator(job, max_concurrent_runs=1)
+    try:
+        assert coordinator.submit(db, {"max_items": 5}, now=NOW) == ("elsewhere", True)
+        run_id, coalesced = coordinator.submit(db, {"max_items": 7}, now=NOW)
+        assert run_id != "stale" and not coalesced
+    finally:
+        coordinator.shutdown(wait=True)
+
+
+def test_due_schedules_fire_once_and_advance(db):
+    db.add(Schedule(name="daily", params={"max_items": 5}, interval_minutes=1440, next_run_at=NOW - timedelta(days=3)))
+    db.add(Schedule(name="later", params={}, interval_minutes=60, next_run_at=NOW + timedelta(hours=1)))
+    db.add(Schedule(name="off", params={}, interval_minutes=60, enabled=False, next_run_at=NOW - timedelta(hours=1)))
+    db.commit()
+    job = _BlockingJob()
+    job.release.set()
+    coordinator = RunCoordinator(job, max_concurrent_runs=1)
+    try:
+        assert fire_due_schedules(db, coordinator, now=NOW) == 1
+        assert fire_due_schedules(db, coordinator, now=NOW) == 0
+    finally:
+        coordinator.shutdown(wait=True)
+    daily = db.query(Schedule).filter(Schedule.name == "daily").one()
+    assert daily.next_run_at == NOW + timedelta(days=1)
+    assert daily.last_run_id.startswith(NOW.isoformat())
+
+
+def test_schedules_due_in_the_same_tick_each_get_a_run(db):
+    db.add(Schedule(name="small", params={"max_items": 5}, interval_minutes=60, next_run_at=NOW - timedelta(minutes=1)))
+    db.add(Schedule(name="large", params={"max_items": 9}, interval_minutes=60, next_run_at=NOW - timedelta(minutes=1)))
+    db.add(Schedule(name="broken", params={"max_items": "many"}, interval_minutes=60, next_run_at=NOW - timedelta(minutes=2)))
+    db.commit()
+    job = _BlockingJob()
+    job.release.set()
+    coordinator = RunCoordinator(job, max_concurrent_runs=1)
+    try:
+        assert fire_due_schedules(db, coordinator, now=NOW) == 2
+    finally:
+        coordinator.shutdown(wait=True)
+    schedules = {schedule.name: schedule for schedule in db.query(Schedule)}
+    assert schedules["small"].last_run_id != schedules["large"].last_run_id
+    assert {run.id for run in db.query(Run)} == {schedules["small"].last_run_id, schedules["large"].last_run_id}
+    assert schedules["large"].next_run_at == NOW + timedelta(hours=1)
+    # A schedule whose submit fails keeps its due time and is retried on the next tick.
+    assert schedules["broken"].next_run_at == NOW - timedelta(minutes=2)
+    assert schedules["broken"].last_run_id is None
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.db import Run, SearchDocument
+from app.models.schemas import ChallengeItem
+from app.services.search_index import SearchIndexer, challenge_documents, search_documents
+
+
+@pytest.fixture()
+def session_factory(session_factory):
+    db = session_factory()
+    db.add(Run(id="r1", created_at=datetime(2026, 3, 1), status="running"))
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def test_indexer_flushes_in_batches_and_truncates_bodies(session_factory):
+    indexer = SearchIndexer(session_factory, "r1", batch_size=2, max_body_chars=50)
+    indexer.add_source("https://a.example/1", "CBAM guidance", "2026-01-10", "CBAM reporting " * 20)
+    indexer.add_source("https://a.example/2", "Red Sea", None, "Shipping diverted")
+    indexer.add_source("https://a.example/3", None, None, "Export controls")
+    assert indexer.stats["indexed"] == 2
+    indexer.flush()
+    db = session_factory()
+    docs = db.query(SearchDocument).order_by(SearchDocument.id).all()
+    assert [doc.url for doc in docs] == ["https://a.example/1", "https://a.example/2", "https://a.example/3"]
+    assert len(docs[0].body) == 50
+
+
+def test_fallback_search_ranks_matches_and_returns_snippets(session_factory):
+    indexer = SearchIndexer(session_factory, "r1")
+    indexer.add_source("https://a.example/cbam", "CBAM guidance", None, "The CBAM transitional phase requires CBAM reports.")
+    indexer.add_source("https://a.example/ports", "Ports", None, "Congestion at Rotterdam; CBAM is not covered here.")
+    indexer.add_source("https://a.example/other", "Football", None, "A late equaliser.")
+    indexer.flush()
+    db = session_factory()
+    item = ChallengeItem.model_validate(
+        {
+            "title": "CBAM compliance costs",
+            "summary": "EU CBAM raises reporting costs for UK exporters.",
+            "challenge_type": "ESG/CBAM",
+            "impact_area": ["exports"],
+            "severity": "medium",
+            "time_horizon": "3-12m",
+            "uk_relevance": "direct",
+            "eu_relevance": "direct",
+            "affected_sectors": ["steel"],
+            "evidence": [{"source_name": "gov.uk", "url": "https://www.gov.uk/cbam", "published_at": None, "quote": "q", "credibility": "high"}],
+            "confidence": 0.8,
+            "dedupe_key": "k",
+        }
+    )
+    db.add_all(challenge_documents("r1", [item]))
+    db.commit()
+
+    hits = search_documents(db, "cbam", kinds=["source"])
+    assert [hit.url for hit in hits] == ["https://a.example/cbam", "https://a.example/ports"]
+    assert "CBAM" in hits[0].snippet
+    challenge_hits = search_documents(db, "CBAM reporting", kinds=["challenge"])
+    assert [hit.title for hit in challenge_hits] == ["CBAM compliance costs"]
+    assert search_documents(db, "!!!") == []
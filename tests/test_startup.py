@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from benchmarks.import_bench import ROOT, measure_import
+
+
+def test_importing_the_app_loads_no_heavy_dependencies():
+    assert measure_import("app.main")["heavy"] == []
+
+
+def test_importing_the_app_creates_no_database_engine():
+    probe = "import app.main, app.models.db as db; print(len(db._sessionmakers))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "0"
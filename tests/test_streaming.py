@@ -0,0 +1,59 @@
+import threading
+import time
+
+from app.services.records import CandidateRecord, SourceRef
+from app.services.streaming import CandidateLog, RssSampler, bounded_map, peak_rss_mb, serialize_candidates
+from app.utils.serialization import dumps
+
+SOURCE = SourceRef(url="https://wire.example/a", source_name="wire.example", credibility="medium")
+
+
+def _record(index: int) -> CandidateRecord:
+    item = {"title": f"Challenge {index}", "summary": "Port congestion", "impact_area": ["imports"], "confidence": 0.7}
+    return CandidateRecord.from_extraction(item, SOURCE, "2024-05-01", [f"quote {index}"])
+
+
+def test_bounded_map_keeps_order_and_limits_work_in_flight():
+    started = []
+    lock = threading.Lock()
+
+    def work(value):
+        with lock:
+            started.append(value)
+        time.sleep(0.01 * (5 - value % 5))
+        return value * 2
+
+    results = bounded_map(work, range(20), workers=4, max_pending=3)
+    assert next(results) == 0
+    time.sleep(0.05)
+    # Nothing beyond the window is started while the consumer is not pulling.
+    assert len(started) <= 4
+    assert list(results) == [value * 2 for value in range(1, 20)]
+
+
+def test_candidate_log_spills_and_streams_back_in_order(tmp_path):
+    log = CandidateLog(tmp_path / "candidates.jsonl", threshold=5)
+    records = [_record(i) for i in range(10)]
+    for start in range(0, 10, 3):
+        log.extend(records[start : start + 3])
+    assert log.spilled == 6
+    assert len(log) == 10
+    assert [r.title for r in log] == [r.title for r in records]
+    assert list(log)[0].evidence[0].url == SOURCE.url
+
+    assert serialize_candidates(log) == dumps({"items": records, "stats": {"found": 10}})
+    log.close()
+    assert not (tmp_path / "candidates.jsonl").exists()
+    assert peak_rss_mb() > 0
+
+
+def test_rss_sampler_reports_growth_within_its_span():
+    with RssSampler(interval_s=0.01) as memory:
+        ballast = bytearray(64 * 1024 * 1024)
+        ballast[::4096] = b"x" * len(ballast[::4096])
+        time.sleep(0.05)
+        del ballast
+    stats = memory.stats()
+    assert stats["rss_peak_mb"] >= stats["rss_start_mb"] > 0
+    assert stats["rss_growth_mb"] >= 48
+    assert not memory._thread.is_alive()
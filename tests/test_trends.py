@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.db import Challenge, ChallengeTrend, Run
+from app.services.retention import RetentionPolicy, apply_retention
+from app.services.trends import query_trends, rebuild, record_run, week_of
+
+NOW = datetime(2026, 6, 3, 12, 0)
+
+
+def _challenge(run_id, challenge_type, severity, sectors, impact_area):
+    return Challenge(
+        run_id=run_id, title=f"{challenge_type} {severity}", summary="s", challenge_type=challenge_type,
+        impact_area=impact_area, severity=severity, time_horizon="now", uk_relevance="direct", eu_relevance="direct",
+        affected_sectors=sectors, evidence=[], confidence=0.5, dedupe_key=f"{run_id}-{challenge_type}-{severity}",
+    )
+
+
+def _store(db, run_id, created_at, items):
+    db.add(Run(id=run_id, created_at=created_at, status="completed"))
+    db.add_all(items)
+    record_run(db, run_id, items)
+    db.commit()
+
+
+def _table(db):
+    return sorted(db.execute(select(ChallengeTrend.week, ChallengeTrend.dimension, ChallengeTrend.value, ChallengeTrend.count)))
+
+
+def test_store_upserts_weekly_counts_and_query_zero_fills(db):
+    assert week_of(NOW) == date(2026, 6, 1)
+    _store(db, "old", NOW - timedelta(weeks=2), [_challenge("old", "Tariffs", "high", ["steel"], ["imports"])])
+    _store(db, "a", NOW, [_challenge("a", "Tariffs", "high", ["steel", "steel", "autos"], ["imports", "exports"])])
+    _store(db, "b", NOW + timedelta(days=1), [_challenge("b", "Customs", "low", ["steel"], [])])
+
+    result = query_trends(db, ["sector", "severity"], weeks=3, now=NOW)
+    assert result["weeks"] == ["2026-05-18", "2026-05-25", "2026-06-01"]
+    assert result["trends"]["sector"] == [
+        {"value": "steel", "total": 3, "counts": [1, 0, 2]},
+        {"value": "autos", "total": 1, "counts": [0, 0, 1]},
+    ]
+    assert result["trends"]["severity"] == [
+        {"value": "high", "total": 2, "counts": [1, 0, 1]},
+        {"value": "low", "total": 1, "counts": [0, 0, 1]},
+    ]
+    assert query_trends(db, ["sector"], weeks=1, top=1, now=NOW)["trends"]["sector"] == [
+        {"value": "steel", "total": 2, "counts": [2]}
+    ]
+
+
+def test_rebuild_matches_incremental_and_retention_takes_counts_back(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    _store(db, "old", NOW - timedelta(days=100), [_challenge("old", "Tariffs", "high", ["steel"], ["imports"])])
+    _store(db, "new", NOW, [_challenge("new", "Tariffs", "medium", ["steel"], ["imports"])])
+    incremental = _table(db)
+
+    assert rebuild(db) == {"challenges": 2, "rows": len(incremental)}
+    assert _table(db) == incremental
+
+    report = apply_retention(db, RetentionPolicy(keep_last_runs=1, max_age_days=30, batch_size=1), dry_run=False, now=NOW)
+    assert report.rows["challenges"] == 1
+    assert _table(db) == [
+        (date(2026, 6, 1), "challenge_type", "Tariffs", 1),
+        (date(2026, 6, 1), "impact_area", "imports", 1),
+        (date(2026, 6, 1), "sector", "steel", 1),
+        (date(2026, 6, 1), "severity", "medium", 1),
+    ]
+    rebuild(db)
+    assert len(_table(db)) == 4
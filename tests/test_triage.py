@@ -0,0 +1,69 @@
+from app.core.config import settings
+from app.services.triage import TriageCascade, local_triage_score
+from benchmarks.pipeline_bench import run_scenario
+from benchmarks.stubs import Latency
+
+
+class _FakeTriageLLM:
+    def __init__(self, score=None):
+        self.score = score
+        self.calls = 0
+
+    def triage(self, title, text):
+        self.calls += 1
+        if self.score is None:
+            raise RuntimeError("triage model unavailable")
+        return self.score
+
+
+def test_local_score_separates_trade_pages_from_noise():
+    trade = local_triage_score(
+        "New UK customs checks on EU imports",
+        "Border controls and tariff quotas add delays for freight at Dover as importers face new compliance costs.",
+    )
+    noise = local_triage_score("Weekend football round-up", "A late equaliser kept the title race open on Saturday.")
+    assert trade >= 0.8
+    assert noise == 0.0
+
+
+def test_cascade_gates_on_threshold_and_records_histogram():
+    cascade = TriageCascade("local", threshold=0.4, max_chars=200)
+    assert cascade.passes("EU sanctions", "New sanctions and export controls hit UK shipping and freight insurance.")
+    assert not cascade.passes("Recipes", "How to bake bread at home.")
+    stats = cascade.stats()
+    assert (stats["triaged"], stats["passed"], stats["rejected"]) == (2, 1, 1)
+    assert sum(stats["score_histogram"].values()) == 2
+
+
+def test_model_tier_uses_llm_and_fails_open():
+    llm = _FakeTriageLLM(score=0.1)
+    cascade = TriageCascade("model", threshold=0.5, max_chars=200, llm=llm)
+    assert not cascade.passes("t", "text")
+    assert llm.calls == 1
+
+    broken = TriageCascade("model", threshold=0.5, max_chars=200, llm=_FakeTriageLLM())
+    assert broken.passes("t", "text")
+    assert broken.stats()["errors"] == 1
+
+
+def test_off_mode_passes_everything_without_scoring():
+    llm = _FakeTriageLLM(score=0.0)
+    cascade = TriageCascade("off", threshold=0.5, max_chars=200, llm=llm)
+    assert cascade.passes("t", "text")
+    assert llm.calls == 0 and cascade.stats()["triaged"] == 0
+
+
+def test_pipeline_skips_extraction_for_rejected_pages(monkeypatch):
+    monkeypatch.setattr(settings, "triage_mode", "local")
+    result = run_scenario(8, Latency(), trace_memory=False)
+    triage = result["triage"]
+    assert triage["triaged"] == 8
+    assert triage["rejected"] >= 2
+    assert result["llm"]["packed_documents"] == triage["passed"]
+
+
+def test_pipeline_model_tier_counts_triage_calls(monkeypatch):
+    monkeypatch.setattr(settings, "triage_mode", "model")
+    result = run_scenario(4, Latency(), trace_memory=False)
+    assert result["llm"]["triage_calls"] == 4
+    assert "triage" in result["stages_s"]
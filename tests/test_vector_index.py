@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.services.vector_index import VECTORS_FILE, VectorIndex
+
+
+def _clustered(n, dim=16, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return centers[rng.integers(0, clusters, size=n)] + 0.05 * rng.normal(size=(n, dim))
+
+
+def test_exact_search_before_training_and_persistence(tmp_path):
+    index = VectorIndex(tmp_path, min_train=1000)
+    vectors = _clustered(50)
+    index.add(list(range(100, 150)), vectors.tolist(), "emb")
+    hits = index.search(vectors[7], k=3)
+    assert hits[0][0] == 107 and hits[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert 107 not in [cid for cid, _ in index.search(vectors[7], k=3, exclude_ids=[107])]
+
+    reopened = VectorIndex(tmp_path)
+    assert len(reopened) == 50
+    assert np.allclose(reopened.vector_for(120), vectors[20] / np.linalg.norm(vectors[20]), atol=1e-6)
+
+
+def test_ivf_probes_a_fraction_of_rows_with_good_recall(tmp_path):
+    index = VectorIndex(tmp_path, nprobe=4, min_train=256)
+    vectors = _clustered(2000)
+    for start in range(0, 2000, 250):
+        index.add(list(range(start, start + 250)), vectors[start : start + 250].tolist(), "emb")
+    index.search(vectors[0], k=1)
+    assert index._snapshot().centroids is not None
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    recalls, probed = [], []
+    for q in range(0, 2000, 97):
+        exact = set(np.argsort(-(unit @ unit[q]))[:10].tolist())
+        found = {cid for cid, _ in index.search(vectors[q], k=10)}
+        recalls.append(len(exact & found) / 10)
+        probed.append(len(index._candidate_rows(index._snapshot(), unit[q].astype(np.float32))))
+    assert np.mean(recalls) >= 0.9
+    assert max(probed) < 2000 / 2
+
+
+def test_uncommitted_bytes_are_discarded_and_dimensions_checked(tmp_path):
+    index = VectorIndex(tmp_path)
+    index.add([1, 2], [[1.0, 0.0], [0.0, 1.0]], "emb")
+    with (tmp_path / VECTORS_FILE).open("ab") as fh:
+        fh.write(b"\x00" * 12)
+    index.add([3], [[1.0, 1.0]], "emb")
+    assert (tmp_path / VECTORS_FILE).stat().st_size == 3 * 2 * 4
+    assert index.search([1.0, 1.0], k=1)[0][0] == 3
+    with pytest.raises(ValueError):
+        index.add([4], [[1.0, 0.0, 0.0]], "emb")
+    with pytest.raises(ValueError):
+        index.add([4], [[1.0, 0.0]], "other-model")
+
+
+def test_remove_rewrites_rows_and_keeps_list_assignments(tmp_path):
+    index = VectorIndex(tmp_path, nprobe=4, min_train=256)
+    vectors = _clustered(600)
+    index.add(list(range(600)), vectors.tolist(), "emb")
+    assert index.search(vectors[5], k=1)[0][0] == 5
+
+    assert index.remove(list(range(0, 600, 2)) + [9999]) == 300
+    assert index.remove([0]) == 0
+    reopened = VectorIndex(tmp_path, nprobe=4)
+    assert len(reopened) == 300
+    assert reopened.vector_for(4) is None
+    assert reopened.search(vectors[7], k=1)[0][0] == 7
+    assert index.search(vectors[7], k=1)[0][0] == 7
+
+
+def test_readers_keep_a_consistent_snapshot_while_rows_are_added(tmp_path):
+    index = VectorIndex(tmp_path, min_train=10_000)
+    index.add([0], [[1.0, 0.0]], "emb")
+    snapshot = index._snapshot()
+    index.add([1, 2], [[0.0, 1.0], [1.0, 1.0]], "emb")
+    assert len(snapshot.ids) == 1 and snapshot.rows == {0: 0}
+    fresh = index._snapshot()
+    assert fresh is not snapshot and fresh.rows == {0: 0, 1: 1, 2: 2}
+    assert index._snapshot() is fresh
@@ -0,0 +1,184 @@
+import math
+import threading
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.models.db import Run, WorkItem
+from app.services.metrics import StageTimer
+from app.services.cache import html_path, text_path
+from app.services.pipeline import _distributed_pages, process_work_items, run_pipeline
+from app.services.query import generate_queries
+from app.services.search.base import SearchResult
+from app.services.triage import TriageCascade
+from app.services.work_queue import (
+    SharedCache,
+    claim,
+    complete,
+    enqueue,
+    fail,
+    outstanding,
+    requeue_stale,
+    settle,
+    status_counts,
+)
+from app.services.worker import run_worker
+from benchmarks.stubs import Latency, RecordedFixtures, StubOpenAIClient, StubPageFetcher, StubSearchClient
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+def test_claims_are_disjoint_ordered_and_released_after_lease(session_factory):
+    db = session_factory()
+    db.add(Run(id="run-1", created_at=NOW, status="running", params={}, stats={}))
+    results = [SearchResult(title=f"page {i}", url=f"https://trade.example/{i}") for i in range(5)]
+    assert enqueue(db, "run-1", results, {"dry_run": True}) == 5
+
+    first = claim(db, "worker-a", 2, now=NOW)
+    second = claim(db, "worker-b", 2, now=NOW + timedelta(minutes=20))
+    assert [item.url for item in first] == ["https://trade.example/0", "https://trade.example/1"]
+    assert {item.id for item in first}.isdisjoint(item.id for item in second)
+    assert first[0].payload == {"title": "page 0", "dry_run": True}
+
+    complete(db, {first[1].id: {"text": "done"}})
+    fail(db, [second[0].id], "boom", max_attempts=1)
+    # worker-a died holding item 0; its lease has expired, worker-b's claim at +20 min has not.
+    assert requeue_stale(db, lease_s=600, now=NOW + timedelta(minutes=25)) == 1
+    statuses = {row.url[-1]: row.status for row in db.query(WorkItem)}
+    assert statuses == {"0": "pending", "1": "done", "2": "failed", "3": "claimed", "4": "pending"}
+    assert outstanding(db, "run-1") == 3
+
+
+def test_shared_cache_round_trip_and_ttl(session_factory):
+    cache = SharedCache(session_factory, ttl_s=3600)
+    cache.put("page:a", "page", {"text": "hello"})
+    cache.put("page:a", "page", {"text": "hello again"})
+    assert cache.get("page:a") == {"text": "hello again"}
+    assert cache.get_many(["page:a", "page:b"]) == {"page:a": {"text": "hello again"}}
+    assert SharedCache(session_factory, ttl_s=-1).get("page:a") is None
+
+
+def test_sharded_run_matches_single_process_output(session_factory, tmp_path, monkeypatch):
+    fixtures = RecordedFixtures.load()
+    latency = Latency(fetch_s=0.01)
+    monkeypatch.setattr(settings, "openai_api_key", "offline-test")
+    monkeypatch.setattr(settings, "near_dup_enabled", False)
+    monkeypatch.setattr(settings, "work_poll_s", 0.01)
+    monkeypatch.setattr(settings, "work_batch_size", 4)
+    params = {"top_n_per_query": math.ceil(24 / len(generate_queries())), "max_items": 25}
+
+    def run(run_id, data_dir, session_factory=None):
+        monkeypatch.setattr(settings, "data_dir", data_dir)
+        corpus = fixtures.corpus(24)
+        timer = StageTimer()
+        output, sources, _ = run_pipeline(
+            run_id,
+            params,
+            search_client=StubSearchClient(corpus, latency),
+            fetcher=StubPageFetcher(fixtures, latency, timer=timer),
+            llm=StubOpenAIClient(fixtures, latency),
+            timer=timer,
+            session_factory=session_factory,
+        )
+        return output, sources
+
+    local, local_sources = run("local", tmp_path / "local")
+
+    monkeypatch.setattr(settings, "work_queue_enabled", True)
+    with session_factory() as db:
+        db.add(Run(id="sharded", created_at=NOW, status="running", params=params, stats={}))
+        db.commit()
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=run_worker,
+        args=(session_factory, "worker-1"),
+        kwargs={"fetcher": StubPageFetcher(fixtures, latency), "llm": StubOpenAIClient(fixtures, latency), "stop": stop},
+        daemon=True,
+    )
+    worker.start()
+    try:
+        sharded, sharded_sources = run("sharded", tmp_path / "sharded", session_factory)
+    finally:
+        stop.set()
+        worker.join(5)
+
+    assert [item.title for item in sharded.items] == [item.title for item in local.items]
+    assert [source["url"] for source in sharded_sources] == [source["url"] for source in local_sources]
+    queue = sharded.stats["work_queue"]
+    assert queue["items"] == len(local_sources)
+    assert sum(queue["workers"].values()) == queue["items"]
+    assert "worker-1" in queue["workers"]
+    with session_factory() as db:
+        assert db.query(WorkItem).count() == 0
+
+
+class _FlakyFetcher(StubPageFetcher):
+    def __init__(self, fixtures, latency, broken):
+        super().__init__(fixtures, latency)
+        self.broken = broken
+
+    def fetch(self, url, html_dest=None, pdf_dest=None):
+        if url == self.broken:
+            raise RuntimeError("parser crashed")
+        return super().fetch(url, html_dest, pdf_dest)
+
+
+def test_failures_settle_per_item_and_artifacts_reach_the_coordinator(session_factory, tmp_path, monkeypatch):
+    fixtures = RecordedFixtures.load()
+    latency = Latency()
+    monkeypatch.setattr(settings, "openai_api_key", "offline-test")
+    monkeypatch.setattr(settings, "triage_mode", "local")
+    urls = [url for url in (result.url for result in fixtures.corpus(6)) if fixtures.html(url)][:3]
+    with session_factory() as db:
+        db.add(Run(id="run-1", created_at=NOW, status="running", params={}, stats={}))
+        db.commit()
+        enqueue(db, "run-1", [SearchResult(title="", url=url) for url in urls], {"dry_run": False})
+
+    # A worker on another node, with its own DATA_DIR, fails on one page only.
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "worker")
+    cache = SharedCache(session_factory)
+    with session_factory() as db:
+        items = claim(db, "worker-1", 10)
+    worker_llm = StubOpenAIClient(fixtures, latency)
+    results = process_work_items(
+        items,
+        fetcher=_FlakyFetcher(fixtures, latency, broken=urls[1]),
+        llm=worker_llm,
+        cache=cache,
+        worker_id="worker-1",
+    )
+    with session_factory() as db:
+        assert settle(db, results, max_attempts=3) == 1
+        assert status_counts(db, "run-1") == {"done": 2, "pending": 1}
+
+    # The coordinator retries the failed page itself and writes every artifact under its own DATA_DIR.
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "coordinator")
+    llm = StubOpenAIClient(fixtures, latency)
+    triage = TriageCascade("local", settings.triage_threshold, settings.triage_max_chars)
+    pages = list(
+        _distributed_pages(
+            "run-1", [], dry_run=False, fetcher=StubPageFetcher(fixtures, latency), llm=llm, triage=triage,
+            timer=StageTimer(), deadline=None, session_factory=session_factory, queue_stats={},
+        )
+    )
+    assert [page.url for page in pages] == urls
+    # Triage and LLM work from both nodes lands in the coordinator's counters, the coordinator's own calls once.
+    assert triage.stats()["triaged"] == 3
+    assert llm.stats["extraction_calls"] == worker_llm.stats["extraction_calls"] + 1
+    for url in urls:
+        assert html_path("run-1", url).exists() and text_path("run-1", url).exists()
+
+
+def test_closing_the_join_early_still_clears_the_queue(session_factory, tmp_path, monkeypatch):
+    fixtures = RecordedFixtures.load()
+    latency = Latency()
+    monkeypatch.setattr(settings, "openai_api_key", "offline-test")
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    pages = _distributed_pages(
+        "run-1", fixtures.corpus(4), dry_run=True, fetcher=StubPageFetcher(fixtures, latency),
+        llm=StubOpenAIClient(fixtures, latency), triage=TriageCascade("off", 0.0, 0), timer=StageTimer(),
+        deadline=None, session_factory=session_factory, queue_stats={},
+    )
+    next(pages)
+    pages.close()
+    with session_factory() as db:
+        assert db.query(WorkItem).count() == 0